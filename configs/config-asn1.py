@@ -59,6 +59,11 @@ TESTCASE_OUTPUT_NAME= '6-testcases'         # a folder for the outputs of 'gen'
 # the maximum execution time of fuzzing (in seconds)
 FUZZING_TIMEOUT = 10
 
+# the maximum fuzzing time of a mutant when the campaign budget is given (`run_list.py --budget <core-hours>`)
+#   - The time saved by the early killed mutants is given to the other mutants,
+#     but the time for a mutant does not exceed FUZZING_TIMEOUT * FUZZING_BUDGET_MAX_FACTOR
+FUZZING_BUDGET_MAX_FACTOR = 4
+
 # prefix when this pipeline extracts mutated function from the corresponding source code
 MUTANT_FUNC_PREFIX = 'mut'
 
@@ -95,6 +100,19 @@ FUZZER_PRINT_LOG_DETAILS = False
 FUZZER_PRINT_INPUTS = False
 FUZZER_PRINT_CRASHES = True  # Exclusive with FUZZER_PRINT_INPUTS
 
+# Number of AFL++ instances for a mutant (--instances)
+#   - 1: a single instance
+#   - N > 1: one main instance (-M) and N-1 secondary instances (-S) share the fuzzing output directory,
+#            all the instances stop when one of them kills the mutant (works only with AFL++)
+#   - On HPC, each task requests N cores (--cpus-per-task)
+FUZZER_INSTANCES = 1
+
+# Bind each AFL++ instance to a CPU core among the available cores of the process (-b)
+#   - The cores bound to the running afl-fuzz processes are skipped (the same as AFL++ does),
+#     but the concurrent executions starting at the same time can choose the same cores
+#   - False: AFL++ binds the instances to free cores by itself
+FUZZER_CPU_BINDING = False
+
 
 ##################################################################################
 # Template configurations: template paths and array settings
@@ -110,6 +128,37 @@ TEMPLATE_TESTCASE_DRIVER        = "template_testcase.c.jinja2"
 TEMPLATE_FALSE_POSITIVE_DRIVER  = "template_false.c.jinja2"
 TEMPLATE_TESTCASE_GDB           = "template_gdb_script.sh.jinja2"
 TEMPLATE_DEPENDENCY_DRIVER      = "template_dependency.c.jinja2"
+TEMPLATE_PERSISTENT_DRIVER      = "template_fuzzing_persistent.c.jinja2"
+
+# AFL persistent mode for the fuzzing driver
+#   - True: the fuzzing driver is generated by TEMPLATE_PERSISTENT_DRIVER,
+#           which tests FUZZING_PERSISTENT_LOOP inputs in a process using __AFL_LOOP (no fork/exec for each input)
+#   - The persistent mode works only if the driver is compiled by the AFL++ compilers supporting __AFL_LOOP
+#     (e.g., COMPILER_FILEPATH = './AFL++/afl-clang-fast'), otherwise the driver tests one input per process
+#   - Use it only when the function under test does not keep state between calls (e.g., static variables)
+FUZZING_PERSISTENT_MODE = False
+FUZZING_PERSISTENT_LOOP = 10000
+
+# Shared-memory test case delivery for the persistent-mode fuzzing driver
+#   - True: AFL++ gives each input through the shared memory (__AFL_FUZZ_TESTCASE_BUF) instead of a file (@@)
+#   - Works only with FUZZING_PERSISTENT_MODE; ignored with the plain AFL (the input is given by a file as usual)
+#   - If the compiler does not support the shared memory, the driver reads the input from the standard input
+FUZZING_SHMEM_TESTCASE = False
+
+# Format of the execution journal written by the fuzzing driver into its working directory
+#   - "csv": a text line for each execution in total.log (SeqID,TimeID,Initial,Origin,Mutant,Comp)
+#   - "binary": a fixed-width record (16 bytes) for each execution in total.bin, buffered in a shared memory mapping
+#   - "counters": only the number of executions failed at each stage in total.cnt (for statistics-only runs,
+#                 the inputs crashing the mutant are not recovered from the AFL results without the records)
+FUZZING_EXECUTION_LOG = "csv"
+
+# Batch replay of the inputs in the gen phase (false-positive filtering, presenting results) and tools/Reproducer.py
+#   - True: a driver executes many inputs in a single process invocation (<driver> --batch <manifest> <result> <timeout_ms>)
+#           each input is still isolated in a forked child process, so crashes and timeouts are reported per input
+#   - False: the driver is executed for each input (one shell and one `timeout` process per input)
+BATCH_REPLAY = True
+# The number of drivers executed concurrently for a batch replay (0: the number of available CPU cores)
+BATCH_REPLAY_SHARDS = 0
 
 # Configuration options for test drivers for a function
 TEMPLATE_CONFIG = {
@@ -227,6 +276,58 @@ COMPILE_SUT_FILES = ["asn1crt.c", "asn1crt_encoding.c", "asn1crt_encoding_uper.c
 #   - Default relative path(".") is the REPO_PATH
 COMPILE_OUTPUT = "./_build"
 
+# Object cache for the SUT compilation
+#   - Used this option if COMPILE_SUT_CMDS is None
+#   - Objects are shared across mutants when the compiler, flags, includes and the preprocessed source are the same,
+#     so only the source file containing the mutated function is compiled for each mutant
+#   - The directory can be shared by multiple concurrent executions
+#   - The relative path will be under EXP_BASE (not the REPO_PATH)
+#   - None: compile all the files without the cache
+SUT_OBJECT_CACHE = './object-cache'
+
+# Directory of the libclang AST cache
+#   - The ASTs of the source files parsed for generating drivers and extracting mutated functions are saved,
+#     and loaded when the same file (the same path, code, compile flags and unchanged headers) is parsed again
+#   - The directory can be shared by multiple concurrent executions
+#   - The relative path will be under EXP_BASE (not the REPO_PATH)
+#   - None: parse the source files every time
+AST_CACHE = './ast-cache'
+
+# Fast-parse mode of libclang (only for generating the drivers in the preprocess phase)
+#   - True: only the function signatures and the type definitions are parsed (the function bodies are skipped),
+#           which is enough to generate drivers (the functions are always extracted with the full parse)
+#   - False: parse all the code
+FAST_PARSE = False
+
+# Directory of the precompiled headers for the fast-parse mode
+#   - The leading system includes of a source file (#include <...>) are precompiled once and
+#     shared by the source files with the same includes and compile flags
+#   - The relative path will be under EXP_BASE (not the REPO_PATH)
+#   - None: do not use precompiled headers
+PCH_CACHE = './pch-cache'
+
+# Extract the mutated function without parsing the mutant
+#   - True: the function extent in the original source file (parsed once, cached in AST_CACHE) is mapped onto
+#           the mutant by the edited range, libclang parses the mutant only when the edit may change the function boundaries
+#   - False: parse each mutant to extract the mutated function
+MUTANT_DIFF_EXTRACTION = True
+
+# Content-addressed store of the inputs killing mutants (see pipeline/fuzzer/InputStore.py)
+#   - The unique inputs of each fuzzing result are stored once by the hash of their contents (shared by the runs and the mutants)
+#   - The expected values of the inputs are also stored for each function,
+#     so the `gen` phase executes the expected driver only for the inputs that are not seen before
+#   - The relative path will be under EXP_BASE (not the REPO_PATH)
+#   - None: the inputs are deduplicated only within a fuzzing result
+INPUT_STORE = './input-store'
+
+# Mutant schemata build
+#   - True: the `build` phase builds the SUT and the test drivers once for all the mutants of a function
+#           (all the mutated functions are injected together with a dispatcher `mut_<function>`)
+#           and the mutant is selected at runtime by the environment variable MOTIF_MUTANT_ID
+#   - False: the SUT and the test drivers are built for each mutant
+#   - The mutated functions should have the same prototype as the original function
+SCHEMATA_BUILD = False
+
 # Filepaths of the compiled SUT objects
 #   - Please provide a list of files to be linked when test driver is compiled
 #   - `*`: to specify multiple files e.g., *.o
@@ -238,6 +339,21 @@ COMPILED_OBJECTS = ["./_build/**/*.o"]
 #   - Addition to SUT_COMPILE_FLAGS, specify compile options if it is needed
 LINKER_FLAGS = ""
 
+# Link the test cases of the gen phase against a static archive of the COMPILED_OBJECTS (libsut.a)
+#   - True: the object files (*.o) are archived once for a mutant and each test case links the archive
+#           (with --whole-archive, so all the objects are linked as before); other files (e.g., *.a) are linked as they are
+#   - False: each test case links all the object files
+SUT_ARCHIVE = True
+
+# The number of compilations executed concurrently
+#   - the files in COMPILE_SUT_FILES and the test cases in the gen phase (`-j` for make, see COMPILE_MAKE_JOBS)
+#   - 0: the number of available CPU cores (divided by the number of run.py commands executed together by --local-jobs)
+COMPILE_JOBS = 1
+
+# Give `-j <COMPILE_JOBS>` to the `make` commands in COMPILE_SUT_CMDS that do not specify the number of jobs
+#   - Use it only when the Makefiles of the SUT can be built in parallel
+COMPILE_MAKE_JOBS = False
+
 
 ##################################################################################
 # HPC parameters (Use this parameter when you work on HPC)
@@ -258,6 +374,13 @@ HPC_PARALLEL = False
 HPC_WORK_PATH          = '/tmp/MOTIF/ASN1'
 
 
+# Provisioning of the repository for each mutant (and each run) when HPC_PARALLEL is True
+#   - True: the repository (REPO_FILE) is extracted once in <HPC_WORK_PATH>/pristine and each mutant gets
+#           a directory of hard links to it; only the mutated source file and COMPILE_OUTPUT are private copies
+#   - False: the repository is fully extracted for each mutant
+#   - The repository is always fully extracted when COMPILE_SUT_CMDS is used
+REPO_LINK_FARM = True
+
 # HPC sbatch log settings
 HPC_LOG_PREFIX = "logs"
 LOG_FILE_NAME = "%j-%x.out"
@@ -275,6 +398,15 @@ SINGULARITY_FILE = "containers/motif_default.sif"
 N_TASKS_PER_JOB = 200         # How many commands will be executed in one parallel job
 N_PARALLELS_PER_JOB = 100     # How many commands will be executed simultaneously
 
+# The number of run.py commands executed simultaneously by run_list.py in a local machine
+#   (used when HPC is False; 1 means the commands are executed sequentially)
+#   Each command's output is stored in <HPC_LOG_PATH>/<JOB_NAME>.<cmd_id>.log
+LOCAL_JOBS = 1
+
+# Preprocess the mutated functions of the same source file in one run.py command (run_list.py)
+#   The source file is parsed once for all the functions (see `--batch-mutants` of run.py)
+PREPROCESS_BATCH = True
+
 # REPORT_EMAIL = None
 REPORT_EMAIL = "jaekwon.lee@uni.lu"
 SBATCH_PARAMETERS = ""
@@ -4,10 +4,15 @@ import platform
 if platform.python_version().startswith("3.") is False:
     raise Exception("Must be using Python 3")
 import os
+import re
+import json
+import bisect
+import hashlib
+import tempfile
 import argparse
 import subprocess
 import clang.cindex as parser
-from clang.cindex import Index, CursorKind, TypeKind, Cursor, Type
+from clang.cindex import Index, CursorKind, TypeKind, Cursor, Type, TokenKind
 
 if __package__ is None or __package__ == "":
     from Config import Config
@@ -30,9 +35,36 @@ class ASTAnalyzer():
     AST = None
     TYPES = None
 
-    def __init__(self, _source_file, _compilation_flags=None):
+    # include directories of the standard library (probed once for a process)
+    STANDARD_INCLUDES = None
+
+    # fast-parse mode: the function bodies are skipped (only signatures and type definitions are parsed)
+    FAST = False
+    FAST_OPTIONS = parser.TranslationUnit.PARSE_SKIP_FUNCTION_BODIES | parser.TranslationUnit.PARSE_INCOMPLETE
+    PUNCTUATIONS = None     # (offsets, spellings) of the punctuation tokens in the source file (for the fast-parse mode)
+    PCH_INCLUDES = []       # files included by the precompiled header (they are not reported by the AST)
+    INDEX = None            # clang index and arguments (without the precompiled header) for the full parse
+    ARGS = None
+    FULL_AST = None         # full parse of the source file in the fast-parse mode (made only if it is needed)
+
+    # the caches are shared by the clones of the repository (e.g., a repository for each mutant in HPC_PARALLEL)
+    REPO_PATH = None        # root of the repository (absolute path), it is replaced with REPO_MARK in the cache keys
+    REPO_MARK = "<REPO>"
+    AST_FILE = None         # name of the source file in the AST (a cached AST refers to the files of the clone that stored it)
+
+    def __init__(self, _source_file, _compilation_flags=None, _cache_dir=None, _fast=False, _pch_dir=None, _repo_path=None):
+        '''
+        :param _source_file: source file to parse
+        :param _compilation_flags: compile flags (includes and macros)
+        :param _cache_dir: directory of the AST cache (None: parse the source file every time)
+        :param _fast: parse only the signatures of functions and the type definitions (skip the function bodies)
+        :param _pch_dir: directory of the precompiled headers for the fast-parse mode (None: no precompiled header)
+        :param _repo_path: root of the repository that contains the source file (the cache keys do not depend on it)
+        '''
         # set paths
         self.SOURCE_FILE = _source_file
+        self.AST_FILE = _source_file
+        self.REPO_PATH = os.path.abspath(_repo_path) if _repo_path is not None else None
         if not os.path.isfile(_source_file):
             assert False, "The specified source file does not exist"
 
@@ -43,12 +75,318 @@ class ASTAnalyzer():
         args = [v for v in _compilation_flags.split() if v.strip()]
         args += ["-I"+v for v in self.get_standard_includes()]
 
-        # get AST of the source file using clang
+        # get AST of the source file using clang (load the AST from the cache if the same file was parsed before)
         index = parser.Index.create()
-        self.AST = index.parse(self.SOURCE_FILE, args=args)
+        self.FAST = _fast
+        self.PUNCTUATIONS = None
+        self.PCH_INCLUDES = []
+        self.FULL_AST = None
+        self.INDEX = index
+        self.ARGS = args
+        options = self.FAST_OPTIONS if _fast is True else 0
+        pch_file = self.get_PCH(index, _pch_dir, args) if _fast is True and _pch_dir is not None else None
+        parse_args = args + ["-include-pch", pch_file] if pch_file is not None else args
+
+        self.AST = None
+        cache_file = None
+        if _cache_dir is not None:
+            cache_file = self.get_cache_file(_cache_dir, parse_args + ["--options=%d" % options])
+            self.AST = self.load_cached_AST(index, cache_file)
+            if self.AST is not None: self.AST_FILE = self.AST.spelling
+        if self.AST is None:
+            self.AST = index.parse(self.SOURCE_FILE, args=parse_args, options=options)
+            if pch_file is not None and self.has_fatal_errors(self.AST) is True:
+                # the precompiled header is not valid, parse without it
+                #   (it is not removed, other processes can use it and a modified header makes a new one)
+                self.PCH_INCLUDES = []
+                self.AST = index.parse(self.SOURCE_FILE, args=args, options=options)
+                cache_file = None
+            if cache_file is not None:
+                self.store_cached_AST(cache_file)
         self.TYPES = self.__collect_type_defs()
         pass
 
+    ############################################################
+    # Precompiled header (fast-parse mode)
+    ############################################################
+    def get_leading_system_includes(self):
+        '''
+        get the system includes (#include <...>) at the beginning of the source file
+        Only the leading includes (before any code or other directives) are precompiled
+          because the system headers are guarded against multiple inclusions and
+          they are included unconditionally in the source file.
+        :return: list of include directives
+        '''
+        includes = []
+        with open(self.SOURCE_FILE, "r", errors="ignore") as f:
+            code = re.sub(r'/\*.*?\*/', ' ', f.read(), flags=re.DOTALL)
+        for line in code.split("\n"):
+            line = line.split("//")[0].strip()
+            if line == "": continue
+            if re.match(r'#\s*include\s*<[^>]+>$', line) is None: break
+            includes.append(line)
+        return includes
+
+    def get_PCH(self, _index, _pch_dir, _args):
+        '''
+        get the precompiled header of the leading system includes of the source file (make it if it does not exist)
+        The files with the same includes and compile flags share the precompiled header.
+        The key does not depend on the root of the repository (the clones share the header if it includes only
+          the files out of the repository), and the name of the header has the status of the included files,
+          so a modified header makes a new precompiled header instead of replacing the one used by other processes.
+        :return: file path of the precompiled header, None if there is no system include or it cannot be compiled
+        '''
+        includes = self.get_leading_system_includes()
+        if len(includes) == 0: return None
+
+        args = " ".join(self.normalize_args(_args, self.REPO_PATH))
+        key = hashlib.sha256(("args:%s\nincludes:%s\n" % (args, "\n".join(includes))).encode()).hexdigest()
+        list_file = os.path.join(_pch_dir, key + ".json")
+        try:
+            with open(list_file, "r") as f:
+                pch_includes = json.load(f)
+            pch_file = self.get_PCH_file(_pch_dir, key, pch_includes)
+            if pch_file is not None and os.path.exists(pch_file):
+                self.PCH_INCLUDES = [self.resolve_path(name, self.REPO_PATH) for name in pch_includes]
+                return pch_file
+        except (OSError, ValueError, TypeError):
+            pass
+
+        # compile the header and store it atomically (multiple processes can make the same header)
+        os.makedirs(_pch_dir, exist_ok=True)
+        header_file = os.path.join(_pch_dir, key + ".h")
+        with open(header_file, "w") as f:
+            f.write("\n".join(includes) + "\n")
+        tu = _index.parse(header_file, args=_args + ["-x", "c-header"])
+        if self.has_fatal_errors(tu, parser.Diagnostic.Error) is True: return None
+        pch_includes = [self.normalize_path(str(inc.include), self.REPO_PATH) for inc in tu.get_includes()]
+        pch_file = self.get_PCH_file(_pch_dir, key, pch_includes)
+        if pch_file is None: return None
+        temp_files = []
+        try:
+            for ext in [".pch", ".json"]:
+                fd, temp_file = tempfile.mkstemp(suffix=".tmp", dir=_pch_dir)
+                os.close(fd)
+                temp_files.append(temp_file)
+            with open(temp_files[1], "w") as f:
+                json.dump(pch_includes, f)
+            tu.save(temp_files[0])
+            os.replace(temp_files[0], pch_file)
+            os.replace(temp_files[1], list_file)     # the header is found only after it is stored
+        except (OSError, parser.TranslationUnitSaveError):
+            return None
+        finally:
+            for temp_file in temp_files:
+                if os.path.exists(temp_file): os.remove(temp_file)
+        self.PCH_INCLUDES = [self.resolve_path(name, self.REPO_PATH) for name in pch_includes]
+        return pch_file
+
+    def get_PCH_file(self, _pch_dir, _key, _pch_includes):
+        '''
+        make the path of the precompiled header from the key and the status (size, mtime) of the included files
+        A header that includes files in the repository refers to them with their absolute paths,
+          so the root of the repository is also in the name of the header.
+        :param _pch_includes: files included by the header (normalized paths)
+        :return: file path of the precompiled header, None if an included file does not exist
+        '''
+        hasher = hashlib.sha256()
+        for name in _pch_includes:
+            try:
+                stat = os.stat(self.resolve_path(name, self.REPO_PATH))
+            except OSError:
+                return None
+            hasher.update(("%s:%d:%d\n" % (name, stat.st_size, stat.st_mtime_ns)).encode())
+            if name.startswith(self.REPO_MARK) is True:
+                hasher.update(("root:%s\n" % self.REPO_PATH).encode())
+        return os.path.join(_pch_dir, "%s.%s.pch" % (_key, hasher.hexdigest()[:16]))
+
+    def has_fatal_errors(self, _tu, _severity=parser.Diagnostic.Fatal):
+        for diag in _tu.diagnostics:
+            if diag.severity >= _severity: return True
+        return False
+
+    ############################################################
+    # Function extents (fast-parse mode)
+    ############################################################
+    def get_punctuations(self):
+        '''
+        lex the source file and keep the punctuation tokens to find the function bodies skipped in the fast-parse mode
+        '''
+        if self.PUNCTUATIONS is None:
+            extent = self.AST.get_extent(self.AST_FILE, (0, os.path.getsize(self.SOURCE_FILE)))
+            tokens = [(token.extent.start.offset, token.spelling) for token in self.AST.get_tokens(extent=extent)
+                      if token.kind == TokenKind.PUNCTUATION]
+            self.PUNCTUATIONS = ([offset for offset, _ in tokens], [spelling for _, spelling in tokens])
+        return self.PUNCTUATIONS
+
+    def has_skipped_body(self, _node):
+        '''
+        check if the function declaration has its body which is skipped in the fast-parse mode
+        (the extent of the declaration ends before the body, and the next token is "{")
+        '''
+        if self.FAST is False or _node.location.file is None: return False
+        if _node.location.file.name != self.AST_FILE: return False
+        offsets, spellings = self.get_punctuations()
+        idx = bisect.bisect_left(offsets, _node.extent.end.offset)
+        return idx < len(offsets) and spellings[idx] == "{"
+
+    def get_body_start(self, _node):
+        '''
+        :return: the start offset of the function body ("{"), None if the function does not have the body
+        '''
+        if self.has_skipped_body(_node) is True:
+            offsets, spellings = self.get_punctuations()
+            return offsets[bisect.bisect_left(offsets, _node.extent.end.offset)]
+        body = [child for child in _node.get_children() if child.kind == CursorKind.COMPOUND_STMT]
+        return body[0].extent.start.offset if len(body) > 0 else None
+
+    def get_function_extent(self, _node):
+        '''
+        :return: (start, end) offsets of the function definition including its body
+        '''
+        if self.has_skipped_body(_node) is False:
+            return _node.extent.start.offset, _node.extent.end.offset
+
+        # find the matching "}" of the body
+        offsets, spellings = self.get_punctuations()
+        depth = 0
+        for idx in range(bisect.bisect_left(offsets, _node.extent.end.offset), len(offsets)):
+            if spellings[idx] == "#": break     # the directives in the body (e.g., #ifdef) can unbalance the braces
+            if spellings[idx] == "{": depth += 1
+            elif spellings[idx] == "}": depth -= 1
+            if depth == 0:
+                return _node.extent.start.offset, offsets[idx] + 1
+        return self.get_full_extent(_node)
+
+    def get_full_extent(self, _node):
+        '''
+        get the extent of the function from the full parse of the source file
+          (used when the end of the skipped body cannot be found by the tokens)
+        :return: (start, end) offsets of the function definition, end is None if the function is not found
+        '''
+        if self.FULL_AST is None:
+            self.FULL_AST = self.INDEX.parse(self.SOURCE_FILE, args=self.ARGS)
+        for node in self.FULL_AST.cursor.get_children():
+            if node.kind != CursorKind.FUNCTION_DECL or node.is_definition() is False: continue
+            if node.location.file is None or node.location.file.name != self.SOURCE_FILE: continue
+            if node.spelling == _node.spelling and node.extent.start.offset == _node.extent.start.offset:
+                return node.extent.start.offset, node.extent.end.offset
+        return _node.extent.start.offset, None
+
+    ############################################################
+    # Keys independent of the repository root
+    ############################################################
+    @staticmethod
+    def normalize_path(_path, _repo_path):
+        '''
+        :param _repo_path: root of the repository (None: the path is not changed)
+        :return: the path in the repository starting with REPO_MARK instead of the root, the other paths are not changed
+        '''
+        if _repo_path is None: return _path
+        root = os.path.abspath(_repo_path)
+        path = os.path.abspath(_path)
+        if path == root or path.startswith(root + os.sep):
+            return ASTAnalyzer.REPO_MARK + path[len(root):]
+        return _path
+
+    @staticmethod
+    def resolve_path(_path, _repo_path):
+        # the path in the repository for the normalized path
+        if _repo_path is None or _path.startswith(ASTAnalyzer.REPO_MARK) is False: return _path
+        return os.path.abspath(_repo_path) + _path[len(ASTAnalyzer.REPO_MARK):]
+
+    @staticmethod
+    def normalize_args(_args, _repo_path):
+        # the include directories in the repository are normalized (e.g., "-I<REPO>/include")
+        args = []
+        for arg in _args:
+            prefix = "-I" if arg.startswith("-I") else ""
+            args.append(prefix + ASTAnalyzer.normalize_path(arg[len(prefix):], _repo_path))
+        return args
+
+    ############################################################
+    # Translation unit cache
+    ############################################################
+    def get_cache_file(self, _cache_dir, _args):
+        '''
+        make the path of the cached AST for the source file
+        The key is a hash of the source path, the source code, the clang arguments and libclang.
+        The root of the repository is normalized in the source path and the arguments,
+          so the clones of the repository share the cache (see load_cached_AST()).
+        :return: file path of the cached AST (without extension)
+        '''
+        hasher = hashlib.sha256()
+        hasher.update(("source:%s\n" % self.normalize_path(self.SOURCE_FILE, self.REPO_PATH)).encode())
+        hasher.update(("args:%s\n" % " ".join(self.normalize_args(_args, self.REPO_PATH))).encode())
+        try:
+            library = os.path.realpath(parser.conf.get_filename())
+            stat = os.stat(library)
+            hasher.update(("libclang:%s:%d:%d\n" % (library, stat.st_size, stat.st_mtime_ns)).encode())
+        except (AttributeError, OSError):
+            hasher.update(("libclang:%s\n" % parser.__file__).encode())
+        with open(self.SOURCE_FILE, "rb") as f:
+            hasher.update(f.read())
+        key = hasher.hexdigest()
+        return os.path.join(_cache_dir, key[:2], key)
+
+    def load_cached_AST(self, _index, _cache_file):
+        '''
+        load the cached AST if all the files included in the AST are not changed
+        The AST stored by a clone of the repository refers to the files of the clone,
+          so it is loaded only if the files of the clone and the same files in this repository are not changed.
+        :return: TranslationUnit, None if there is no valid cache
+        '''
+        try:
+            with open(_cache_file + ".json", "r") as f:
+                data = json.load(f)
+            if isinstance(data.get("files"), dict) is False: return None
+            root = data.get("root")
+            for filepath, (size, mtime) in data["files"].items():
+                paths = [filepath]
+                if root is not None and self.REPO_PATH is not None and root != self.REPO_PATH \
+                        and filepath.startswith(root + os.sep):
+                    paths.append(self.REPO_PATH + filepath[len(root):])
+                for path in paths:
+                    stat = os.stat(path)
+                    if stat.st_size != size or stat.st_mtime_ns != mtime: return None
+            return parser.TranslationUnit.from_ast_file(_cache_file + ".ast", _index)
+        except (OSError, ValueError, TypeError, parser.TranslationUnitLoadError):
+            return None
+
+    def store_cached_AST(self, _cache_file):
+        '''
+        store the AST and the status of the included files into the cache
+        Multiple processes can store the same AST at the same time,
+          so the files are written into temporary files and atomically renamed into the cache.
+        '''
+        files = {}
+        try:
+            for filepath in [self.SOURCE_FILE] + [inc.include.name for inc in self.AST.get_includes()]:
+                stat = os.stat(filepath)
+                files[os.path.abspath(filepath)] = [stat.st_size, stat.st_mtime_ns]
+        except OSError:
+            return False
+
+        cache_dir = os.path.dirname(_cache_file)
+        os.makedirs(cache_dir, exist_ok=True)
+        temp_files = []
+        try:
+            for ext in [".ast", ".json"]:
+                fd, temp_file = tempfile.mkstemp(suffix=".tmp", dir=cache_dir)
+                os.close(fd)
+                temp_files.append(temp_file)
+            self.AST.save(temp_files[0])
+            with open(temp_files[1], "w") as f:
+                json.dump({"root": self.REPO_PATH, "files": files}, f)
+            os.replace(temp_files[0], _cache_file + ".ast")
+            os.replace(temp_files[1], _cache_file + ".json")   # the AST is valid only after the status is stored
+        except (OSError, parser.TranslationUnitSaveError):
+            return False
+        finally:
+            for temp_file in temp_files:
+                if os.path.exists(temp_file): os.remove(temp_file)
+        return True
+
     ############################################################
     # Type definitions
     ############################################################
@@ -108,10 +446,11 @@ class ASTAnalyzer():
         func_definitions = []
         for node in self.AST.cursor.get_children():
             # filter if elem is not the function definition
-            if not (node.kind == CursorKind.FUNCTION_DECL and node.is_definition()): continue
+            if node.kind != CursorKind.FUNCTION_DECL: continue
+            if node.is_definition() is False and self.has_skipped_body(node) is False: continue
 
             # check whether the function is in the given source code
-            if node.location.file.name != self.SOURCE_FILE: continue
+            if node.location.file.name != self.AST_FILE: continue
 
             # add element into definition
             func_definitions.append(node)
@@ -126,7 +465,11 @@ class ASTAnalyzer():
     def get_standard_includes(self):
         """
         libclang has problem locating some standard include. Help it
+        The result is memoized for the process (the probe spawns the compiler)
         """
+        if ASTAnalyzer.STANDARD_INCLUDES is not None:
+            return list(ASTAnalyzer.STANDARD_INCLUDES)
+
         cmd = ["cc", "-E", "-x", "c", "-v", "/dev/null"]
         log = subprocess.check_output(
             cmd,
@@ -145,10 +488,15 @@ class ASTAnalyzer():
             if started:
                 include_dirs.append(line.strip())
 
-        return include_dirs
+        ASTAnalyzer.STANDARD_INCLUDES = include_dirs
+        return list(include_dirs)
 
     def get_includes(self):
-        return self.AST.get_includes()
+        '''
+        :return: list of the file inclusions (the includes in the precompiled header are added as utils.dotdict)
+        '''
+        includes = list(self.AST.get_includes())
+        return includes + [utils.dotdict({"include": name}) for name in self.PCH_INCLUDES]
 
     def traverse(self, _cursor:Cursor, _kind:CursorKind, _name:str=None):
         '''
@@ -0,0 +1,115 @@
+#! /usr/bin/env python3
+
+import os
+import re
+import math
+import shutil
+import tempfile
+import subprocess
+from pipeline.utils import shell
+
+
+class BatchReplay(object):
+    '''
+    Executes a test driver for many inputs with a few process invocations (the batch mode of lib_batch.c)
+        <driver> --batch <manifest_file> <result_file> <timeout_ms>
+    The inputs are split into shards and each shard is executed by one driver process; the shards run concurrently.
+    The driver forks a child for each input, so a crash or a timeout is reported only for the input.
+    The inputs that are not reported by the driver (e.g., a driver built before the batch mode) are executed one by one.
+    '''
+    RECORD_PREFIX = b"#MOTIF-BATCH "
+    TIMEOUT_RETCODE = 124     # the same return code with the `timeout` command
+    ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
+
+    def __init__(self, _driver, _timeout_ms, _shards=0):
+        '''
+        :param _driver: path of the executable test driver
+        :param _timeout_ms: timeout for each input (millisecond)
+        :param _shards: the number of driver processes executed concurrently (0: the number of available CPU cores)
+        '''
+        self.driver = _driver
+        self.timeout_ms = _timeout_ms
+        self.shards = _shards if _shards > 0 else len(os.sched_getaffinity(0))
+
+    def execute(self, _args_list):
+        '''
+        execute the driver with each argument list
+        :param _args_list: list of arguments for each execution (a string or a list of strings, e.g., [input_file, output_dir])
+        :return: list of (return code, output lines) in the same order with _args_list
+        '''
+        args_list = [[args] if isinstance(args, str) else list(args) for args in _args_list]
+        results = [None] * len(args_list)
+
+        # arguments that cannot be written into a manifest line are executed one by one
+        targets = [idx for idx, args in enumerate(args_list)
+                   if all(re.search(r'[\t\r\n]', arg) is None and len(arg) > 0 for arg in args)]
+        if len(targets) > 0:
+            temp_dir = tempfile.mkdtemp(prefix="motif_batch_")
+            try:
+                self.execute_shards(args_list, targets, results, temp_dir)
+            finally:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+
+        for idx, args in enumerate(args_list):
+            if results[idx] is None:
+                results[idx] = self.execute_single(args)
+        return results
+
+    def execute_shards(self, _args_list, _targets, _results, _temp_dir):
+        n_shards = min(self.shards, len(_targets))
+        size = math.ceil(len(_targets) / n_shards)
+        shards = [_targets[idx:idx + size] for idx in range(0, len(_targets), size)]
+
+        processes = []
+        for no, shard in enumerate(shards):
+            manifest = os.path.join(_temp_dir, "manifest.%d.txt" % no)
+            result = os.path.join(_temp_dir, "result.%d.bin" % no)
+            with open(manifest, "w") as f:
+                for idx in shard:
+                    f.write("\t".join(_args_list[idx]) + "\n")
+            cmd = [self.driver, "--batch", manifest, result, str(self.timeout_ms)]
+            process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            processes.append((process, shard, result))
+
+        for process, shard, result in processes:
+            process.wait()
+            for line_no, retcode, lines in self.load_result(result):
+                if 1 <= line_no <= len(shard):
+                    _results[shard[line_no - 1]] = (retcode, lines)
+        return True
+
+    def load_result(self, _result_file):
+        '''
+        load the records of a result file
+        :param _result_file: result file written by the driver
+        :return: list of (line number of the manifest, return code, output lines)
+        '''
+        if os.path.exists(_result_file) is False: return []
+        with open(_result_file, "rb") as f:
+            data = f.read()
+
+        records = []
+        pos = 0
+        while data.startswith(self.RECORD_PREFIX, pos) is True:
+            end = data.find(b"\n", pos)
+            if end < 0: break
+            cols = data[pos + len(self.RECORD_PREFIX):end].split()
+            if len(cols) != 4: break
+            line_no, retcode, timeout, size = [int(col) for col in cols]
+            output = data[end + 1:end + 1 + size]
+            if len(output) != size: break   # the driver was stopped while writing
+            pos = end + 1 + size
+
+            if timeout == 1: retcode = self.TIMEOUT_RETCODE
+            records.append((line_no, retcode, self.split_lines(output)))
+        return records
+
+    def split_lines(self, _output):
+        # same format of the output lines with utils.shell.execute()
+        text = _output.decode("utf-8", errors='ignore')
+        return [self.ansi_escape.sub('', line).strip() for line in text.split("\n")]
+
+    def execute_single(self, _args):
+        timeout_s = math.ceil(self.timeout_ms / 1000)
+        cmd = "timeout %d %s %s" % (timeout_s, self.driver, " ".join(_args))
+        return shell.execute(cmd)
@@ -0,0 +1,122 @@
+#! /usr/bin/env python3
+
+import os
+import json
+import time
+import fcntl
+import socket
+
+
+class BudgetLedger(object):
+    '''
+    Campaign-level fuzzing budget shared by all the run.py executions of a run_list.py invocation
+      (<OUTPUT_PATH>/<JOB_NAME>.budget.json, works both for local and HPC executions through the shared file system)
+
+    Each run.py asks a time grant before fuzzing and returns the time actually used after fuzzing.
+    A grant is a fair share of the remaining budget over the remaining jobs:
+        (total - used by finished jobs - reserved by running jobs) / (jobs that are not finished or running)
+    Since AFL stops as soon as it kills a mutant (AFL_BENCH_UNTIL_CRASH), the time saved by the killed mutants
+    increases the grants of the mutants that are fuzzed later.
+    A grant is limited to FUZZING_TIMEOUT * FUZZING_BUDGET_MAX_FACTOR.
+    '''
+    STALE_MARGIN = 1800     # seconds to regard a running job whose process is gone as finished
+
+    def __init__(self, _ledger_file):
+        self.ledger_file = _ledger_file
+        self.lock_file = _ledger_file + ".lock"
+
+    def create(self, _total, _n_jobs):
+        '''
+        create a new ledger (called by run_list.py)
+        :param _total: total budget in core-seconds
+        :param _n_jobs: the number of fuzzing jobs that share the budget
+        '''
+        ledger = {"total": _total, "n_jobs": _n_jobs, "running": {}, "finished": {}}
+        with self.locked():
+            self.store(ledger)
+        return True
+
+    def exists(self):
+        return os.path.exists(self.ledger_file)
+
+    def acquire(self, _job_id, _base, _max_factor):
+        '''
+        reserve a time grant for the job
+        :param _job_id: job ID
+        :param _base: the default time for a job (FUZZING_TIMEOUT)
+        :param _max_factor: the maximum grant in the multiple of _base
+        :return: granted time in seconds
+        '''
+        with self.locked():
+            ledger = self.load()
+            self.release_stale_jobs(ledger)
+            ledger["finished"].pop(_job_id, None)     # re-execution of the job
+            ledger["running"].pop(_job_id, None)
+
+            used = sum([item["used"] for item in ledger["finished"].values()])
+            reserved = sum([item["granted"] for item in ledger["running"].values()])
+            remains = ledger["n_jobs"] - len(ledger["finished"]) - len(ledger["running"])
+            fair = (ledger["total"] - used - reserved) / max(remains, 1)
+            granted = int(max(min(fair, _base * _max_factor), 1))
+
+            ledger["running"][_job_id] = {"granted": granted, "start": time.time(),
+                                          "host": socket.gethostname(), "pid": os.getpid()}
+            self.store(ledger)
+        return granted
+
+    def release(self, _job_id, _used):
+        '''
+        return the grant of the job and record the time actually used
+        :param _job_id: job ID
+        :param _used: used time in seconds
+        '''
+        with self.locked():
+            ledger = self.load()
+            item = ledger["running"].pop(_job_id, None)
+            granted = item["granted"] if item is not None else None
+            ledger["finished"][_job_id] = {"granted": granted, "used": round(_used, 3)}
+            self.store(ledger)
+        return True
+
+    def release_stale_jobs(self, _ledger):
+        # a running job that exceeds its grant too long is regarded as finished using all its grant
+        now = time.time()
+        for job_id in list(_ledger["running"].keys()):
+            item = _ledger["running"][job_id]
+            if now - item["start"] < item["granted"] + self.STALE_MARGIN: continue
+            del _ledger["running"][job_id]
+            _ledger["finished"][job_id] = {"granted": item["granted"], "used": item["granted"]}
+
+    ##########################################
+    # file access
+    ##########################################
+    def locked(self):
+        return _FileLock(self.lock_file)
+
+    def load(self):
+        with open(self.ledger_file, "r") as f:
+            return json.load(f)
+
+    def store(self, _ledger):
+        os.makedirs(os.path.dirname(os.path.abspath(self.ledger_file)), exist_ok=True)
+        temp_file = "%s.tmp%d" % (self.ledger_file, os.getpid())
+        with open(temp_file, "w") as f:
+            json.dump(_ledger, f, indent=1)
+        os.replace(temp_file, self.ledger_file)
+
+
+class _FileLock(object):
+    def __init__(self, _lock_file):
+        self.lock_file = _lock_file
+        self.fd = None
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.lock_file)), exist_ok=True)
+        self.fd = open(self.lock_file, "w")
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, _type, _value, _traceback):
+        fcntl.flock(self.fd, fcntl.LOCK_UN)
+        self.fd.close()
+        return False
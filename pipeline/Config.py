@@ -66,9 +66,14 @@ class Config(utils.dotdict):
         if _multi is False:
             parser.add_argument('--runID', dest='RUN_ID', type=int, default=None, help='specified run identity to fuzz a mutant')
             parser.add_argument("--input-filter", dest="INPUT_FILTER", type=str, default="A", help="semicolon separated list of input filters for a mutated function (N:negative, Z:zero, P:positive, A:all)\n e.g.: `N;Z`, `N;Z;P`, `A`")
+            parser.add_argument('--job-id', dest='JOB_ID', type=str, default=None, help='job identity given by run_list.py, the result of the execution is recorded in the job journal')
+            parser.add_argument('--batch-mutants', dest='BATCH_MUTANTS', type=str, default=None, help='file that lists mutants of the same source file (the same format with the mutant list), the preprocess phase generates test drivers for all the mutated functions by parsing the source file once')
+            parser.add_argument('--use-budget', dest='USE_BUDGET', action='store_true', help='(boolean) fuzzing time is granted by the campaign budget ledger created by run_list.py (requires --job-id)')
         else:
             parser.add_argument('--runs', dest='RUNS', type=int, default=None, help='number of runs to fuzz a mutant')
             parser.add_argument('--resume', dest='RESUME', type=int, default=1, help='number of job sequence, for HPC execution')
+            parser.add_argument('--rerun-all', dest='RERUN_ALL', action='store_true', help='(boolean) execute all the jobs including the jobs that are already finished successfully according to the job journal')
+            parser.add_argument('--budget', dest='FUZZING_BUDGET', type=float, default=None, help='total fuzzing budget of the campaign in core-hours, the time saved by the early killed mutants is given to the other mutants')
         parser.add_argument('--singularity', dest='SINGULARITY', action='store_true', help='(boolean) paramter whether the pipeline works on HPC or not. on HPC, the command will be executed in Singularity')
         parser.add_argument('--hpc', dest='HPC', action='store_true', help='(boolean) paramter whether the pipeline works on HPC or not. on HPC, the command will be executed in Singularity')
         # following parameters for the run_list.py, but run.py uses them for storing temporary files into the SSD (non-network drive)
@@ -76,9 +81,12 @@ class Config(utils.dotdict):
         if _multi is True:
             parser.add_argument('--parallel-nodes', dest='N_PARALLELS_PER_JOB', type=int, default=None, help='(integer) number of tasks to be executed in parallel')
             parser.add_argument('--parallel-ntasks', dest='N_TASKS_PER_JOB', type=int, default=None, help='(integer) number of tasks to be executed in one parallel job')
+            parser.add_argument('--local-jobs', dest='LOCAL_JOBS', type=int, default=None, help='(integer) number of run.py commands to be executed simultaneously in the local machine (without sbatch)')
 
         # following parameters for the run.py but run_list.py can provide
         parser.add_argument('--timeout', dest='FUZZING_TIMEOUT', type=int, default=None, help='timeout for fuzzing in seconds (e.g., 3600*3 for 3 hours)')
+        parser.add_argument('--concurrent-jobs', dest='CONCURRENT_JOBS', type=int, default=None, help='(integer) number of run.py commands executed together in the machine (run_list.py --local-jobs), they share the CPU cores for the compilations')
+        parser.add_argument('--instances', dest='FUZZER_INSTANCES', type=int, default=None, help='(integer) number of AFL++ instances (one main and the others secondary) that fuzz a mutant together')
         parser.add_argument('--uncompress', dest='UNCOMPRESS_RESULT', action='store_true', help='(boolean) Uncompress the experiment results')
         parser.add_argument('--overwrite', dest='OVERWRITE', action='store_true', help='(boolean) Uncompress the experiment results')
 
@@ -193,10 +201,38 @@ class Config(utils.dotdict):
         #    if it is not provided from _params, it should be None.
         if self.has_value("RUNS") is False:         self.RUNS = None
         if self.has_value("RUN_ID") is False:       self.RUN_ID = None
+        if self.has_value("JOB_ID") is False:       self.JOB_ID = None
+        if self.has_value("USE_BUDGET") is False:   self.USE_BUDGET = False
+        if self.has_value("FUZZING_BUDGET") is False:   self.FUZZING_BUDGET = None
+        if self.has_value("FUZZING_BUDGET_MAX_FACTOR") is False:   self.FUZZING_BUDGET_MAX_FACTOR = 4
         if self.has_value("STEP") is False:         self.STEP = None
         if self.has_value("STEP_FROM") is False:    self.STEP_FROM = None
         if self.has_value("DEPENDENCY") is False:    self.DEPENDENCY = None
         if self.has_value("SBATCH_PARAMETERS") is False:    self.SBATCH_PARAMETERS = ""
+        if self.has_value("LOCAL_JOBS") is False:   self.LOCAL_JOBS = 1
+        if self.has_value("BATCH_MUTANTS") is False:       self.BATCH_MUTANTS = None
+        if self.has_value("PREPROCESS_BATCH") is False:    self.PREPROCESS_BATCH = False
+        if self.has_value("SUT_OBJECT_CACHE") is False:    self.SUT_OBJECT_CACHE = None
+        if self.has_value("AST_CACHE") is False:           self.AST_CACHE = None
+        if self.has_value("FAST_PARSE") is False:          self.FAST_PARSE = False
+        if self.has_value("PCH_CACHE") is False:           self.PCH_CACHE = None
+        if self.has_value("MUTANT_DIFF_EXTRACTION") is False:  self.MUTANT_DIFF_EXTRACTION = False
+        if self.has_value("INPUT_STORE") is False:         self.INPUT_STORE = None
+        if self.has_value("REPO_LINK_FARM") is False:      self.REPO_LINK_FARM = False
+        if self.has_value("SCHEMATA_BUILD") is False:      self.SCHEMATA_BUILD = False
+        if self.has_value("SUT_ARCHIVE") is False:         self.SUT_ARCHIVE = False
+        if self.has_value("COMPILE_JOBS") is False:        self.COMPILE_JOBS = 1
+        if self.has_value("COMPILE_MAKE_JOBS") is False:   self.COMPILE_MAKE_JOBS = False
+        if self.has_value("CONCURRENT_JOBS") is False:     self.CONCURRENT_JOBS = 1
+        if self.has_value("TEMPLATE_PERSISTENT_DRIVER") is False:  self.TEMPLATE_PERSISTENT_DRIVER = "template_fuzzing_persistent.c.jinja2"
+        if self.has_value("FUZZING_PERSISTENT_MODE") is False:     self.FUZZING_PERSISTENT_MODE = False
+        if self.has_value("FUZZING_PERSISTENT_LOOP") is False:     self.FUZZING_PERSISTENT_LOOP = 10000
+        if self.has_value("FUZZING_SHMEM_TESTCASE") is False:      self.FUZZING_SHMEM_TESTCASE = False
+        if self.has_value("FUZZING_EXECUTION_LOG") is False:       self.FUZZING_EXECUTION_LOG = "csv"
+        if self.has_value("FUZZER_INSTANCES") is False:    self.FUZZER_INSTANCES = 1
+        if self.has_value("FUZZER_CPU_BINDING") is False:  self.FUZZER_CPU_BINDING = False
+        if self.has_value("BATCH_REPLAY") is False:        self.BATCH_REPLAY = False
+        if self.has_value("BATCH_REPLAY_SHARDS") is False: self.BATCH_REPLAY_SHARDS = 0
 
         # specify special options
         # if parallel is on, HPC is on automatically
@@ -217,6 +253,14 @@ class Config(utils.dotdict):
         self.REPO_FILE      = utils.makepath(self.EXP_BASE, self.REPO_FILE)
         self.REPO_PATH      = utils.makepath(self.EXP_BASE, self.REPO_PATH)
         self.MUTANTS_FILE   = utils.makepath(self.EXP_BASE, self.MUTANTS_FILE)
+        if self.SUT_OBJECT_CACHE is not None:
+            self.SUT_OBJECT_CACHE = utils.makepath(self.EXP_BASE, self.SUT_OBJECT_CACHE)
+        if self.AST_CACHE is not None:
+            self.AST_CACHE = utils.makepath(self.EXP_BASE, self.AST_CACHE)
+        if self.PCH_CACHE is not None:
+            self.PCH_CACHE = utils.makepath(self.EXP_BASE, self.PCH_CACHE)
+        if self.INPUT_STORE is not None:
+            self.INPUT_STORE = utils.makepath(self.EXP_BASE, self.INPUT_STORE)
 
         # setting OUTPUT_PATH
         self.OUTPUT_PATH = utils.makepath(self.EXP_BASE, self.EXP_NAME)
@@ -242,6 +286,11 @@ class Config(utils.dotdict):
         if self.has_value('PHASE'):
             self.JOB_NAME = "%s-%s" % (self.JOB_NAME, self.PHASE.lower())
 
+        # job manifest and completion journal (see JobJournal)
+        self.JOB_MANIFEST = utils.makepath(self.OUTPUT_PATH, "%s.jobs.jsonl" % self.JOB_NAME)
+        self.JOB_JOURNAL = utils.makepath(self.OUTPUT_PATH, "%s.journal.jsonl" % self.JOB_NAME)
+        self.JOB_BUDGET = utils.makepath(self.OUTPUT_PATH, "%s.budget.json" % self.JOB_NAME)
+
         # HPC log output path setting
         self.HPC_LOG_PATH = utils.makepath(self.OUTPUT_PATH, self.HPC_LOG_PREFIX)
         if self.has_value('EXP_TAG_NAME'):
@@ -264,17 +313,25 @@ class Config(utils.dotdict):
         del self['TESTCASE_OUTPUT_NAME']
         pass
 
-    def configure_mutant_information(self, _mutant_name, _input_filter):
-        # configure MUTANT information
-        # If the mutant has only the mutant name, get the whole path in the case study mutants folder
-        if os.path.dirname(_mutant_name) == "":
-            target = utils.find_fullpath_in_tar(_mutant_name, self.MUTANTS_FILE) #, '*.%s.*.c'%self.MUTANT_FUNC_PREFIX)
-            if target is None:
-                utils.error_exit("Cannot find the mutant in the MUTANTS_FILE: %s"% _mutant_name)
-            _mutant_name = target
+    def configure_mutant_information(self, _mutant_name, _input_filter, _mutant=None):
+        '''
+        :param _mutant_name: mutant file name or its path in the MUTANTS_FILE
+        :param _input_filter: input filter for the mutant (e.g., "A", "N;Z")
+        :param _mutant: Mutant object already parsed for the mutant (the _mutant_name is not searched and parsed again)
+        '''
+        if _mutant is not None:
+            self.MUTANT = _mutant
+        else:
+            # configure MUTANT information
+            # If the mutant has only the mutant name, get the whole path in the case study mutants folder
+            if os.path.dirname(_mutant_name) == "":
+                target = utils.find_fullpath_in_tar(_mutant_name, self.MUTANTS_FILE) #, '*.%s.*.c'%self.MUTANT_FUNC_PREFIX)
+                if target is None:
+                    utils.error_exit("Cannot find the mutant in the MUTANTS_FILE: %s"% _mutant_name)
+                _mutant_name = target
 
-        # Parsing mutant information
-        self.MUTANT = Mutant.parse(_mutant_name)
+            # Parsing mutant information
+            self.MUTANT = Mutant.parse(_mutant_name)
 
         # set input filter for a function
         self.INPUT_FILTER_ALL = ["negative", "zero", "positive"]
@@ -308,6 +365,11 @@ class Config(utils.dotdict):
         if self.PHASE not in valid_phases:
             utils.error_exit("The pipeline has no `%s` phase. Please select one of the %s" % (self.PHASE, str(valid_phases)))
 
+        # check the format of the execution journal
+        valid_formats = ["csv", "binary", "counters"]
+        if self.FUZZING_EXECUTION_LOG not in valid_formats:
+            utils.error_exit("Unknown FUZZING_EXECUTION_LOG `%s`. Please select one of the %s" % (self.FUZZING_EXECUTION_LOG, str(valid_formats)))
+
         # verify repository directory
         if os.path.exists(self.EXP_BASE) is False:
             utils.error_exit("failed to find BASE working directory: %s" % self.EXP_BASE)
@@ -412,6 +474,8 @@ class Config(utils.dotdict):
         print("  - FUZZER                : %s" % self.FUZZER_FILEPATH)
         print("  - COMPILER              : %s" % self.COMPILER_FILEPATH)
         print("  - TEST_EXEC_TIMEOUT     : %d" % self.TEST_EXEC_TIMEOUT)
+        print("  - BATCH_REPLAY          : %s (shards: %s)" % (self.BATCH_REPLAY, self.BATCH_REPLAY_SHARDS))
+        print("  - FUZZER_INSTANCES      : %s (CPU binding: %s)" % (self.FUZZER_INSTANCES, self.FUZZER_CPU_BINDING))
         print("  - FUZZER_PRINT_LOG_DETAILS: %s" % self.FUZZER_PRINT_LOG_DETAILS)
         print("  - FUZZER_PRINT_INPUTS   : %s" % self.FUZZER_PRINT_INPUTS)
         print("  - FUZZER_PRINT_CRASHES  : %s" % self.FUZZER_PRINT_CRASHES)
@@ -419,6 +483,9 @@ class Config(utils.dotdict):
         print("  - TEMPLATE_ROOT_DIR       : %s" % self.TEMPLATE_ROOT_DIR)
         print("  - TEMPLATE_FUZZING_DRIVER : %s" % self.TEMPLATE_FUZZING_DRIVER)
         print("  - TEMPLATE_PRESENTER_DRIVER: %s" % self.TEMPLATE_PRESENTER_DRIVER)
+        print("  - FUZZING_PERSISTENT_MODE : %s (loop: %s)" % (self.FUZZING_PERSISTENT_MODE, self.FUZZING_PERSISTENT_LOOP))
+        print("  - FUZZING_SHMEM_TESTCASE  : %s" % self.FUZZING_SHMEM_TESTCASE)
+        print("  - FUZZING_EXECUTION_LOG   : %s" % self.FUZZING_EXECUTION_LOG)
         print("  - TEMPLATE_TESTCASE_DRIVER: %s" % self.TEMPLATE_TESTCASE_DRIVER)
         print("  - TEMPLATE_CONFIG         : %s" % self.TEMPLATE_CONFIG)
         print("[SUT Compilation]")
@@ -427,6 +494,14 @@ class Config(utils.dotdict):
         print("  - COMPILE_SUT_FILES       : %s" % self.COMPILE_SUT_FILES)
         print("  - COMPILE_SUT_CMDS        : %s" % self.COMPILE_SUT_CMDS)
         print("  - COMPILED_OBJECTS        : %s" % self.COMPILED_OBJECTS)
+        print("  - SUT_OBJECT_CACHE        : %s" % self.SUT_OBJECT_CACHE)
+        print("  - AST_CACHE               : %s" % self.AST_CACHE)
+        print("  - FAST_PARSE              : %s (PCH_CACHE: %s)" % (self.FAST_PARSE, self.PCH_CACHE))
+        print("  - MUTANT_DIFF_EXTRACTION  : %s" % self.MUTANT_DIFF_EXTRACTION)
+        print("  - INPUT_STORE             : %s" % self.INPUT_STORE)
+        print("  - SCHEMATA_BUILD          : %s" % self.SCHEMATA_BUILD)
+        print("  - SUT_ARCHIVE             : %s" % self.SUT_ARCHIVE)
+        print("  - COMPILE_JOBS            : %s (make: %s, concurrent run.py: %s)" % (self.COMPILE_JOBS, self.COMPILE_MAKE_JOBS, self.CONCURRENT_JOBS))
         print("[Executions]")
         print("  - PHASE                 : %s" % self.PHASE)
         print("  - EXP_NAME              : %s" % self.EXP_NAME)
@@ -440,12 +515,21 @@ class Config(utils.dotdict):
         print("  - SINGULARITY           : %s" % self.SINGULARITY)
         print("  - SINGULARITY_FILE      : %s" % self.SINGULARITY_FILE)
         print("  - FUZZING_TIMEOUT       : %s" % self.FUZZING_TIMEOUT)
+        if _multi is True:
+            print("  - FUZZING_BUDGET        : %s" % self.FUZZING_BUDGET)
+        else:
+            print("  - USE_BUDGET            : %s" % self.USE_BUDGET)
+        print("  - FUZZING_BUDGET_MAX_FACTOR: %s" % self.FUZZING_BUDGET_MAX_FACTOR)
         print("  - COMPRESS_RESULT       : %s" % self.COMPRESS_RESULT)
         if _multi is False:
             print("  - RUN_ID                : %s" % self.RUN_ID)
+            print("  - JOB_ID                : %s" % self.JOB_ID)
+            print("  - BATCH_MUTANTS         : %s" % self.BATCH_MUTANTS)
         else:
             print("  - Number of RUNS        : %s" % self.RUNS)
             print("  - RESUME                : %s" % self.RESUME)
+            print("  - RERUN_ALL             : %s" % self.RERUN_ALL)
+            print("  - JOB_JOURNAL           : %s" % self.JOB_JOURNAL)
 
         #### showing mutant information
         if _multi is False:
@@ -464,6 +548,7 @@ class Config(utils.dotdict):
         # print("  - HPC_BUILD_BASE        : %s" % self.HPC_BUILD_BASE)
         # print("  - HPC_EXEC_BASE         : %s" % self.HPC_EXEC_BASE)
         print("  - HPC_WORK_PATH         : %s" % self.HPC_WORK_PATH)
+        print("  - REPO_LINK_FARM        : %s" % self.REPO_LINK_FARM)
         print("  - LOG_FILE_NAME         : %s" % self.LOG_FILE_NAME)
         print("  - SBATCH_PARAMETERS     : %s" % self.SBATCH_PARAMETERS)
         print("[Parallel settings]")
@@ -471,6 +556,8 @@ class Config(utils.dotdict):
         print("  - JOB_NAME              : %s" % self.JOB_NAME)
         print("  - N_TASKS_PER_JOB       : %s" % self.N_TASKS_PER_JOB)
         print("  - N_PARALLELS_PER_JOB   : %s" % self.N_PARALLELS_PER_JOB)
+        print("  - LOCAL_JOBS            : %s" % self.LOCAL_JOBS)
+        print("  - PREPROCESS_BATCH      : %s" % self.PREPROCESS_BATCH)
         print("  - REPORT_EMAIL          : %s" % self.REPORT_EMAIL)
         print("  - SBATCH_PARAMETERS     : %s" % self.SBATCH_PARAMETERS)
         print("  - PYTHON_CMD            : %s" % self.PYTHON_CMD)
@@ -600,11 +687,11 @@ class Config(utils.dotdict):
             # remove not used parameters in run.py
             idx = 0
             while idx < len(args):
-                if args[idx] in ["--runs", "--resume", "--dependency", "--parallel-ntasks", "--parallel-nodes", "--sbatch"]:
+                if args[idx] in ["--runs", "--resume", "--dependency", "--parallel-ntasks", "--parallel-nodes", "--sbatch", "--local-jobs", "--budget"]:
                     del args[idx+1]  # value of the parameter
                     del args[idx]    # parameter key
                     continue
-                if args[idx] in ["--hpc", "--dry", "--singularity"]:
+                if args[idx] in ["--hpc", "--dry", "--singularity", "--rerun-all"]:
                     del args[idx]    # parameter key
                     continue
                 idx += 1
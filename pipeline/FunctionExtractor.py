@@ -1,7 +1,10 @@
 #! /usr/bin/env python3
 import os
 import re
+import json
+import hashlib
 import argparse
+from clang.cindex import TypeKind
 
 if __package__ is None or __package__ == "":
     import utils
@@ -21,16 +24,23 @@ class FunctionExtractor(object):
     PREFIX_FUNCTION_NAME = None
     POSTFIX_FUNCTION_NAME = None
     COMPILATION_FLAGS = None
+    CACHE_DIR = None        # directory of the caches for the original source files (None: parse the source code every time)
+                            #   the input files (mutants) are unique, so their ASTs are not cached
+    REPO_PATH = None        # root of the repository (the cache keys do not depend on it, see ASTAnalyzer)
+    EXTENTS = {}            # function extents of the original source files {cache key: {func: [start, end]}}
+    STRUCTURE_TOKENS = ["{", "}", "\"", "'", "/*", "*/", "//", "#", "\\"]   # tokens that can change the function boundaries
 
-    def __init__(self, _compilation_flags:str, _prefix=None, _postfix=None):
+    def __init__(self, _compilation_flags:str, _prefix=None, _postfix=None, _cache_dir=None, _repo_path=None):
         self.COMPILATION_FLAGS = _compilation_flags
+        self.CACHE_DIR = _cache_dir
+        self.REPO_PATH = _repo_path
         self.PREFIX_FUNCTION_NAME = _prefix
         self.POSTFIX_FUNCTION_NAME = _postfix
         pass
 
-    def extract(self, _input_file, _func, _output_file):
+    def extract(self, _input_file, _func, _output_file, _offsets=None):
         # get start and end offsets of target function
-        start, end = self.get_function_offsets(_input_file, _func)
+        start, end = self.get_function_offsets(_input_file, _func) if _offsets is None else _offsets
 
         # get entire source code
         code = self.get_source_code(_input_file)
@@ -54,7 +64,7 @@ class FunctionExtractor(object):
 
     def get_function_offsets(self, _input_file, _func):
         # extract code
-        ast = ASTAnalyzer(_input_file, self.COMPILATION_FLAGS)
+        ast = ASTAnalyzer(_input_file, self.COMPILATION_FLAGS, _repo_path=self.REPO_PATH)
 
         # finds all the AST of functions in the code
         func_decls = ast.get_function_decls()
@@ -68,12 +78,121 @@ class FunctionExtractor(object):
         if target_func is None: return (None, None)
 
         # return offsets
-        start = target_func.extent.start.offset
-        end = target_func.extent.end.offset
+        start, end = ast.get_function_extent(target_func)
         return (start, end)
 
+    def extract_by_diff(self, _origin_file, _input_file, _func, _output_file, _src_path=None):
+        '''
+        extract the function from a mutant without parsing the mutant
+        The function extent in the original source file is mapped onto the mutant by the edited range between them
+        :param _origin_file: original source file of the mutant
+        :param _src_path: path of the original source file in the repository (e.g., Mutant.src_path)
+        :return: False if the edit may change the boundaries of the function (use extract() instead)
+        '''
+        offsets = self.get_function_offsets_by_diff(_origin_file, _input_file, _func, _src_path)
+        if offsets is None: return False
+        return self.extract(_input_file, _func, _output_file, _offsets=offsets)
+
+    def get_function_offsets_by_diff(self, _origin_file, _input_file, _func, _src_path=None):
+        '''
+        :return: (start, end) offsets of the function in the _input_file, None if the offsets cannot be mapped
+        '''
+        origin = self.get_source_code(_origin_file)
+        mutant = self.get_source_code(_input_file)
+        if "\r" in origin: return None      # the mutant is converted into LF
+
+        extents = self.get_function_extents(_origin_file, origin, _src_path)
+        if _func not in extents or extents[_func][1] is None: return None
+        start, end = extents[_func]
+
+        # edited range: the codes share the prefix before it and the suffix after it
+        prefix = len(os.path.commonprefix([origin, mutant]))
+        if prefix == len(origin) and prefix == len(mutant): return (start, end)
+        limit = min(len(origin), len(mutant)) - prefix
+        suffix = 0
+        while suffix < limit and origin[-1-suffix] == mutant[-1-suffix]:
+            suffix += 1
+        origin_edit = origin[prefix:len(origin) - suffix]
+        mutant_edit = mutant[prefix:len(mutant) - suffix]
+
+        # the edit should be inside the function (keeping the first and the last characters of the function)
+        if prefix <= start or len(origin) - suffix >= end: return None
+        for token in self.STRUCTURE_TOKENS:
+            if origin_edit.count(token) != mutant_edit.count(token): return None
+        return (start, end + len(mutant) - len(origin))
+
+    def get_function_extents(self, _source_file, _code=None, _src_path=None):
+        '''
+        get the extents of all the functions in the source file (it is parsed only once for the same code)
+        The extents are stored in CACHE_DIR, the key is the hash of the code, the source path and the compilation flags
+          (the root of the repository is normalized, so the clones of the repository share the extents)
+        :param _src_path: path of the source file in the repository (None: the _source_file under REPO_PATH)
+        :return: {function name: [start, end]}
+        '''
+        code = self.get_source_code(_source_file) if _code is None else _code
+        src_path = ASTAnalyzer.normalize_path(_source_file, self.REPO_PATH) if _src_path is None else _src_path
+        flags = " ".join(ASTAnalyzer.normalize_args(self.COMPILATION_FLAGS.split(), self.REPO_PATH))
+        key = hashlib.sha256(("flags:%s\nsource:%s\n%s" % (flags, src_path, code)).encode()).hexdigest()
+        if key in self.EXTENTS: return self.EXTENTS[key]
+
+        cache_file = None
+        if self.CACHE_DIR is not None:
+            cache_file = os.path.join(self.CACHE_DIR, key[:2], key + ".extents.json")
+            try:
+                with open(cache_file, "r") as f:
+                    self.EXTENTS[key] = json.load(f)
+                return self.EXTENTS[key]
+            except (OSError, ValueError):
+                pass
+
+        ast = ASTAnalyzer(_source_file, self.COMPILATION_FLAGS, _cache_dir=self.CACHE_DIR,
+                          _repo_path=self.REPO_PATH)
+        func_decls = ast.get_function_decls()
+        if func_decls is None: return {}
+        extents = {}
+        for func_decl in func_decls:
+            extents.setdefault(func_decl.spelling, list(ast.get_function_extent(func_decl)))
+        self.EXTENTS[key] = extents
+
+        if cache_file is not None:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            temp_file = "%s.%d.tmp" % (cache_file, os.getpid())
+            with open(temp_file, "w") as f:
+                json.dump(extents, f)
+            os.replace(temp_file, cache_file)
+        return extents
+
+    def get_function_signature(self, _input_file, _func):
+        '''
+        get the signature of the function to make a function that forwards the same parameters
+        :return: dict {"header": declaration text before the body (renamed by the prefix and postfix),
+                       "void": whether the return type is void, "args": list of parameter names}
+                 None if the function is not found, variadic or has unnamed parameters
+        '''
+        ast = ASTAnalyzer(_input_file, self.COMPILATION_FLAGS, _repo_path=self.REPO_PATH)
+        target_func = None
+        for func_decl in ast.get_function_decls():
+            if func_decl.spelling != _func: continue
+            target_func = func_decl
+            break
+        if target_func is None: return None
+        if target_func.type.kind == TypeKind.FUNCTIONPROTO and target_func.type.is_function_variadic(): return None
+
+        # the declaration part is located before the function body
+        body_start = ast.get_body_start(target_func)
+        if body_start is None: return None
+        code = self.get_source_code(_input_file)
+        header = code[target_func.extent.start.offset:body_start].strip()
+
+        args = [arg.spelling for arg in target_func.get_arguments()]
+        if "" in args: return None
+        return {"header": self.change_function_name(_func, " " + header).strip(),
+                "void": target_func.result_type.kind == TypeKind.VOID,
+                "args": args}
+
     def get_source_code(self, _filename):
-        f = open(_filename, "r")
+        # the newlines are not converted, so the offsets of libclang are valid for the code (e.g., CRLF files)
+        f = open(_filename, "r", newline="")
         code = f.read()
         f.close()
         return code
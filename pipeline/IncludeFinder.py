@@ -4,13 +4,20 @@ import chardet
 
 if __package__ is None or __package__ == "":
     import utils
-    from ASTAnalyzer import ASTAnalyzer
     from CParser import CommentsParser
 else:
     from pipeline import utils
-    from pipeline.ASTAnalyzer import ASTAnalyzer
     from pipeline.CParser import CommentsParser
 
+# libclang is necessary only for selecting the headers with an AST
+try:
+    if __package__ is None or __package__ == "":
+        from ASTAnalyzer import ASTAnalyzer
+    else:
+        from pipeline.ASTAnalyzer import ASTAnalyzer
+except ImportError:
+    ASTAnalyzer = None
+
 
 class IncludeFinder():
     '''
@@ -47,6 +54,16 @@ class IncludeFinder():
         self.locals = self.__select_preprocessed_header_files(self.locals)
         pass
 
+    @classmethod
+    def from_headers(cls, _globals:list, _locals:list):
+        '''
+        make a finder with the header files found before (e.g., the includes in a prototype artifact)
+        '''
+        finder = cls.__new__(cls)
+        finder.globals = list(_globals)
+        finder.locals = list(_locals)
+        return finder
+
     def exclude(self, _file=None, _code=None):
         if _file is not None:
             _code = self.__load_code(_file)
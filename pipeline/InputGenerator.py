@@ -4,12 +4,19 @@ import re
 import struct
 
 if __package__ is None or __package__ == "":
-    from Prototype import Prototype
     import utils
 else:
-    from pipeline.Prototype import Prototype
     from pipeline import utils
 
+# Prototype is only for the type hint (the generator also takes PrototypeArtifact, which does not need libclang)
+try:
+    if __package__ is None or __package__ == "":
+        from Prototype import Prototype
+    else:
+        from pipeline.Prototype import Prototype
+except ImportError:
+    Prototype = None
+
 
 class InputGenerator():
     PARAMETER_FORMAT = [     # optional
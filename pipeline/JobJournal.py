@@ -0,0 +1,88 @@
+#! /usr/bin/env python3
+
+import os
+import json
+import time
+import fcntl
+import socket
+import hashlib
+
+
+class JobJournal(object):
+    '''
+    Job manifest and completion journal for the multiple runs (run_list.py)
+      - manifest (<OUTPUT_PATH>/<JOB_NAME>.jobs.jsonl): one job per line {"id", "phase", "mutant", "runID", "cmd"}
+      - journal (<OUTPUT_PATH>/<JOB_NAME>.journal.jsonl): append-only records of finished jobs
+                                                        {"id", "status", "duration", "time", "host"}
+    The job ID is derived from the phase, the mutant and the runID, so it is stable between invocations.
+    The last record of a job in the journal decides its status.
+    '''
+    SUCCESS = "success"
+    FAILED = "failed"
+
+    def __init__(self, _manifest_file, _journal_file):
+        self.manifest_file = _manifest_file
+        self.journal_file = _journal_file
+
+    @staticmethod
+    def make_job_id(_phase, _mutant, _runID=None):
+        key = "%s|%s|%s" % (_phase, _mutant, _runID if _runID is not None else "")
+        return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+    def store_manifest(self, _jobs):
+        '''
+        :param _jobs: list of jobs (dict that has "id", "phase", "mutant", "runID" and "cmd")
+        '''
+        os.makedirs(os.path.dirname(os.path.abspath(self.manifest_file)), exist_ok=True)
+        with open(self.manifest_file, "w") as f:
+            for job in _jobs:
+                f.write(json.dumps(job) + "\n")
+        return self.manifest_file
+
+    def record(self, _job_id, _status, _duration, _extra=None):
+        '''
+        append a record of the finished job into the journal
+        Multiple processes (even on different nodes) append records at the same time, so the journal is locked.
+        :param _extra: dict of additional information of the job (e.g., granted fuzzing time)
+        '''
+        item = {"id": _job_id, "status": _status, "duration": round(_duration, 3),
+                "time": time.strftime("%Y-%m-%d %H:%M:%S"), "host": socket.gethostname()}
+        if _extra is not None: item.update(_extra)
+        os.makedirs(os.path.dirname(os.path.abspath(self.journal_file)), exist_ok=True)
+        with open(self.journal_file, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.write(json.dumps(item) + "\n")
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        return True
+
+    def load_status(self):
+        '''
+        :return: dict {job_id: the last record of the job}
+        '''
+        status = {}
+        if os.path.exists(self.journal_file) is False: return status
+        with open(self.journal_file, "r") as f:
+            for line in f:
+                line = line.strip()
+                if line == "": continue
+                try:
+                    item = json.loads(line)
+                except ValueError:
+                    continue    # a broken line by a killed process
+                status[item["id"]] = item
+        return status
+
+    def get_pending_jobs(self, _jobs):
+        '''
+        :param _jobs: list of jobs
+        :return: list of jobs that are not finished successfully (missing or failed)
+        '''
+        status = self.load_status()
+        pending = []
+        for job in _jobs:
+            if job["id"] in status and status[job["id"]]["status"] == self.SUCCESS: continue
+            pending.append(job)
+        return pending
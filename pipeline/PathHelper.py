@@ -1,6 +1,7 @@
 import os
 from pipeline import utils
 from pipeline import Config
+from pipeline.PrototypeArtifact import PrototypeArtifact
 
 
 class PathHelper():
@@ -13,6 +14,7 @@ class PathHelper():
     EXPECTED_PREFIX = "expected"              #
     TESTCASE_PREFIX = "testcase"              #
     FALSE_POSITIVE_PREFIX = "false"           # driver for the false positive checking
+    SCHEMATA_DIR = "__schemata__"             # directory for the mutant schemata build
     # DEPENDENCY_PREFIX = "dependency"          # driver for the dependency checking
 
 
@@ -102,6 +104,10 @@ class PathHelper():
         if _appendix != "": _appendix = "." + _appendix
         return utils.makepath(_path, _func_name + _appendix + '.' + self.FUNCTION_DRIVER_EXT)
 
+    def get_prototype_artifact_path(self):
+        # analysis result of the mutated function stored in the preprocess phase (see PrototypeArtifact)
+        return utils.makepath(self.get_func_driver_path(), config.MUTANT.func + PrototypeArtifact.EXT)
+
     def get_executable_driver_path(self, _appendix=""):
         if _appendix != "": _appendix = "." + _appendix
         return utils.makepath(config.MUTANT_BIN_PATH,
@@ -109,6 +115,21 @@ class PathHelper():
                               config.MUTANT.name + _appendix + "." + self.OBJECT_DRIVER_EXT)
 
 
+    #############################
+    # mutant schemata paths (one build for all the mutants of a function)
+    def get_schemata_path(self):
+        return utils.makepath(config.MUTANT_BIN_PATH, config.MUTANT.dir_path, self.SCHEMATA_DIR, config.MUTANT.func)
+
+    def get_schemata_map_file(self):
+        return utils.makepath(self.get_schemata_path(), config.MUTANT.func + ".schemata.json")
+
+    def get_schemata_driver_path(self, _appendix=""):
+        if _appendix != "": _appendix = "." + _appendix
+        return utils.makepath(self.get_schemata_path(), config.MUTANT.func + _appendix + "." + self.OBJECT_DRIVER_EXT)
+
+    def get_schemata_func_path(self):
+        return utils.makepath(config.MUTANT_FUNC_PATH, config.MUTANT.dir_path, self.SCHEMATA_DIR, config.MUTANT.func)
+
     #############################
     # HPC related path
     def get_HPC_temporary_path(self, _output_dir):
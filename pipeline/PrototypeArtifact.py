@@ -0,0 +1,90 @@
+#! /usr/bin/env python3
+import os
+import copy
+import json
+import hashlib
+
+
+class PrototypeArtifact(object):
+    '''
+    Result of the function analysis (Prototype) stored by the preprocess phase as a JSON file
+    (<FUNC_DRIVER_PATH>/<dir>/<func>/<func>.prototype.json)
+    The later phases load this artifact to generate drivers and test cases without parsing the source code,
+      so they do not need libclang.
+    This class provides the same interface with Prototype for TemplateGenerator and InputGenerator:
+      name, prototype, params, returns, get_driver_dict() and get_param_info_list()
+
+    The artifact is valid only for the same source code and the same TEMPLATE_CONFIG:
+    {"version": VERSION, "source_hash": ..., "config_hash": ...,
+     "function": Prototype.get_driver_dict(), "param_info": Prototype.get_param_info_list(),
+     "returns_type": type of the return value in the code,
+     "includes": {"global": [...], "local": [...]} (headers of the source file, see IncludeFinder)}
+    '''
+    VERSION = 1
+    EXT = ".prototype.json"
+
+    def __init__(self, _data:dict):
+        self.data = _data
+        self.name = _data["function"]["name"]
+        self.prototype = _data["function"]["prototype"]
+        self.params = _data["function"]["params"]
+        self.returns = {"type": _data["returns_type"]}
+        self.includes = _data["includes"]
+
+    def get_driver_dict(self):
+        return copy.deepcopy(self.data["function"])
+
+    def get_param_info_list(self):
+        return copy.deepcopy(self.data["param_info"])
+
+    @staticmethod
+    def get_hashes(_source_file, _template_config):
+        with open(_source_file, "rb") as f:
+            source_hash = hashlib.sha256(f.read()).hexdigest()
+        config_hash = hashlib.sha256(json.dumps(_template_config, sort_keys=True, default=str).encode()).hexdigest()
+        return source_hash, config_hash
+
+    @staticmethod
+    def store(_artifact_file, _prototype, _includes:dict, _source_file, _template_config):
+        '''
+        store the analysis result of the _prototype
+        :param _artifact_file: output file path
+        :param _prototype: Prototype object
+        :param _includes: headers of the source file {"global": [...], "local": [...]}
+        :param _source_file: the source file that defines the function
+        :param _template_config: TEMPLATE_CONFIG used to analyze the function
+        :return:
+        '''
+        source_hash, config_hash = PrototypeArtifact.get_hashes(_source_file, _template_config)
+        data = {
+            "version": PrototypeArtifact.VERSION,
+            "source_hash": source_hash,
+            "config_hash": config_hash,
+            "function": _prototype.get_driver_dict(),
+            "param_info": _prototype.get_param_info_list(),
+            "returns_type": _prototype.returns["type"],
+            "includes": _includes,
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(_artifact_file)), exist_ok=True)
+        temp_file = _artifact_file + ".tmp"
+        with open(temp_file, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(temp_file, _artifact_file)
+        return True
+
+    @staticmethod
+    def load(_artifact_file, _source_file, _template_config):
+        '''
+        load the artifact if it is valid for the source file and the template configuration
+        :return: PrototypeArtifact object, None if the artifact does not exist or is not valid
+        '''
+        try:
+            with open(_artifact_file, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if data.get("version") != PrototypeArtifact.VERSION: return None
+        source_hash, config_hash = PrototypeArtifact.get_hashes(_source_file, _template_config)
+        if data.get("source_hash") != source_hash or data.get("config_hash") != config_hash: return None
+        return PrototypeArtifact(data)
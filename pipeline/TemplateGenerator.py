@@ -11,20 +11,30 @@ import jinja2
 from jinja2 import Environment, select_autoescape
 
 if __package__ is None or __package__ == "":
-    from ASTAnalyzer import ASTAnalyzer
-    from Prototype import Prototype
     from IncludeFinder import IncludeFinder
+    from PrototypeArtifact import PrototypeArtifact
     from Config import Config
     import compile
     import utils
 else:
-    from pipeline.ASTAnalyzer import ASTAnalyzer
-    from pipeline.Prototype import Prototype
     from pipeline.IncludeFinder import IncludeFinder
+    from pipeline.PrototypeArtifact import PrototypeArtifact
     from pipeline.Config import Config
     from pipeline import utils
     from pipeline import compile
 
+# libclang is necessary only for analyzing the source code (not for the generator loading the prototype artifacts)
+try:
+    if __package__ is None or __package__ == "":
+        from ASTAnalyzer import ASTAnalyzer
+        from Prototype import Prototype
+    else:
+        from pipeline.ASTAnalyzer import ASTAnalyzer
+        from pipeline.Prototype import Prototype
+except ImportError:
+    ASTAnalyzer = None
+    Prototype = None
+
 
 ########################################
 # generate template main code
@@ -49,8 +59,18 @@ class TemplateGenerator():
     AST:ASTAnalyzer = None
     functions = None        # List of Cursors (FUNCTION_DECLARATION)
     prototypes = {}         # List of prototypes (Prototype class)
+    env = None              # jinja2 Environment (templates are loaded and compiled once for a generator)
+    template_set = None     # template codes loaded from the template directory
+    contexts = {}           # rendering context for each (function, template) except the appendix
+    includes = None         # header files of the source file {"global": [...], "local": [...]}
 
-    def __init__(self, _source_file, _config:Config, _compilation_flags=None):
+    def __init__(self, _source_file, _config:Config, _compilation_flags=None, _parse=True):
+        '''
+        :param _source_file: source file that defines the functions
+        :param _config: configuration
+        :param _compilation_flags: compile flags for parsing the source file
+        :param _parse: parse the source file (False: the functions should be loaded by load_artifact())
+        '''
         # set configurations
         global confTemp
         confTemp = _config
@@ -60,17 +80,47 @@ class TemplateGenerator():
         if not os.path.isfile(_source_file):
             assert False, "The specified source file does not exist"
 
+        self.prototypes = {}
+        self.env = None
+        self.template_set = None
+        self.contexts = {}
+        self.includes = None
+        if _parse is False:
+            self.AST = None
+            self.functions = []
+            return
+
         # define _compilation_flag if it is not provided
         if _compilation_flags is None:
             include_txt = compile.get_gcc_params_include(confTemp.INCLUDES, confTemp.REPO_PATH)
             _compilation_flags = confTemp.SUT_COMPILE_FLAGS+" " + include_txt
 
         # process
-        self.AST = ASTAnalyzer(self.SOURCE_FILE, _compilation_flags)
+        self.AST = ASTAnalyzer(self.SOURCE_FILE, _compilation_flags, _cache_dir=confTemp.AST_CACHE,
+                               _fast=confTemp.FAST_PARSE is True, _pch_dir=confTemp.PCH_CACHE,
+                               _repo_path=confTemp.REPO_PATH)
         self.functions = self.AST.get_function_decls()
-        self.prototypes = {}
         pass
 
+    def load_artifact(self, _func_name, _artifact_file):
+        '''
+        load the prototype artifact of the function stored by store_artifact()
+        :return: True if the artifact is valid for the source file and the TEMPLATE_CONFIG
+        '''
+        artifact = PrototypeArtifact.load(_artifact_file, self.SOURCE_FILE, confTemp.TEMPLATE_CONFIG)
+        if artifact is None or artifact.name != _func_name: return False
+        self.prototypes[_func_name] = artifact
+        self.includes = artifact.includes
+        return True
+
+    def store_artifact(self, _func_name, _artifact_file):
+        '''
+        store the analysis result of the function (the function should be generated before)
+        '''
+        if _func_name not in self.prototypes: return False
+        return PrototypeArtifact.store(_artifact_file, self.prototypes[_func_name], self.get_source_includes(),
+                                       self.SOURCE_FILE, confTemp.TEMPLATE_CONFIG)
+
     def generate(self, _func_name:str, _driver_src_path, _template_entry, _appendix=None):
         if _func_name not in self.prototypes:
             # process of the generating template
@@ -146,21 +196,56 @@ class TemplateGenerator():
             templates[file] = code_text
         return templates
 
+    def get_environment(self):
+        '''
+        load the templates and create the jinja2 Environment at the first call
+          (the Environment caches the compiled templates, so the templates are compiled once for a generator)
+        :return: jinja2 Environment
+        '''
+        if self.env is None:
+            self.template_set = self.load_templates()
+            self.env = Environment(loader=jinja2.DictLoader(self.template_set),
+                                   autoescape=select_autoescape(),
+                                   trim_blocks=True, lstrip_blocks=True)
+        return self.env
+
     def create_concrete_code(self, _prototype:Prototype, _appendix, _output_file, _template_main):
 
         # get template rander object
-        template_set = self.load_templates()
-        env = Environment(loader=jinja2.DictLoader(template_set),
-                          autoescape=select_autoescape(),
-                          trim_blocks=True, lstrip_blocks=True)
-        template = env.get_template(_template_main)
+        template = self.get_environment().get_template(_template_main)
 
+        # the context except the appendix is the same for all the test cases of a function
+        key = (_prototype.name, _template_main)
+        if key not in self.contexts:
+            self.contexts[key] = self.make_context(_prototype, _template_main)
+
+        print("APPENDIX: "+ str(_appendix))
+        # rendering the template
+        code = template.render(appendix=_appendix, **self.contexts[key])
+
+        # saving the code into the file
+        with open(_output_file, 'w') as f:
+            f.write(code)
+        return True
+
+    def get_source_includes(self):
+        '''
+        find the header files included in the source file
+        :return: {"global": [...], "local": [...]}
+        '''
+        if self.includes is None:
+            if confTemp.TEMPLATE_CONFIG["AUTO_EXCLUDE_HEADERS"]:
+                finder = IncludeFinder(_file=self.SOURCE_FILE, _AST=self.AST)
+            else:
+                finder = IncludeFinder(_file=self.SOURCE_FILE)
+            self.includes = {"global": finder.globals, "local": finder.locals}
+        return self.includes
+
+    def make_context(self, _prototype:Prototype, _template_main):
         # find additional includes from source file
-        if confTemp.TEMPLATE_CONFIG["AUTO_EXCLUDE_HEADERS"]:
-            finder = IncludeFinder(_file=self.SOURCE_FILE, _AST=self.AST)
-        else:
-            finder = IncludeFinder(_file=self.SOURCE_FILE)
-        finder.exclude(_code=template_set[_template_main]) # we assume only the main template includes header files
+        includes = self.get_source_includes()
+        finder = IncludeFinder.from_headers(includes["global"], includes["local"])
+        finder.exclude(_code=self.template_set[_template_main]) # we assume only the main template includes header files
         # manual excluding header files that are listed in the EXCLUDE_HEADERS
         finder.exclude_manual_items(confTemp.TEMPLATE_CONFIG["EXCLUDE_HEADERS"])
 
@@ -176,22 +261,16 @@ class TemplateGenerator():
                 flag_extern = False
                 break
 
-        print("APPENDIX: "+ str(_appendix))
-        # rendering the template
-        code = template.render(
+        return dict(
             function=_prototype.get_driver_dict(),
             includes={"global": finder.globals, "local": finder.locals},
             initializes=self.get_initialize_stats(),
             source_file=self.SOURCE_FILE,
             flag_extern=flag_extern,
-            appendix=_appendix
+            persistent_loop=confTemp.FUZZING_PERSISTENT_LOOP,
+            execution_log=confTemp.FUZZING_EXECUTION_LOG
         )
 
-        # saving the code into the file
-        with open(_output_file, 'w') as f:
-            f.write(code)
-        return True
-
     def get_initialize_stats(self):
         # obtain relative path of source file from the REPO_PATH (without "./")
         repo_path = confTemp.REPO_PATH[2:] if confTemp.REPO_PATH.startswith("./") else confTemp.REPO_PATH
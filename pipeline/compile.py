@@ -4,6 +4,9 @@ import os
 import shutil
 import re
 import glob
+import hashlib
+import tempfile
+import concurrent.futures
 if __package__ is None or __package__ == "":
     import utils
 else:
@@ -78,6 +81,50 @@ def inject_mutated_function( _code_file, _mutated_func_file, _func_name, _mut_pr
     return True
 
 
+def generate_schemata_code(_mutated_func_files:list, _signature:dict, _output_file:str, _id_env:str):
+    '''
+    make a source code of mutant schemata that contains all the mutated functions and
+    a dispatcher function which calls one of them selected by the environment variable _id_env at runtime
+    :param _mutated_func_files: list of files that contains a mutated function (the i-th file is the mutant ID i+1)
+                                the function in each file should have a unique name (e.g., mut1_func, mut2_func, ...)
+    :param _signature: signature of the dispatcher function (see FunctionExtractor.get_function_signature())
+                       {"header": "int mut_func(int a)", "void": False, "args": ["a"], "names": [mutated function names]}
+    :param _output_file: output file path
+    :param _id_env: the name of the environment variable that specifies the mutant ID
+    :return:
+    '''
+    codes = ["#include <stdlib.h>\n"]
+    for func_file in _mutated_func_files:
+        with open(func_file, "r") as f:
+            codes.append(f.read())
+
+    args = ", ".join(_signature["args"])
+    dispatcher  = "static int motif_schemata_id(void) {\n"
+    dispatcher += "    static int id = -1;\n"
+    dispatcher += "    if (id < 0) {\n"
+    dispatcher += "        const char* value = getenv(\"%s\");\n" % _id_env
+    dispatcher += "        id = (value != NULL) ? atoi(value) : 0;\n"
+    dispatcher += "    }\n"
+    dispatcher += "    return id;\n"
+    dispatcher += "}\n\n"
+    dispatcher += "%s\n{\n" % _signature["header"]
+    dispatcher += "    switch (motif_schemata_id()) {\n"
+    for idx, name in enumerate(_signature["names"]):
+        if _signature["void"] is True:
+            dispatcher += "        case %d: %s(%s); return;\n" % (idx+1, name, args)
+        else:
+            dispatcher += "        case %d: return %s(%s);\n" % (idx+1, name, args)
+    dispatcher += "        default: abort();   /* %s is not set or not available */\n" % _id_env
+    dispatcher += "    }\n"
+    dispatcher += "}\n"
+    codes.append(dispatcher)
+
+    os.makedirs(os.path.dirname(os.path.abspath(_output_file)), exist_ok=True)
+    with open(_output_file, "w") as f:
+        f.write("\n\n".join(codes))
+    return True
+
+
 def remove_static_keyword(_code, _function_name):
     regex  = r''                #
     # regex  = r'\s*'           # allow space
@@ -115,24 +162,39 @@ def remove_static_keyword(_code, _function_name):
     return _code
 
 
-def compile_SUT(_repo, _commands, _env=None):
+def compile_SUT(_repo, _commands, _env=None, _jobs=1):
     '''
     Generate SUT following the list of commands (COMPILE_SUT_CMDS)
+    :param _jobs: the number of parallel jobs given to `make` in the commands (-j)
     '''
     for command in _commands:
+        command = add_make_jobs(command, _jobs)
         ret_code = utils.shell.execute_and_check(command, "retcode", 0, _working_dir=_repo, _env=_env, _verbose=True)
         if ret_code is False:
             utils.error_exit("Failed to compile SUT using the command: %s"%command)
     return True
 
 
-def compile_SUT_files(_compiler_path:str, _files:list, _build:str, _includes:list, _compile_flags:str, _repo_path:str):
+def add_make_jobs(_command, _jobs):
+    '''
+    add `-j <_jobs>` to each `make` invocation in the _command if the command does not specify the number of jobs
+    e.g., "cd src && make all" --> "cd src && make -j 8 all"
+    '''
+    if _jobs is None or _jobs <= 1: return _command
+    if re.search(r'(^|\s)(-j|--jobs)', _command) is not None: return _command
+    return re.sub(r'(^|&&|\|\||;)(\s*)(g?make)(?=\s|$)', r'\1\2\3 -j %d' % _jobs, _command)
+
+
+def compile_SUT_files(_compiler_path:str, _files:list, _build:str, _includes:list, _compile_flags:str, _repo_path:str,
+                      _cache_dir:str=None, _jobs:int=1):
     '''
     :param _compiler_path:  the file path of the compiler
     :param _files: list of source code paths to be compiled (preferred relative path from the repository)
     :param _build: output directory for the compilation result (preferred relative path from the repository)
     :param _includes: list of directories to be used as include paths (preferred relative path from the repository)
     :param _repo_path: repository path
+    :param _cache_dir: directory of the object cache (None: compile all the files without the cache)
+    :param _jobs: the number of files compiled concurrently
     :return:
     '''
     # Set compiler
@@ -153,32 +215,53 @@ def compile_SUT_files(_compiler_path:str, _files:list, _build:str, _includes:lis
     excluded_files = [filename[1:] for filename in _files if filename.startswith("!") is True]
     target_files = get_target_files(target_files, _repo_path)
     excluded_files = get_target_files(excluded_files, _repo_path)
-    target_files = list(set(target_files) - set(excluded_files))
+    target_files = sorted(set(target_files) - set(excluded_files))
 
     # Create objective files for each the source codes in the list (-c option is to compile objective files)
     # we assume the filepath is relative from the config.REPO_PATH
-    cnt = 0
-    for code_file in target_files:
-        cnt += 1
-
+    def compile_file(_cnt, _code_file):
         # set output path
-        output_path = os.path.splitext(code_file)[0] + ".o"
+        output_path = os.path.splitext(_code_file)[0] + ".o"
         output_path = utils.makepath(compile_output, output_path)
+        abs_output_path = os.path.join(_repo_path, output_path)
 
         # prepare build output dir (by absolute path)
-        os.makedirs(os.path.join(_repo_path, os.path.dirname(output_path)), exist_ok=True)
-
-        # execute compile
-        cmd = "%s -c -o %s %s %s %s"%(compiler_path, output_path, code_file, _compile_flags, include_txt)
-        if utils.shell.execute_and_check(cmd, "retcode", 0, _working_dir=_repo_path, _verbose=True) is None:
-            utils.error_exit("[%d/%d] Failed to compile %s" % (cnt, len(target_files), code_file))
-        print("\t[%d/%d] compiled %s" % (cnt, len(target_files), code_file))
+        os.makedirs(os.path.dirname(abs_output_path), exist_ok=True)
+
+        # skip the file if the object is newer than the source code and its headers (tracked by the dependency file)
+        cmd = "%s -c -o %s %s %s %s"%(compiler_path, output_path, _code_file, _compile_flags, include_txt)
+        if is_object_up_to_date(abs_output_path, cmd, _repo_path) is True:
+            print("\t[%d/%d] compiled %s (up-to-date)" % (_cnt, len(target_files), _code_file))
+            return True
+
+        # reuse the object file if the same translation unit is already compiled
+        cache_key = None
+        if _cache_dir is not None:
+            cache_key = get_object_cache_key(compiler_path, _code_file, _compile_flags, include_txt, _repo_path)
+            if load_cached_object(_cache_dir, cache_key, abs_output_path) is True:
+                print("\t[%d/%d] compiled %s (cached)" % (_cnt, len(target_files), _code_file))
+                return True
+
+        # execute compile (-MMD makes the dependency file next to the object)
+        remove_dependency_record(abs_output_path)
+        dep_cmd = cmd + " -MMD -MF %s" % (os.path.splitext(output_path)[0] + ".d")
+        if utils.shell.execute_and_check(dep_cmd, "retcode", 0, _working_dir=_repo_path, _verbose=True) is None:
+            utils.error_exit("[%d/%d] Failed to compile %s" % (_cnt, len(target_files), _code_file))
+        store_dependency_record(abs_output_path, cmd)
+        print("\t[%d/%d] compiled %s" % (_cnt, len(target_files), _code_file))
+
+        if cache_key is not None:
+            store_cached_object(_cache_dir, cache_key, abs_output_path)
+        return True
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(_jobs, 1)) as pool:
+        list(pool.map(compile_file, range(1, len(target_files)+1), target_files))
 
     return True
 
 
 def compile_test_driver(_compiler_path:str, _driver_file:str, _output_file:str,
-                        _objects:list, _includes:list, _linker_option:str, _repo_path:str):
+                        _objects:list, _includes:list, _linker_option:str, _repo_path:str, _archive:dict=None):
     '''
     :param _compiler_path:  the file path of the compiler
     :param _driver_file: a source code of test driver (preferred absolute path)
@@ -187,6 +270,7 @@ def compile_test_driver(_compiler_path:str, _driver_file:str, _output_file:str,
     :param _includes: list of directories to be used as include paths (preferred relative path from the repository)
     :param _linker_option: additional compile flags for linking and compiling the test driver
     :param _repo_path: repository path
+    :param _archive: the result of make_SUT_archive() to link instead of the _objects (None: link the _objects)
     :return:
     '''
     # set compiler path
@@ -196,7 +280,12 @@ def compile_test_driver(_compiler_path:str, _driver_file:str, _output_file:str,
 
     # generate compile parameters
     include_txt = get_gcc_params_include(_includes) # _includes are already relative path from REPO_PATH
-    obj_files = get_target_files(_objects, _repo_path)  # _includes are already relative path from REPO_PATH
+    if _archive is not None:
+        obj_files = _archive["others"]
+        if _archive["archive"] is not None:
+            obj_files = ["-Wl,--whole-archive", _archive["archive"], "-Wl,--no-whole-archive"] + obj_files
+    else:
+        obj_files = get_target_files(_objects, _repo_path)  # _includes are already relative path from REPO_PATH
     if obj_files is None or len(obj_files) == 0:
         utils.error_exit("Failed to find listed object files: %s" % obj_files)
     obj_files_txt = " ".join(obj_files)
@@ -213,11 +302,190 @@ def compile_test_driver(_compiler_path:str, _driver_file:str, _output_file:str,
     pass
 
 
+def make_SUT_archive(_objects:list, _archive_file:str, _repo_path:str):
+    '''
+    make a static archive of the object files in the _objects to link test drivers without globbing and
+    passing all the object files for each driver
+    :param _objects: list of objective files (the same as compile_test_driver)
+    :param _archive_file: the file path of the archive (preferred absolute path)
+    :param _repo_path: repository path
+    :return: {"archive": archive path (None if there is no object file), "others": list of files that are not archived}
+    '''
+    obj_files = get_target_files(_objects, _repo_path)
+    if obj_files is None or len(obj_files) == 0:
+        utils.error_exit("Failed to find listed object files: %s" % obj_files)
+
+    # only the object files are archived (e.g., an archive in an archive cannot be linked)
+    targets = sorted([filename for filename in obj_files if filename.endswith(".o")])
+    others = sorted([filename for filename in obj_files if filename.endswith(".o") is False])
+    if len(targets) == 0:
+        return {"archive": None, "others": others}
+
+    if os.path.exists(_archive_file): os.remove(_archive_file)   # `ar` appends into the existing archive
+    os.makedirs(os.path.dirname(_archive_file), exist_ok=True)
+    cmd = "ar rcs %s %s" % (_archive_file, " ".join(targets))
+    if utils.shell.execute_and_check(cmd, "retcode", 0, _working_dir=_repo_path) is None:
+        utils.error_exit("Failed to make the archive of the SUT: %s" % _archive_file)
+    print("\tArchived %d object files into %s" % (len(targets), _archive_file))
+    return {"archive": _archive_file, "others": others}
+
+
+def get_num_jobs(_jobs, _shared=1):
+    '''
+    :param _jobs: the number of jobs (0 or None: the number of available CPU cores)
+    :param _shared: the number of processes that share the available CPU cores (e.g., run_list.py --local-jobs)
+    :return: the number of concurrent jobs
+    '''
+    if _jobs is not None and _jobs > 0: return _jobs
+    return max(1, len(os.sched_getaffinity(0)) // max(1, _shared))
+
+
 def rollback_mutated_function(_backup, _origin):
     shutil.copy(_backup, _origin)
     os.remove(_backup)
 
 
+################################################
+# dependency tracking for the SUT compilation
+################################################
+def get_dependency_files(_object_file):
+    base = os.path.splitext(_object_file)[0]
+    return base + ".d", base + ".cmd"
+
+
+def remove_dependency_record(_object_file):
+    for filepath in get_dependency_files(_object_file):
+        if os.path.exists(filepath): os.remove(filepath)
+
+
+def store_dependency_record(_object_file, _cmd):
+    '''
+    store the command that compiled the object (the dependency file is made by the compiler with -MMD)
+    '''
+    with open(get_dependency_files(_object_file)[1], "w") as f:
+        f.write(_cmd)
+
+
+def load_dependencies(_dep_file):
+    '''
+    parse a make-style dependency file ("<object>: <source> <header> ...")
+    :return: list of files that the object depends on, None if the file cannot be parsed
+    '''
+    try:
+        with open(_dep_file, "r") as f:
+            text = f.read()
+    except OSError:
+        return None
+    text = text.replace("\\\n", " ")
+    rule = text.split("\n")[0]
+    idx = rule.find(": ")
+    if idx < 0: return None
+    return rule[idx+2:].split()
+
+
+def is_object_up_to_date(_object_file, _cmd, _repo_path):
+    '''
+    check if the object was compiled by the same command and is newer than all of its dependencies
+    :param _object_file: object file path (absolute path)
+    :param _cmd: compile command of the object
+    :param _repo_path: repository path (the dependencies are relative to this path)
+    :return: True if the object does not need to be compiled
+    '''
+    dep_file, cmd_file = get_dependency_files(_object_file)
+    if os.path.exists(_object_file) is False or os.path.exists(cmd_file) is False: return False
+    with open(cmd_file, "r") as f:
+        if f.read() != _cmd: return False
+
+    dependencies = load_dependencies(dep_file)
+    if dependencies is None or len(dependencies) == 0: return False
+    object_mtime = os.stat(_object_file).st_mtime_ns
+    for filename in dependencies:
+        filepath = os.path.join(_repo_path, filename)
+        if os.path.exists(filepath) is False: return False
+        if os.stat(filepath).st_mtime_ns > object_mtime: return False
+    return True
+
+
+################################################
+# object cache for the SUT compilation
+################################################
+def get_object_cache_key(_compiler_path, _code_file, _compile_flags, _include_txt, _repo_path):
+    '''
+    make a key of the object cache for a translation unit
+    The key is a hash of the compiler (path, size and modification time), compile flags, include paths,
+    AFL environment variables (they change the instrumentation) and the preprocessed source code.
+    Since the source file is preprocessed with relative paths in the repository,
+      the key does not depend on the location of the repository.
+    :param _compiler_path: the file path of the compiler
+    :param _code_file: source code path (relative path from the repository)
+    :param _compile_flags: compile flags
+    :param _include_txt: include parameters for the compiler
+    :param _repo_path: repository path
+    :return: hex string of the key, None if the source code cannot be preprocessed
+    '''
+    cmd = "%s -E %s %s %s" % (_compiler_path, _code_file, _compile_flags, _include_txt)
+    retcode, preprocessed = utils.shell.execute_for_output(cmd, _working_dir=_repo_path)
+    if retcode != 0: return None
+
+    hasher = hashlib.sha256()
+    compiler_file = _compiler_path
+    if utils.is_global_command(_compiler_path) is True:
+        compiler_file = shutil.which(_compiler_path)
+    if compiler_file is not None and os.path.exists(compiler_file):
+        compiler_file = os.path.realpath(compiler_file)
+        stat = os.stat(compiler_file)
+        hasher.update(("compiler:%s:%d:%d\n" % (compiler_file, stat.st_size, stat.st_mtime_ns)).encode())
+    else:
+        hasher.update(("compiler:%s\n" % _compiler_path).encode())
+    hasher.update(("flags:%s\n" % _compile_flags).encode())
+    hasher.update(("includes:%s\n" % _include_txt).encode())
+    for key in sorted(os.environ.keys()):
+        if key.startswith("AFL_") is False: continue
+        hasher.update(("env:%s=%s\n" % (key, os.environ[key])).encode())
+    hasher.update(preprocessed)
+    return hasher.hexdigest()
+
+
+def get_cached_object_path(_cache_dir, _key):
+    return os.path.join(_cache_dir, _key[:2], _key + ".o")
+
+
+def load_cached_object(_cache_dir, _key, _output_file):
+    '''
+    copy the cached object into the _output_file
+    :return: True if the object is in the cache
+    '''
+    if _key is None: return False
+    cached_file = get_cached_object_path(_cache_dir, _key)
+    try:
+        shutil.copyfile(cached_file, _output_file)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def store_cached_object(_cache_dir, _key, _object_file):
+    '''
+    store the compiled object into the cache
+    Multiple processes can store the same object at the same time,
+      so the object is written into a temporary file and atomically renamed into the cache.
+    :return: True if the object is stored
+    '''
+    cached_file = get_cached_object_path(_cache_dir, _key)
+    if os.path.exists(cached_file): return True
+
+    os.makedirs(os.path.dirname(cached_file), exist_ok=True)
+    fd, temp_file = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(cached_file))
+    try:
+        with os.fdopen(fd, "wb") as fw, open(_object_file, "rb") as fr:
+            shutil.copyfileobj(fr, fw)
+        os.replace(temp_file, cached_file)
+    except OSError:
+        if os.path.exists(temp_file): os.remove(temp_file)
+        return False
+    return True
+
+
 ################################################
 # related includes
 ################################################
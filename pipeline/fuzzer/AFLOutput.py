@@ -2,6 +2,8 @@ import os
 import json
 import shutil
 from pipeline import utils
+from pipeline.fuzzer.InputStore import InputStore
+from pipeline.fuzzer.ExecutionLog import ExecutionLog
 
 
 #####
@@ -21,6 +23,8 @@ class AFLOutput():
 
     # generated by fuzzing driver
     TOTAL_LOG           = "./total.log"         # simple log list
+    TOTAL_LOG_BINARY    = "./total.bin"         # simple log list in the binary format (FUZZING_EXECUTION_LOG)
+    TOTAL_LOG_COUNTERS  = "./total.cnt"         # counters of the executions instead of the log list (FUZZING_EXECUTION_LOG)
     NUM_INPUT_FILENAME  = "./__num__"           # number of inputs in AFL  ( not used )
     DETAILED_LOG_PATH   = "./logs"              # the folder that detailed logs are stored
     INPUT_FILE_PATH     = "./inputs"            # the folder that all inputs are stored
@@ -33,14 +37,53 @@ class AFLOutput():
     NUM_SEED_INPUTS = 3             # number of seed inputs
     DIST_BASE_NUM   = 5000          # log/input distribution folder divider (should be the same with DIST_BASE_NUM in driver template)
 
+    # multiple fuzzer instances (AFL++ -M/-S)
+    #   - the main instance is named "default", so its results are located the same as a single instance
+    #   - a secondary instance uses its AFL directory (e.g., ./secondary01) also as the working directory of the driver
+    #     and its sequence IDs start from INSTANCE_SEQ_BASE * <instance number> (MOTIF_SEQ_BASE)
+    #     so that the inputs of all the instances can be stored in the same directory
+    MAIN_INSTANCE       = "default"
+    SECONDARY_PREFIX    = "secondary"
+    INSTANCE_SEQ_BASE   = 1000000000
+    SEQ_OFFSET          = 0             # the sequence ID base of this instance
+    SUM_STATS_KEYS      = ["execs_done", "execs_per_sec", "corpus_count", "paths_total", "saved_crashes",
+                           "unique_crashes", "saved_hangs", "unique_hangs"]
+    SUM_PLOT_KEYS       = ["paths_total", "pending_total", "pending_favs", "unique_crashes", "unique_hangs", "execs_per_sec"]
+
     def __init__(self, _basepath, _num_seeds=3, _dist_base_num=5000, _isAFLpp=True):
         self.BASE_PATH = _basepath
         self.NUM_SEED_INPUTS = _num_seeds
         self.DIST_BASE_NUM = _dist_base_num
         if _isAFLpp is True:
             self.AFL_SUB_DIR = "./default"
+        self.input_hashes = {}      # hashes of the inputs found during the post processing {normalized path: hash}
         pass
 
+    @staticmethod
+    def get_instance_name(_idx):
+        return AFLOutput.MAIN_INSTANCE if _idx == 0 else "%s%02d" % (AFLOutput.SECONDARY_PREFIX, _idx)
+
+    def get_secondary_names(self):
+        if os.path.exists(self.BASE_PATH) is False: return []
+        names = [name for name in os.listdir(self.BASE_PATH)
+                 if name.startswith(self.SECONDARY_PREFIX) and name[len(self.SECONDARY_PREFIX):].isdigit()]
+        return sorted(names)
+
+    def get_secondary_outputs(self):
+        '''
+        :return: list of AFLOutput objects for the secondary instances (empty for a single instance)
+        '''
+        if self.SEQ_OFFSET != 0: return []     # this is a secondary instance
+        outputs = []
+        for name in self.get_secondary_names():
+            output = AFLOutput(utils.makepath(self.BASE_PATH, name), self.NUM_SEED_INPUTS, self.DIST_BASE_NUM, _isAFLpp=False)
+            output.SEQ_OFFSET = int(name[len(self.SECONDARY_PREFIX):]) * self.INSTANCE_SEQ_BASE
+            outputs.append(output)
+        return outputs
+
+    def get_instances(self):
+        return [self] + self.get_secondary_outputs()
+
     @property
     def input_dir_path(self):
         return utils.makepath(self.BASE_PATH, self.INPUT_FILE_PATH)
@@ -68,6 +111,41 @@ class AFLOutput():
     # load plot data
     ###############################################################
     def load_plot(self, _reverse=False, _n_lines=0):
+        '''
+        return plot_data as a list of dicts (see load_instance_plot)
+        With multiple fuzzer instances, the plots are merged in time order:
+          each item sums the last values of the instances at the time (SUM_PLOT_KEYS) and takes the maximum for the others
+        '''
+        secondaries = self.get_secondary_outputs()
+        if len(secondaries) == 0:
+            return self.load_instance_plot(_reverse, _n_lines)
+
+        plots = [instance.load_instance_plot() for instance in [self] + secondaries]
+        plots = [plot for plot in plots if plot is not None]
+        if len(plots) == 0: return None
+
+        events = sorted([(item['unix_time'], idx, item) for idx, plot in enumerate(plots) for item in plot],
+                        key=lambda event: (event[0], event[1]))
+        data = []
+        last_items = {}
+        initial_time = 0
+        for unix_time, idx, item in events:
+            last_items[idx] = item
+            merged = {}
+            for key in item.keys():
+                values = [last[key] for last in last_items.values() if key in last]
+                merged[key] = sum(values) if key in self.SUM_PLOT_KEYS else max(values)
+            merged['unix_time'] = unix_time
+            if initial_time == 0: initial_time = unix_time
+            merged['elapsed_time'] = unix_time - initial_time
+            data.append(merged)
+
+        if _reverse is True:
+            data.reverse()
+            if _n_lines > 0: data = data[:_n_lines]
+        return data
+
+    def load_instance_plot(self, _reverse=False, _n_lines=0):
         '''
         return plot_data as a list of dicts:
         [
@@ -155,6 +233,26 @@ class AFLOutput():
     # load fuzzer stats
     ###############################################################
     def load_fuzzer_stats(self, _key=None):
+        '''
+        With multiple fuzzer instances, the stats of the instances are merged:
+          the values in SUM_STATS_KEYS are summed and the others are taken from the main instance
+        '''
+        data = self.load_instance_fuzzer_stats()
+        secondaries = self.get_secondary_outputs()
+        if data is not None and len(secondaries) > 0:
+            for secondary in secondaries:
+                stats = secondary.load_instance_fuzzer_stats()
+                if stats is None: continue
+                for key in self.SUM_STATS_KEYS:
+                    if key in data and key in stats: data[key] += stats[key]
+            data['instances'] = len(secondaries) + 1
+
+        if _key is not None:
+            if data is not None and _key in data: return data[_key]
+            else:            return None
+        return data
+
+    def load_instance_fuzzer_stats(self, _key=None):
         filepath = utils.makepath(self.BASE_PATH, self.AFL_SUB_DIR, self.FUZZER_STATS)
         if os.path.exists(filepath) is False: return None
 
@@ -202,22 +300,58 @@ class AFLOutput():
     def make_stats_total_log(self):
         '''
         get basic statistics from the total log
+        :return: (counts, elapsed), (None, None) if there is no total log
+        '''
+        # get full path of the total log file
+        filepath = self.get_total_log_path()
+        if filepath is None: return None, None
+
+        counts, elapsed, missing = self.analyze_total_log(filepath)
+        return counts, elapsed
+
+    def analyze_total_log(self, _filepath, _known_seqs=None):
+        '''
+        make the statistics and find the missing inputs by reading the total log once
 
         We do not consider the last execution if the execs_done (from AFL stats) is less than the actual number of executions,
         since we assume that AFL stopped during the last execution.
-        :return:
+        :param _filepath: the total log of this instance
+        :param _known_seqs: sequence IDs of the inputs already stored (None if the missing inputs are not required)
+        :return: (counts, elapsed, sequence IDs of the missing inputs)
         '''
+        # make statistics (with the columns of the log if NumPy is available)
+        log = ExecutionLog(_filepath)
+        if log.is_analyzable() is True:
+            counts, elapsed, stage, flag_elapsed = log.get_stats()
+            missing = []
+            if _known_seqs is not None and log.format != log.COUNTERS:   # the counters do not have the records
+                missing = log.get_missing_inputs(_known_seqs)
+        else:
+            counts, elapsed, stage, flag_elapsed, missing = self.make_stats_by_records(_filepath, _known_seqs)
 
-        # get full path of the total log file
-        filepath = utils.makepath(self.BASE_PATH, self.TOTAL_LOG)
-        if os.path.exists(filepath) is False: return None, None
+        # Rollback if the last execution is the non-completed execution
+        #   - When a timeout of an execution happens, the execution is crashed, which will be considered in the analysis below.
+        #   - When AFL finished during precondition checking, it has no _execs_done value, then we consider all the inputs.
+        exec_done = self.load_instance_fuzzer_stats(_key='execs_done')
+        if exec_done is not None and exec_done < counts['seq'] - self.SEQ_OFFSET:
+            counts['all'] -=1
+            if stage is not None:
+                counts[stage] -= 1
+                if flag_elapsed is True: elapsed[stage] = -1
+
+        return counts, elapsed, missing
 
-        # make statistics
+    def make_stats_by_records(self, _filepath, _known_seqs=None):
+        '''
+        make statistics by iterating the records of the total log (see ExecutionLog.get_stats)
+        the missing inputs are found in the same iteration if the _known_seqs is given (see ExecutionLog.get_missing_inputs)
+        '''
         counts = {"all":0, "initial":0, "origin":0, "mutant":0, "comp":0}
         elapsed = {"all":-1, "initial":-1, "origin":-1, "mutant":-1, "comp":-1}
         stage = None
         flag_elapsed = False
-        for record in self.iter_simple_execution_log(filepath):
+        missing = []
+        for record in self.iter_simple_execution_log(_filepath):
             # some executions are missing. (I think this is timeout..but..we don't even have log...)
             # so I keep the last sequence ID
             counts['seq'] = record['seq']
@@ -236,21 +370,24 @@ class AFLOutput():
                     flag_elapsed = True
                     elapsed[stage] = record['elapsed']
 
-        # Rollback if the last execution is the non-completed execution
-        #   - When a timeout of an execution happens, the execution is crashed, which will be considered in the analysis below.
-        #   - When AFL finished during precondition checking, it has no _execs_done value, then we consider all the inputs.
-        exec_done = self.load_fuzzer_stats(_key='execs_done')
-        if exec_done is not None and exec_done < counts['seq']:
-            counts['all'] -=1
-            if stage is not None:
-                counts[stage] -= 1
-                if flag_elapsed is True: elapsed[stage] = -1
+            # pass any fail in initial or origin, live in all points and already listed
+            if _known_seqs is None or stage in [None, 'initial', 'origin']: continue
+            if record['seq'] in _known_seqs: continue
+            missing.append(record['seq'])
+        return counts, elapsed, stage, flag_elapsed, missing
 
-        return counts, elapsed
+    def get_total_log_path(self):
+        '''
+        :return: the execution log of the driver in any format (see FUZZING_EXECUTION_LOG), None if there is no log
+        '''
+        for name in [self.TOTAL_LOG, self.TOTAL_LOG_BINARY, self.TOTAL_LOG_COUNTERS]:
+            filepath = utils.makepath(self.BASE_PATH, name)
+            if os.path.exists(filepath) is True: return filepath
+        return None
 
     def load_total_execution_log(self):
-        filepath = utils.makepath(self.BASE_PATH, self.TOTAL_LOG)
-        if os.path.exists(filepath) is False: return None
+        filepath = self.get_total_log_path()
+        if filepath is None: return None
 
         data = []
         # add additional data
@@ -273,26 +410,9 @@ class AFLOutput():
         }
         :return:
         '''
-        # load specified file
-        file = open(_filepath, "r")
-        line = file.readline()       # throw away the first line (title line)
-
-        # a record for one execution
+        # a record for one execution (the rows are read from the log in any format)
         startTime = 0
-        while True:
-            line = file.readline()
-            line = line.strip()
-            if line == '': break
-
-            # convert column values
-            cols = line.split(',')
-            seqID    = int(cols[0].strip())
-            timeID   = int(cols[1].strip())
-            initial  = int(cols[2].strip())
-            original = int(cols[3].strip()) if len(cols)>3 else 0
-            mutated  = int(cols[4].strip()) if len(cols)>4 else 0
-            comp     = int(cols[5].strip()) if len(cols)>5 else 0
-
+        for seqID, timeID, initial, original, mutated, comp in ExecutionLog.iter_rows(_filepath):
             item = {'seq':seqID, 'timeID':timeID, 'unixtime':0,
                     'initial': False,'origin': False,'mutant': False,'comp': False}
 
@@ -309,8 +429,6 @@ class AFLOutput():
                 item['elapsed'] = (timeID - startTime) / 1000000  # convert the time to seconds
 
             yield item.copy()
-
-        file.close()
         return True
 
     def convert_total_execution_log(self):
@@ -319,8 +437,8 @@ class AFLOutput():
         :return:
         '''
         # get full path of the total log file
-        filepath = utils.makepath(self.BASE_PATH, self.TOTAL_LOG)
-        if os.path.exists(filepath) is False: return None
+        filepath = self.get_total_log_path()
+        if filepath is None: return None
 
         output = utils.makepath(self.BASE_PATH, self.TOTAL_LOG_CONVERTED)
         out = open(output, "w")
@@ -351,7 +469,13 @@ class AFLOutput():
     def store_stats_total_log(self):
         # get data
         counts, elapsed = self.make_stats_total_log()
-        data = {"counts":counts, "elapsed":elapsed}
+        for secondary in self.get_secondary_outputs():
+            counts, elapsed = self.merge_stats_total_log(counts, elapsed, secondary)
+        self.write_stats_total_log(counts, elapsed)
+        pass
+
+    def write_stats_total_log(self, _counts, _elapsed):
+        data = {"counts":_counts, "elapsed":_elapsed}
 
         # store data
         statsfile = utils.makepath(self.BASE_PATH, self.TOTAL_LOG_STATS)
@@ -359,22 +483,70 @@ class AFLOutput():
             json.dump(data, f, indent=4)
         pass
 
+    def merge_stats_total_log(self, _counts, _elapsed, _secondary):
+        other_counts, other_elapsed = _secondary.make_stats_total_log()
+        return self.merge_stats(_counts, _elapsed, other_counts, other_elapsed, _secondary.SEQ_OFFSET)
+
+    @staticmethod
+    def merge_stats(_counts, _elapsed, _other_counts, _other_elapsed, _offset):
+        '''
+        merge the stats of a secondary instance (the number of executions are summed, the earliest elapsed time is taken)
+        :param _offset: the sequence ID base of the secondary instance (SEQ_OFFSET)
+        '''
+        if _other_counts is None: return _counts, _elapsed
+        if _counts is None: _counts, _elapsed = {}, {}
+        for key, value in _other_counts.items():
+            if key == 'seq': value -= _offset    # the number of executions of the instance
+            _counts[key] = _counts.get(key, 0) + value
+        for key, value in _other_elapsed.items():
+            if value == -1: continue
+            if _elapsed.get(key, -1) == -1 or value < _elapsed[key]: _elapsed[key] = value
+        return _counts, _elapsed
+
     ###############################################################
     # find missing inputs from AFL results
     ###############################################################
+    def merge_instance_inputs(self):
+        '''
+        copy the inputs stored by the drivers of the secondary instances into the inputs directory of the main instance
+        (their names do not conflict since the sequence IDs of the instances are separated)
+        '''
+        count = 0
+        for secondary in self.get_secondary_outputs():
+            for sub_path in secondary.get_input_files(_subName=True):
+                dest = utils.makepath(self.input_dir_path, sub_path)
+                if os.path.exists(dest) is True: continue
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                shutil.copy(utils.makepath(secondary.input_dir_path, sub_path), dest)
+                count += 1
+        return count
+
     def copy_missing_inputs(self):
         # load total results
-        filepath = utils.makepath(self.BASE_PATH, self.TOTAL_LOG)
-        if os.path.exists(filepath) is False: return None
+        if self.get_total_log_path() is None: return None
+        self.merge_instance_inputs()
 
         # find missing inputs
         missing = []
         input_files = self.get_input_files_with_ID()
-        for record in self.iter_simple_execution_log(filepath):
-            if record['initial'] is False or record['origin'] is False: continue    # pass any fail in initial or origin
-            if record['mutant'] is True and record['comp'] is True: continue        # pass live in all points
-            if record['seq'] in input_files: continue                               # pass already listed
-            missing.append(record)
+        for instance in self.get_instances():
+            filepath = instance.get_total_log_path()
+            if filepath is None: continue
+            if ExecutionLog.is_available() is True:
+                missing += ExecutionLog(filepath).get_missing_inputs(input_files.keys())
+                continue
+            missing += instance.make_stats_by_records(filepath, input_files)[-1]
+        return self.copy_inputs_from_afl(missing)
+
+    def copy_inputs_from_afl(self, _missing):
+        '''
+        copy the inputs of the missing executions from the AFL directories into the inputs directory
+        :param _missing: sequence IDs of the missing inputs
+        :return: {sequence ID: copied file path}
+        '''
+        # the AFL directories are listed only if an input is missing
+        data = {}
+        if len(_missing) == 0: return data
 
         # get list of inputs
         crashed_files = self.get_crashed_input_files()
@@ -382,16 +554,16 @@ class AFLOutput():
         hang_files = self.get_hang_input_files()
 
         # get crashed or queue list from total log
-        data = {}
-        for record in missing:
-            if record['seq'] in crashed_files:
-                data[record['seq']] = crashed_files[record['seq']]['filepath']
-            if record['seq'] in queue_files:
-                data[record['seq']] = queue_files[record['seq']]['filepath']
-            if record['seq'] in hang_files:
-                data[record['seq']] = hang_files[record['seq']]['filepath']
+        for seq in _missing:
+            if seq in crashed_files:
+                data[seq] = crashed_files[seq]['filepath']
+            if seq in queue_files:
+                data[seq] = queue_files[seq]['filepath']
+            if seq in hang_files:
+                data[seq] = hang_files[seq]['filepath']
 
         # copy crashed inputs to inputs directory
+        copied = {}
         dest_base = os.path.join(self.BASE_PATH, self.INPUT_FILE_PATH)
         for seq in data.keys():
             src = data[seq]  #crashed_files[record['seq']]['filepath']
@@ -399,11 +571,12 @@ class AFLOutput():
             desc = os.path.join(dest_base, fname)
             os.makedirs(os.path.dirname(desc), exist_ok=True)
             shutil.copy(src, desc)
+            copied[seq] = desc
             print("\t Copied missing input to inputs folder: %s" % fname)
-        return data
+        return copied
 
-    def get_input_files_with_ID(self):
-        input_files = self.get_input_files(_subName=False)
+    def get_input_files_with_ID(self, _input_files=None):
+        input_files = self.get_input_files(_subName=False) if _input_files is None else _input_files
 
         files = {}
         for file in input_files:
@@ -414,40 +587,31 @@ class AFLOutput():
             files[ID] = file
         return files
 
+    # The files of AFL are keyed by the sequence ID of the driver (including the SEQ_OFFSET of the instance),
+    #   and the files of all the instances are returned together
     def get_crashed_input_files(self):
-        crash_path = os.path.join(self.BASE_PATH, self.AFL_SUB_DIR, self.CRASHES_DIR)
-
-        file_names = utils.get_all_files(crash_path, "id*")
-        files = {}
-        for file in file_names:
-            attrs = self.name_to_dict(file)
-            ID = int(attrs['execs'])
-            files[ID] = attrs
-        return files
+        return self.get_instance_input_files(self.CRASHES_DIR)
 
     def get_queue_input_files(self):
-        queue_path = os.path.join(self.BASE_PATH, self.AFL_SUB_DIR, self.QUEUE_DIR)
-
-        file_names = utils.get_all_files(queue_path, "id*")
-        files = {}
-        for file in file_names:
-            attrs = self.name_to_dict(file)
-            if attrs['execs'] == "0":  # all seed inputs are "execs=0"
-                ID = int(attrs['id']) + 1   # since id starts from 0
-            else:
-                ID = int(attrs['execs'])
-            files[ID] = attrs
-        return files
+        return self.get_instance_input_files(self.QUEUE_DIR, _seeds=True)
 
     def get_hang_input_files(self):
-        queue_path = os.path.join(self.BASE_PATH, self.AFL_SUB_DIR, self.HANGS_DIR)
+        return self.get_instance_input_files(self.HANGS_DIR)
 
-        file_names = utils.get_all_files(queue_path, "id*")
+    def get_instance_input_files(self, _dir, _seeds=False):
         files = {}
-        for file in file_names:
-            attrs = self.name_to_dict(file)
-            ID = int(attrs['execs'])
-            files[ID] = attrs
+        for instance in self.get_instances():
+            input_path = os.path.join(instance.BASE_PATH, instance.AFL_SUB_DIR, _dir)
+
+            file_names = utils.get_all_files(input_path, "id*")
+            for file in file_names:
+                attrs = self.name_to_dict(file)
+                if 'execs' not in attrs: continue       # synced from the other instances (e.g., "id:000010,sync:default,src:000003")
+                if _seeds is True and attrs['execs'] == "0":  # all seed inputs are "execs=0"
+                    ID = int(attrs['id']) + 1   # since id starts from 0
+                else:
+                    ID = int(attrs['execs'])
+                files[ID + instance.SEQ_OFFSET] = attrs
         return files
 
     def name_to_dict(self, filepath):
@@ -527,10 +691,14 @@ class AFLOutput():
             # print("\t\t\t>> %s %s/inputs/%11d/input_%d.txt"%(executor, self.BASE_PATH, distName, ID))
 
     def stat_execution_logs(self):
-        data = self.load_total_execution_log()
+        filepath = self.get_total_log_path()
+        if filepath is None: return None
+        log = ExecutionLog(filepath)
+        if log.is_analyzable() is True:
+            return log.count_stages()
 
         counts = {"all":0, "initial":0, "origin":0, "mutant":0, "comp":0}
-        for record in data:
+        for record in self.iter_simple_execution_log(filepath):
             if record['initial'] is False: counts['initial'] += 1
             elif record['origin'] is False: counts['origin'] += 1
             elif record['mutant'] is False: counts['mutant'] += 1
@@ -539,19 +707,18 @@ class AFLOutput():
         return counts
 
     def get_timeIDs_from_total_log(self):
-        filepath = utils.makepath(self.BASE_PATH, self.TOTAL_LOG)
-        if os.path.exists(filepath) is False: return None
-
-        lines = open(filepath, 'r').readlines()
-
-        timeIDs = set([])
-        for line in lines:
-            if line.strip() == '': break
-            cols = line.split(":")
-            timeID = int(cols[0])
-            timeIDs.add(timeID)
-
-        return timeIDs
+        # sequence IDs of the executions in the total log (the detailed logs are named by them)
+        filepath = self.get_total_log_path()
+        if filepath is None: return None
+        if ExecutionLog.is_available() is True:
+            return ExecutionLog(filepath).get_seqs()
+        return set([record['seq'] for record in self.iter_simple_execution_log(filepath)])
+
+    def remove_execution_columns(self):
+        # remove the sidecars of the total logs (e.g., not to include them into the compressed result)
+        for instance in self.get_instances():
+            ExecutionLog(utils.makepath(instance.BASE_PATH, instance.TOTAL_LOG)).remove_sidecar()
+        pass
 
     def get_timeIDs_from_detailed_logs(self):
         workpath = utils.makepath(self.BASE_PATH, self.DETAILED_LOG_PATH)
@@ -605,6 +772,10 @@ class AFLOutput():
             output_path = utils.makepath(output_dir, false_input)
             utils.prepare_directory(os.path.dirname(output_path))
             shutil.move(input_path, output_path)
+
+            # keep the hash of the moved input for the index
+            digest = self.input_hashes.pop(os.path.normpath(input_path), None)
+            if digest is not None: self.input_hashes[os.path.normpath(output_path)] = digest
         return True
 
     ########################################################
@@ -615,29 +786,70 @@ class AFLOutput():
         return self.remove_duplicates(files)
 
     def remove_duplicates(self, files):
-        count = 0
-        for x in range(0, len(files)):
-            for y in range(len(files)-1, x, -1):
-                if self.filediff(files[x], files[y]) is True: continue
-                os.remove(files[y])
-                del files[y]
-                count += 1
-        return count
+        # the inputs are compared by the hashes of their contents (the first one of the same content is kept)
+        unique, duplicates = InputStore.dedup(files)
+        for filepath, digest in duplicates:
+            os.remove(filepath)
+        files[:] = list(unique.values())
+        self.input_hashes.update({os.path.normpath(filepath): digest for digest, filepath in unique.items()})
+        return len(duplicates)
+
+    def store_input_index(self):
+        '''
+        make the index of the unique inputs in `inputs` and `falses` (see InputStore)
+        :return: {hash: file path}
+        '''
+        files = []
+        for sub_dir in [self.INPUT_FILE_PATH, self.FALSE_INPUT_PATH]:
+            files += sorted(utils.get_all_files(utils.makepath(self.BASE_PATH, sub_dir), "*.inb"))
+        # the hashes are taken from the previous index and the post processing not to read the inputs again
+        hashes = self.load_input_index() or {}
+        hashes.update(self.input_hashes)
+        unique, duplicates = InputStore.dedup(files, hashes)
+        InputStore.store_index(self.BASE_PATH, unique)
+        return unique
+
+    def load_input_index(self):
+        '''
+        :return: {file path: hash}, None if the index does not exist
+        '''
+        return InputStore.load_index(self.BASE_PATH)
 
-    def filediff(self, file1, file2):
-        v =  open(file1, "rb")
-        content1 = v.read()
-        v.close()
+    ########################################################
+    # Post processing in a single pass
+    ########################################################
+    def postprocess(self):
+        '''
+        post process the fuzzing result with reading each total log once and listing the inputs once
+          - stats.log: the statistics of the executions of all the instances (see store_stats_total_log)
+          - the missing inputs are copied from the AFL directories (see copy_missing_inputs)
+          - the duplicated inputs are removed (see remove_duplicate_inputs)
+        :return: (list of the unique input files that need to be checked for false positives, number of the removed duplicates)
+        '''
+        self.merge_instance_inputs()
+        input_files = self.get_input_files()
+        known_seqs = set(self.get_input_files_with_ID(input_files).keys())
 
-        v =  open(file2, "rb")
-        content2 = v.read()
-        v.close()
+        # make the statistics and find the missing inputs of each instance together
+        counts, elapsed = None, None
+        missing = []
+        for instance in self.get_instances():
+            filepath = instance.get_total_log_path()
+            if filepath is None: continue
+            inst_counts, inst_elapsed, inst_missing = instance.analyze_total_log(filepath, known_seqs)
+            missing += inst_missing
+            if instance is self:
+                counts, elapsed = inst_counts, inst_elapsed
+            else:
+                counts, elapsed = self.merge_stats(counts, elapsed, inst_counts, inst_elapsed, instance.SEQ_OFFSET)
+        self.write_stats_total_log(counts, elapsed)
 
-        if len(content1) != len(content2): return True
+        # the missing inputs are found only when the main instance has its total log
+        if self.get_total_log_path() is not None:
+            input_files += list(self.copy_inputs_from_afl(missing).values())
 
-        for x in range(0, len(content1)):
-            if content1[x] != content2[x]: return True
-        return False
+        cnt = self.remove_duplicates(input_files)
+        return input_files, cnt
 
 
 if __name__ == "__main__":
@@ -2,6 +2,7 @@ import os
 import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+import json
 import shutil
 import tarfile
 from tarfile import TarInfo
@@ -14,9 +15,10 @@ from pipeline.fuzzer import AFLOutput
 #####
 # This class analyzes a tar file that contains fuzzing results and used to produce summary informations
 # It is inherited ExpResult class to analyze the results and provides the files that ExpResults requires
+# The members are found with the index of the tar file (<tar file>.idx, see utils.load_tar_index),
+#   which is built once and kept next to the tar file, and they are read or extracted at their offsets
 #####
 class AFLOutputTar(AFLOutput):
-    TAR = None
     TAR_FILENAME = None
     DELETE_TEMP_DIR = True
 
@@ -34,7 +36,7 @@ class AFLOutputTar(AFLOutput):
             self.INTERMEDIATE = _temp_dir
 
         self.TAR_FILENAME = os.path.abspath(_filename)
-        self.TAR = tarfile.open(_filename)
+        self.get_index()        # tarfile.ReadError if the tar file is broken
 
         if self.DELETE_TEMP_DIR is True and os.path.exists(self.INTERMEDIATE):
             shutil.rmtree(self.INTERMEDIATE)
@@ -42,22 +44,33 @@ class AFLOutputTar(AFLOutput):
         super().__init__(self.INTERMEDIATE, _num_seeds, _dist_basenum, _isAFLpp)
         pass
 
+    def get_index(self):
+        return utils.load_tar_index(self.TAR_FILENAME)
+
     def extract_file(self, _target):
         # extract required files from tar file into a temp directory (self.INTERMEDIATE)
-        try:
-            cmd = "tar -xf %s %s"%(self.TAR_FILENAME, _target)
-            if os.path.exists(self.INTERMEDIATE) is False:
-                os.makedirs(self.INTERMEDIATE)
-            ret, lines = utils.shell.execute(cmd, _working_dir=self.INTERMEDIATE)
-            if ret != 0:
-                raise KeyError()
-            # self.TAR.extract(_target, path=self.INTERMEDIATE)
-        except KeyError as e:
-            # print(str(e))
+        name = utils.find_member_in_tar(_target, self.TAR_FILENAME)
+        if name is None or utils.extract_file_from_tar(name, self.TAR_FILENAME, self.INTERMEDIATE) is False:
             print("\t- "+ _target + ' file is not in the archive')
             return None
         return utils.makepath(self.INTERMEDIATE, _target)
 
+    def read_file(self, _target):
+        '''
+        read a file in the archive without extracting it
+        :return: content of the file (bytes), None if the file is not in the archive
+        '''
+        name = utils.find_member_in_tar(_target, self.TAR_FILENAME)
+        if name is None: return None
+        return utils.read_file_from_tar(name, self.TAR_FILENAME)
+
+    def extract_total_log(self):
+        # extract the execution log in any format (see FUZZING_EXECUTION_LOG)
+        for name in [self.TOTAL_LOG, self.TOTAL_LOG_BINARY, self.TOTAL_LOG_COUNTERS]:
+            logfile = self.extract_file(name)
+            if logfile is not None: return logfile
+        return None
+
     def extract_tar(self, _folder=None):
         if _folder is None:
             _folder = self.INTERMEDIATE
@@ -78,37 +91,56 @@ class AFLOutputTar(AFLOutput):
     def list_files(self, _target=None, _verbose=True, _onlyfiles=False):
         filepaths = []
 
-        members = self.TAR.getmembers()
-        for member in members:
-            if _onlyfiles is True and member.isdir(): continue
-            if _target is not None  and member.name.startswith(_target) is False: continue
-            filepaths.append(member.name)
+        # the members are listed from the index
+        for name, info in self.get_index()["members"].items():
+            if _onlyfiles is True and info[4] == tarfile.DIRTYPE.decode(): continue
+            if _target is not None  and name.startswith(_target) is False: continue
+            filepaths.append(name)
 
         if _target is not None and _verbose is False:
             filepaths = [filename[len(_target)+1:] for filename in filepaths]
 
         return filepaths
 
+    def get_secondary_names(self):
+        # the secondary instances are found in the archive (they are not extracted yet)
+        names = set()
+        for name in self.list_files():
+            top = os.path.normpath(name).split(os.sep)[0]
+            if top.startswith(self.SECONDARY_PREFIX) and top[len(self.SECONDARY_PREFIX):].isdigit():
+                names.add(top)
+        return sorted(names)
+
+    def extract_instance_files(self, _filename):
+        # extract the file of the main instance (AFL_SUB_DIR) and the secondary instances
+        filepath = self.extract_file(utils.makepath(self.AFL_SUB_DIR, _filename))
+        for name in self.get_secondary_names():
+            self.extract_file(utils.makepath("./", name, _filename))
+        return filepath
+
     def close(self):
         if self.DELETE_TEMP_DIR is True and os.path.exists(self.INTERMEDIATE):
             shutil.rmtree(self.INTERMEDIATE)
-        self.TAR.close()
+        utils.release_tar_index(self.TAR_FILENAME)
+        pass
 
     ###############################################################
     # get total number of inputs that tested in the AFL (__num__ file)
     ###############################################################
     def get_number_of_inputs(self):
-        filepath = self.extract_file(self.NUM_INPUT_FILENAME)
-        if filepath is None: return None
+        data = self.read_file(self.NUM_INPUT_FILENAME)
+        if data is None: return None
 
-        return super().get_number_of_inputs()
+        value = data.decode().strip()
+        if value == "": return -1
+        return int(value)
 
     ###############################################################
     # load plot data
     ###############################################################
     def load_plot(self, _reverse=False, _n_lines=0):
         # load file
-        filepath = self.extract_file(utils.makepath(self.AFL_SUB_DIR, self.PLOT_DATA))
+        filepath = self.extract_instance_files(self.PLOT_DATA)
         if filepath is None: return None
 
         return super().load_plot(_reverse, _n_lines)
@@ -117,22 +149,26 @@ class AFLOutputTar(AFLOutput):
     # get total execution log information
     ###############################################################
     def load_stats_total_log(self, _remake=False):
+        # the stats are read from the archive directly if they are not remade
+        data = self.read_file(self.TOTAL_LOG_STATS) if _remake is False else None
+        if data is not None: return json.loads(data)
+
         self.extract_file(self.TOTAL_LOG_STATS)
         # I do not check the existence of stats, because it will make stats if the stats file does not exist
         return super().load_stats_total_log(_remake)
 
     def make_stats_total_log(self):
-        logfile = self.extract_file(self.TOTAL_LOG)
+        logfile = self.extract_total_log()
         if logfile is None: return None, None
         return super().make_stats_total_log()
 
     def load_total_execution_log(self):
-        logfile = self.extract_file(self.TOTAL_LOG)
+        logfile = self.extract_total_log()
         if logfile is None: return None
         return super().load_total_execution_log()
 
     def convert_total_execution_log(self):
-        logfile = self.extract_file(self.TOTAL_LOG)
+        logfile = self.extract_total_log()
         if logfile is None: return None
         return super().convert_total_execution_log()
 
@@ -140,7 +176,7 @@ class AFLOutputTar(AFLOutput):
     # load fuzzer
     ###############################################################
     def load_fuzzer_stats(self, _key=None):
-        filepath = self.extract_file(utils.makepath(self.AFL_SUB_DIR, self.FUZZER_STATS))
+        filepath = self.extract_instance_files(self.FUZZER_STATS)
         if filepath is None: return None
 
         return super().load_fuzzer_stats(_key)
@@ -177,7 +213,7 @@ class AFLOutputTar(AFLOutput):
     # Find issue executions in Tar file
     ########################################################
     def find_issue_executions(self):
-        if self.extract_file( self.TOTAL_LOG ) is None: return None
+        if self.extract_total_log() is None: return None
         if self.extract_file( utils.makepath(self.AFL_SUB_DIR, self.FUZZER_STATS) ) is None: return None
 
         super().find_issue_executions()
@@ -187,14 +223,9 @@ class AFLOutputTar(AFLOutput):
         extracts all timeIDs from log list from the detailed logs folder
         :return:
         '''
-        all_files = self.TAR.getmembers()
-
         timeIDs = set([])
-        for afile in all_files:
-            if afile.name.startswith(self.DETAILED_LOG_PATH) is False: continue
-            if afile.name == self.DETAILED_LOG_PATH: continue  # ignore the folder itself
-
-            filename = os.path.basename(afile.name)
+        for name in self.list_files(self.DETAILED_LOG_PATH, _onlyfiles=True):
+            filename = os.path.basename(name)
             timeID = int(filename[:-4])  # remove extension (from <timeID>.log to <timeID>)
             timeIDs.add(timeID)
 
@@ -0,0 +1,401 @@
+#! /usr/bin/env python3
+import os
+import json
+import struct
+
+try:
+    import numpy
+except ImportError:     # the analyses iterate the records of the log instead (see AFLOutput.iter_simple_execution_log)
+    numpy = None
+
+
+#####
+# Columnar loader of the execution journal written by the fuzzing driver (see FUZZING_EXECUTION_LOG and lib_fuzzing.c)
+#   - csv (total.log): a title line and a line for each execution "SeqID,TimeID,Initial,Origin,Mutant,Comp"
+#     (the columns of the check points are not written if the execution crashes before them)
+#   - binary (total.bin): a header (BINARY_HEADER) and a fixed-width record (BINARY_RECORD) for each execution
+#     at the position given by its sequence ID (a record of zeros is not executed)
+#   - counters (total.cnt): the counters of the executions (COUNTERS_LAYOUT), no record for each execution
+#   - The log is parsed by chunks into typed columns (a NumPy structured array of DTYPE),
+#     where a missing or non-1 value of a check point is False
+#   - The columns of a csv log are cached in a sidecar (<total.log>.npy and its meta file <total.log>.npy.json)
+#     that is loaded as a memory-mapped array while the size and the modified time of the log are the same
+# The columns require NumPy (see is_available()), but iter_rows() and the statistics of the counters do not.
+#####
+class ExecutionLog():
+    VERSION = 1
+    CSV = "csv"
+    BINARY = "binary"
+    COUNTERS = "counters"
+    STAGES = ["initial", "origin", "mutant", "comp"]
+    DTYPE = [("seq", "<i8"), ("timeID", "<i8"),
+             ("initial", "?"), ("origin", "?"), ("mutant", "?"), ("comp", "?")]
+    SIDECAR_EXT = ".npy"
+    META_EXT = ".npy.json"
+    CHUNK_SIZE = 16 * 1024 * 1024     # bytes to be parsed at once
+
+    # layouts of the binary formats (td_exec_log_header, td_exec_record and td_exec_counters in lib_fuzzing.c)
+    BINARY_MAGIC = b"MOTIFEXL"
+    BINARY_HEADER = struct.Struct("<8sIIQ")     # magic, version, record size, sequence ID base
+    BINARY_HEADER_SIZE = 64
+    BINARY_RECORD = struct.Struct("<Q4B4x")     # time ID, check points (Initial, Origin, Mutant, Comp)
+    COUNTERS_MAGIC = b"MOTIFCNT"
+    COUNTERS_LAYOUT = struct.Struct("<8sIIQQQQ4Q4QQQ4B4x")  # magic, version, reserved, sequence ID base, all,
+                                                           # last sequence ID, first time ID, failed[4],
+                                                           # first failed time ID[4], current sequence ID,
+                                                           # current time ID, current check points[4]
+
+    def __init__(self, _filepath, _cache=True):
+        self.filepath = _filepath
+        self.cache = _cache
+        self.sidecar = _filepath + self.SIDECAR_EXT
+        self.meta = _filepath + self.META_EXT
+        self.format = self.get_format(_filepath) if os.path.exists(_filepath) is True else self.CSV
+        self.data = None        # the columns loaded once for all the analyses of this object
+
+    @staticmethod
+    def is_available():
+        return numpy is not None
+
+    def is_analyzable(self):
+        # True if the statistics can be made without iterating the records
+        return self.is_available() is True or self.format == self.COUNTERS
+
+    @staticmethod
+    def get_format(_filepath):
+        with open(_filepath, "rb") as f:
+            magic = f.read(8)
+        if magic == ExecutionLog.BINARY_MAGIC: return ExecutionLog.BINARY
+        if magic == ExecutionLog.COUNTERS_MAGIC: return ExecutionLog.COUNTERS
+        return ExecutionLog.CSV
+
+    ########################################################
+    # iterate the records (without NumPy)
+    ########################################################
+    @staticmethod
+    def iter_rows(_filepath):
+        '''
+        :return: (seq, timeID, initial, origin, mutant, comp) for each execution (no record for the counters)
+        '''
+        log_format = ExecutionLog.get_format(_filepath)
+        if log_format == ExecutionLog.BINARY:
+            yield from ExecutionLog.iter_binary_rows(_filepath)
+            return
+        if log_format == ExecutionLog.COUNTERS: return
+
+        with open(_filepath, "r") as file:
+            line = file.readline()       # throw away the first line (title line)
+            while True:
+                line = file.readline()
+                line = line.strip()
+                if line == '': break
+
+                # convert column values
+                cols = line.split(',')
+                yield (int(cols[0].strip()), int(cols[1].strip()), int(cols[2].strip()),
+                       int(cols[3].strip()) if len(cols)>3 else 0,
+                       int(cols[4].strip()) if len(cols)>4 else 0,
+                       int(cols[5].strip()) if len(cols)>5 else 0)
+        pass
+
+    @staticmethod
+    def iter_binary_rows(_filepath):
+        with open(_filepath, "rb") as f:
+            seq_base = ExecutionLog.read_binary_header(f.read(ExecutionLog.BINARY_HEADER_SIZE))
+            idx = 0
+            while True:
+                block = f.read(ExecutionLog.BINARY_RECORD.size * 4096)
+                if block == b"": break
+                for timeID, initial, origin, mutant, comp in ExecutionLog.BINARY_RECORD.iter_unpack(block):
+                    idx += 1
+                    if timeID == 0: continue
+                    yield (seq_base + idx, timeID, initial, origin, mutant, comp)
+        pass
+
+    @staticmethod
+    def read_binary_header(_header):
+        magic, version, record_size, seq_base = ExecutionLog.BINARY_HEADER.unpack_from(_header)
+        if version != 1 or record_size != ExecutionLog.BINARY_RECORD.size:
+            raise ValueError("Unsupported binary execution log (version: %d, record size: %d)" % (version, record_size))
+        return seq_base
+
+    ########################################################
+    # load the columns
+    ########################################################
+    def load(self):
+        '''
+        :return: structured array of the executions (DTYPE)
+        '''
+        if self.data is None:
+            self.data = self.load_columns()
+        return self.data
+
+    def load_columns(self):
+        if self.format != self.CSV: return self.parse()
+        source = self.get_source_info()
+        data = self.load_sidecar(source)
+        if data is not None: return data
+
+        data = self.parse()
+        if self.cache is True:
+            self.store_sidecar(data, source)
+        return data
+
+    def get_source_info(self):
+        stat = os.stat(self.filepath)
+        return {"version": self.VERSION, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def load_sidecar(self, _source):
+        try:
+            with open(self.meta, "r") as f:
+                meta = json.load(f)
+            if meta != _source: return None
+            return numpy.load(self.sidecar, mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+
+    def store_sidecar(self, _data, _source):
+        # the sidecar is written before its meta file, so a valid meta file always points to a complete sidecar
+        try:
+            temp_file = "%s.%d.tmp" % (self.sidecar, os.getpid())
+            with open(temp_file, "wb") as f:
+                numpy.save(f, _data)
+            os.replace(temp_file, self.sidecar)
+            temp_file = "%s.%d.tmp" % (self.meta, os.getpid())
+            with open(temp_file, "w") as f:
+                json.dump(_source, f)
+            os.replace(temp_file, self.meta)
+        except OSError:
+            return False
+        return True
+
+    def remove_sidecar(self):
+        for filepath in [self.meta, self.sidecar]:
+            if os.path.exists(filepath) is True:
+                os.remove(filepath)
+        pass
+
+    ########################################################
+    # parse the log
+    ########################################################
+    def parse(self):
+        '''
+        parse the log by chunks (stops at the first empty line as AFLOutput.iter_simple_execution_log)
+        :return: structured array of the executions (DTYPE)
+        '''
+        if self.format == self.BINARY: return self.parse_binary()
+        if self.format == self.COUNTERS: return numpy.zeros(0, dtype=self.DTYPE)
+
+        parts = []
+        with open(self.filepath, "rb") as f:
+            f.readline()        # throw away the first line (title line)
+            rest = b""
+            while True:
+                block = f.read(self.CHUNK_SIZE)
+                data = rest + block
+                if block == b"":
+                    if data == b"": break
+                    lines, rest = data, b""
+                else:
+                    cut = data.rfind(b"\n")
+                    if cut < 0:
+                        rest = data
+                        continue
+                    lines, rest = data[:cut], data[cut + 1:]
+
+                # the values are stripped as in the iterator
+                lines = lines.translate(None, b" \t\r")
+                end = self.find_empty_line(lines)
+                if end >= 0: lines = lines[:end]
+                if lines != b"": parts.append(self.parse_lines(lines))
+                if end >= 0 or block == b"": break
+
+        if len(parts) == 0: return numpy.zeros(0, dtype=self.DTYPE)
+        return numpy.concatenate(parts)
+
+    @staticmethod
+    def find_empty_line(_lines):
+        '''
+        :param _lines: lines joined with line breaks (b"" is one empty line)
+        :return: the position of the line break before the first empty line (-1 if there is no empty line)
+        '''
+        if _lines == b"" or _lines.startswith(b"\n"): return 0
+        idx = _lines.find(b"\n\n")
+        if idx >= 0: return idx
+        if _lines.endswith(b"\n"): return len(_lines) - 1
+        return -1
+
+    def parse_lines(self, _lines):
+        '''
+        convert the lines into the columns without iterating them
+        :param _lines: non-empty lines joined with line breaks
+        :return: structured array of the executions (DTYPE)
+        '''
+        buffer = numpy.frombuffer(_lines, dtype=numpy.uint8)
+        line_ends = numpy.append(numpy.flatnonzero(buffer == ord("\n")), len(buffer))
+        commas = numpy.flatnonzero(buffer == ord(","))
+
+        # the number of values in each line
+        n_values = numpy.diff(numpy.searchsorted(commas, line_ends), prepend=0) + 1
+        flat = _lines.replace(b"\n", b",")
+        try:
+            values = numpy.fromstring(flat, dtype=numpy.int64, sep=",")
+        except ValueError:
+            values = None
+        if values is None or len(values) != n_values.sum():
+            # raises ValueError for an invalid value as the iterator
+            values = numpy.array([int(value) for value in flat.split(b",")], dtype=numpy.int64)
+
+        # place each value into its line and column
+        n_lines = len(line_ends)
+        rows = numpy.repeat(numpy.arange(n_lines), n_values)
+        cols = numpy.arange(len(values)) - numpy.repeat(numpy.cumsum(n_values) - n_values, n_values)
+        table = numpy.zeros((n_lines, len(self.DTYPE)), dtype=numpy.int64)
+        valid = cols < len(self.DTYPE)
+        table[rows[valid], cols[valid]] = values[valid]
+
+        data = numpy.zeros(n_lines, dtype=self.DTYPE)
+        data["seq"] = table[:, 0]
+        data["timeID"] = table[:, 1]
+        for idx, stage in enumerate(self.STAGES):
+            data[stage] = table[:, 2 + idx] == 1
+        return data
+
+    def parse_binary(self):
+        # the records are already in columns, only the executed records are selected
+        with open(self.filepath, "rb") as f:
+            seq_base = self.read_binary_header(f.read(self.BINARY_HEADER_SIZE))
+        n_records = (os.path.getsize(self.filepath) - self.BINARY_HEADER_SIZE) // self.BINARY_RECORD.size
+        if n_records <= 0: return numpy.zeros(0, dtype=self.DTYPE)
+        records = numpy.memmap(self.filepath, mode="r", offset=self.BINARY_HEADER_SIZE, shape=(n_records,),
+                               dtype=[("timeID", "<u8"), ("checks", "u1", (4,)), ("reserved", "V4")])
+        index = numpy.flatnonzero(records["timeID"] != 0)
+
+        data = numpy.zeros(len(index), dtype=self.DTYPE)
+        data["seq"] = seq_base + 1 + index
+        data["timeID"] = records["timeID"][index]
+        checks = records["checks"][index]
+        for idx, stage in enumerate(self.STAGES):
+            data[stage] = checks[:, idx] == 1
+        return data
+
+    ########################################################
+    # statistics of the counters (without NumPy)
+    ########################################################
+    def load_counters(self):
+        with open(self.filepath, "rb") as f:
+            values = self.COUNTERS_LAYOUT.unpack(f.read(self.COUNTERS_LAYOUT.size))
+        if values[1] != 1:
+            raise ValueError("Unsupported execution counters (version: %d)" % values[1])
+        return {"all": values[4], "last_seq": values[5], "first_timeID": values[6],
+                "failed": list(values[7:11]), "first_failed_timeID": list(values[11:15]),
+                "cur_seq": values[15], "cur_timeID": values[16], "cur_checks": list(values[17:21])}
+
+    def get_counter_stats(self):
+        '''
+        statistics of the counters (the same values with get_stats() for the records of the executions)
+        '''
+        counters = self.load_counters()
+        failed = counters["failed"]
+        first_failed = counters["first_failed_timeID"]
+
+        # the last execution is counted by the reader (see logging_check_point in lib_fuzzing.c)
+        stage, flag_elapsed = None, False
+        if counters["cur_seq"] != 0:
+            for idx, value in enumerate(counters["cur_checks"]):
+                if value == 1: continue
+                stage = self.STAGES[idx]
+                failed[idx] += 1
+                if first_failed[idx] == 0:
+                    flag_elapsed = True
+                    first_failed[idx] = counters["cur_timeID"]
+                break
+
+        counts = {"all": counters["all"]}
+        elapsed = {"all": -1}
+        for idx, name in enumerate(self.STAGES):
+            counts[name] = failed[idx]
+            elapsed[name] = -1
+            if first_failed[idx] == 0: continue
+            time = first_failed[idx] - counters["first_timeID"]
+            elapsed[name] = time / 1000000 if time > 0 else 0
+        if counters["all"] > 0: counts["seq"] = counters["last_seq"]
+        return counts, elapsed, stage, flag_elapsed
+
+    ########################################################
+    # analyses of the columns
+    ########################################################
+    @staticmethod
+    def get_elapsed(_data):
+        # elapsed time from the first execution (in seconds)
+        if len(_data) == 0: return numpy.zeros(0)
+        return (_data["timeID"] - _data["timeID"][0]) / 1000000
+
+    @staticmethod
+    def get_failed_stages(_data):
+        # index of the first failed stage in STAGES for each execution (-1 if the execution passes all the stages)
+        failed = numpy.full(len(_data), -1, dtype=numpy.int8)
+        for idx in reversed(range(len(ExecutionLog.STAGES))):
+            failed[~_data[ExecutionLog.STAGES[idx]]] = idx
+        return failed
+
+    def count_stages(self):
+        '''
+        :return: the number of executions failed at each stage {"all", "initial", "origin", "mutant", "comp"}
+        '''
+        if self.format == self.COUNTERS:
+            counts = self.get_counter_stats()[0]
+            counts.pop("seq", None)
+            return counts
+
+        data = self.load()
+        failed = self.get_failed_stages(data)
+        numbers = numpy.bincount(failed[failed >= 0], minlength=len(self.STAGES))
+        counts = {"all": int(len(data))}
+        for idx, stage in enumerate(self.STAGES):
+            counts[stage] = int(numbers[idx])
+        return counts
+
+    def get_stats(self):
+        '''
+        basic statistics of the log (see AFLOutput.make_stats_total_log)
+        :return: counts, elapsed, the failed stage of the last execution (None if passed),
+                 True if the last execution gives the elapsed time of the stage
+        '''
+        if self.format == self.COUNTERS: return self.get_counter_stats()
+
+        counts = {"all":0, "initial":0, "origin":0, "mutant":0, "comp":0}
+        elapsed = {"all":-1, "initial":-1, "origin":-1, "mutant":-1, "comp":-1}
+        data = self.load()
+        if len(data) == 0: return counts, elapsed, None, False
+
+        counts['all'] = int(len(data))
+        counts['seq'] = int(data['seq'][-1])
+        failed = self.get_failed_stages(data)
+        times = self.get_elapsed(data)
+        firsts = {}
+        for idx, stage in enumerate(self.STAGES):
+            rows = numpy.flatnonzero(failed == idx)
+            counts[stage] = int(len(rows))
+            if len(rows) == 0: continue
+            firsts[stage] = int(rows[0])
+            elapsed[stage] = float(times[rows[0]]) if rows[0] > 0 else 0
+
+        if failed[-1] < 0: return counts, elapsed, None, False
+        stage = self.STAGES[failed[-1]]
+        return counts, elapsed, stage, firsts[stage] == len(data) - 1
+
+    def get_missing_inputs(self, _known_seqs):
+        '''
+        :param _known_seqs: sequence IDs of the inputs already stored
+        :return: sequence IDs of the executions that pass the initial and origin stages and fail in the others,
+                 but whose inputs are not in the _known_seqs
+        '''
+        data = self.load()
+        known = numpy.fromiter(_known_seqs, dtype=numpy.int64)
+        selected = data["initial"] & data["origin"] & ~(data["mutant"] & data["comp"])
+        selected &= ~numpy.isin(data["seq"], known)
+        return data["seq"][selected].tolist()
+
+    def get_seqs(self):
+        return set(self.load()["seq"].tolist())
@@ -0,0 +1,179 @@
+#! /usr/bin/env python3
+import os
+import json
+import time
+import fcntl
+import shutil
+import hashlib
+
+
+#####
+# Content-addressed store of the inputs killing mutants
+#   - The inputs are identified by the SHA-256 hash of their contents
+#   - objects/<h[:2]>/<hash>: content of an input (stored once for all the runs and the mutants)
+#   - refs.jsonl: append-only references {"hash", "mutant", "run", "path"} (which runs found the input)
+#   - expected/<function key>/<h[:2]>/<hash>.{params,returns}: expected values of the function for the input
+#     (the expected driver calls only the original function, so the values are shared by the mutants of the function)
+# The store can be shared by multiple concurrent executions (the files are written atomically and refs.jsonl is locked)
+#
+# In a fuzzing result, the index file (inputs.index.json) lists the unique inputs of `inputs` and `falses`
+#   {"version": VERSION, "files": {<path from the result directory>: <hash>}}
+#####
+class InputStore():
+    VERSION = 1
+    INDEX_FILE = "./inputs.index.json"
+    OBJECTS_DIR = "objects"
+    EXPECTED_DIR = "expected"
+    REFS_FILE = "refs.jsonl"
+    EXPECTED_EXTS = [".params", ".returns"]
+
+    def __init__(self, _store_path):
+        self.STORE_PATH = _store_path
+
+    ########################################################
+    # hashes of the inputs
+    ########################################################
+    @staticmethod
+    def hash_file(_filepath):
+        hasher = hashlib.sha256()
+        with open(_filepath, "rb") as f:
+            for block in iter(lambda: f.read(65536), b""):
+                hasher.update(block)
+        return hasher.hexdigest()
+
+    @staticmethod
+    def dedup(_files, _hashes=None):
+        '''
+        find the duplicated inputs by their hashes (the first file of the same content is kept)
+        :param _files: list of input files
+        :param _hashes: hashes of the files already known {filepath: hash} (e.g., loaded from the index)
+        :return: ({hash: unique file}, [(duplicated file, hash)])
+        '''
+        unique = {}
+        duplicates = []
+        for filepath in _files:
+            digest = _hashes.get(os.path.normpath(filepath)) if _hashes is not None else None
+            if digest is None: digest = InputStore.hash_file(filepath)
+            if digest in unique:
+                duplicates.append((filepath, digest))
+            else:
+                unique[digest] = filepath
+        return unique, duplicates
+
+    ########################################################
+    # index of a fuzzing result
+    ########################################################
+    @staticmethod
+    def store_index(_base_path, _files):
+        '''
+        :param _base_path: fuzzing result directory
+        :param _files: {hash: file path under the _base_path}
+        :return: {path from the _base_path: hash}
+        '''
+        base = os.path.abspath(_base_path)
+        files = {os.path.relpath(os.path.abspath(filepath), base): digest for digest, filepath in _files.items()}
+        index_file = os.path.join(_base_path, InputStore.INDEX_FILE)
+        with open(index_file, "w") as f:
+            json.dump({"version": InputStore.VERSION, "files": files}, f, indent=1, sort_keys=True)
+        return files
+
+    @staticmethod
+    def load_index(_base_path):
+        '''
+        :return: {normalized file path (joined with the _base_path): hash}, None if there is no valid index
+        '''
+        index_file = os.path.join(_base_path, InputStore.INDEX_FILE)
+        try:
+            with open(index_file, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != InputStore.VERSION: return None
+        return {os.path.normpath(os.path.join(_base_path, path)): digest for path, digest in data["files"].items()}
+
+    ########################################################
+    # shared store
+    ########################################################
+    def get_object_path(self, _hash):
+        return os.path.join(self.STORE_PATH, self.OBJECTS_DIR, _hash[:2], _hash)
+
+    def add(self, _base_path, _files, _mutant, _runID=None):
+        '''
+        add the inputs of a fuzzing result into the store
+        :param _base_path: fuzzing result directory
+        :param _files: {hash: file path under the _base_path}
+        :param _mutant: name of the mutant that is killed by the inputs
+        :return: the number of new inputs in the store
+        '''
+        count = 0
+        refs = []
+        for digest, filepath in _files.items():
+            if self.copy_atomic(filepath, self.get_object_path(digest)) is True:
+                count += 1
+            refs.append({"hash": digest, "mutant": _mutant, "run": _runID, "path": os.path.relpath(filepath, _base_path),
+                         "time": time.strftime("%Y-%m-%d %H:%M:%S")})
+
+        refs_file = os.path.join(self.STORE_PATH, self.REFS_FILE)
+        os.makedirs(self.STORE_PATH, exist_ok=True)
+        with open(refs_file, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                for ref in refs:
+                    f.write(json.dumps(ref) + "\n")
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        return count
+
+    def load_refs(self):
+        '''
+        :return: {hash: list of the references}
+        '''
+        refs = {}
+        refs_file = os.path.join(self.STORE_PATH, self.REFS_FILE)
+        if os.path.exists(refs_file) is False: return refs
+        with open(refs_file, "r") as f:
+            for line in f:
+                line = line.strip()
+                if line == "": continue
+                try:
+                    ref = json.loads(line)
+                except ValueError:
+                    continue    # a record that is being written
+                refs.setdefault(ref["hash"], []).append(ref)
+        return refs
+
+    @staticmethod
+    def make_function_key(*_values):
+        # key of the function that gives the expected values (e.g., the source path, the function and the source hash)
+        return hashlib.sha256("\n".join([str(value) for value in _values]).encode()).hexdigest()[:32]
+
+    def get_expected_path(self, _func_key, _hash):
+        return os.path.join(self.STORE_PATH, self.EXPECTED_DIR, _func_key, _hash[:2], _hash)
+
+    def load_expected(self, _func_key, _hash, _expected_file):
+        '''
+        copy the stored expected values of the input into the _expected_file (.params and .returns)
+        :return: True if the expected values are in the store
+        '''
+        stored = self.get_expected_path(_func_key, _hash)
+        if all(os.path.exists(stored + ext) for ext in self.EXPECTED_EXTS) is False: return False
+        for ext in self.EXPECTED_EXTS:
+            shutil.copyfile(stored + ext, _expected_file + ext)
+        return True
+
+    def store_expected(self, _func_key, _hash, _expected_file):
+        if all(os.path.exists(_expected_file + ext) for ext in self.EXPECTED_EXTS) is False: return False
+        stored = self.get_expected_path(_func_key, _hash)
+        for ext in self.EXPECTED_EXTS:
+            self.copy_atomic(_expected_file + ext, stored + ext)
+        return True
+
+    def copy_atomic(self, _src, _dest):
+        # the other executions see only the complete file
+        if os.path.exists(_dest) is True: return False
+        os.makedirs(os.path.dirname(_dest), exist_ok=True)
+        temp_file = "%s.%d.tmp" % (_dest, os.getpid())
+        shutil.copyfile(_src, temp_file)
+        os.replace(temp_file, _dest)
+        return True
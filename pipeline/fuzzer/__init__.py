@@ -1,2 +1,4 @@
 from .AFLOutput import *
 from .AFLOutputTar import *
+from .InputStore import *
+from .ExecutionLog import *
@@ -0,0 +1,102 @@
+#include <errno.h>
+#include <signal.h>
+#include <sys/time.h>
+#include <sys/wait.h>
+
+/**************************************************
+* Batch replay mode
+*   <driver> --batch <manifest_file> <result_file> <timeout_ms>
+*   - manifest_file: one execution per line, the tab-separated values are given to the driver as its arguments
+*                    (e.g., "<input_file>\t<output_file>")
+*   - result_file: a record for each execution in the order of the manifest
+*                  "#MOTIF-BATCH <line_no> <exit_code> <timeout> <output_size>\n" followed by the output (stdout and stderr)
+*   Each execution is isolated in a child process (fork), so a crash of an input does not affect the others.
+*   The exit code follows the shell convention (128 + signal number if the execution is killed by a signal).
+***************************************************/
+#define TD_BATCH_OPTION "--batch"
+#define TD_BATCH_MAX_ARGS 16
+#define TD_BATCH_LINE_SIZE 10000
+
+typedef int (*td_main_func)(int, char**);
+
+int batch_execute(td_main_func main_func, char* program, char* line, long timeout_ms, FILE* result, int line_no){
+    // make arguments of the execution
+    char* args[TD_BATCH_MAX_ARGS+2];
+    int n_args = 0;
+    args[n_args++] = program;
+    for (char* token = strtok(line, "\t"); token != NULL && n_args <= TD_BATCH_MAX_ARGS; token = strtok(NULL, "\t")){
+        args[n_args++] = token;
+    }
+    args[n_args] = NULL;
+
+    int fds[2];
+    if (pipe(fds) != 0) { perror("pipe"); return -1; }
+    fflush(NULL);   // not to duplicate the buffered data into the child
+
+    pid_t pid = fork();
+    if (pid < 0) { perror("fork"); return -1; }
+    if (pid == 0){
+        // child: redirect the outputs into the pipe and execute the driver with a timer
+        close(fds[0]);
+        dup2(fds[1], STDOUT_FILENO);
+        dup2(fds[1], STDERR_FILENO);
+        close(fds[1]);
+        if (timeout_ms > 0){
+            struct itimerval timer;
+            memset(&timer, 0, sizeof(timer));
+            timer.it_value.tv_sec = timeout_ms / 1000;
+            timer.it_value.tv_usec = (timeout_ms % 1000) * 1000;
+            setitimer(ITIMER_REAL, &timer, NULL);  // SIGALRM terminates the child
+        }
+        int ret = main_func(n_args, args);
+        fflush(NULL);
+        _exit(ret);     // not to touch the manifest stream shared with the parent
+    }
+
+    // parent: collect the outputs of the child
+    close(fds[1]);
+    size_t capacity = 4096, size = 0;
+    char* output = (char*) malloc(capacity);
+    ssize_t rdsize = 0;
+    while ((rdsize = read(fds[0], output + size, capacity - size)) != 0){
+        if (rdsize < 0) { if (errno == EINTR) continue; break; }
+        size += rdsize;
+        if (size == capacity) { capacity *= 2; output = (char*) realloc(output, capacity); }
+    }
+    close(fds[0]);
+
+    int status = 0;
+    while (waitpid(pid, &status, 0) < 0 && errno == EINTR);
+    int timeout = WIFSIGNALED(status) && WTERMSIG(status) == SIGALRM ? 1 : 0;
+    int exit_code = WIFEXITED(status) ? WEXITSTATUS(status) : 128 + WTERMSIG(status);
+
+    fprintf(result, "#MOTIF-BATCH %d %d %d %zu\n", line_no, exit_code, timeout, size);
+    fwrite(output, 1, size, result);
+    fflush(result);
+    free(output);
+    return exit_code;
+}
+
+int batch_main(int argc, char** argv, td_main_func main_func){
+    if (argc < 5){
+        printf("Usage: %s %s <manifest_file> <result_file> <timeout_ms>\n", argv[0], TD_BATCH_OPTION);
+        return 1;
+    }
+    FILE* manifest = fopen(argv[2], "r");
+    if (manifest == NULL) { perror("manifest"); return 1; }
+    FILE* result = fopen(argv[3], "wb");
+    if (result == NULL) { perror("result"); fclose(manifest); return 1; }
+    long timeout_ms = strtol(argv[4], NULL, 10);
+
+    char line[TD_BATCH_LINE_SIZE];
+    int line_no = 0;
+    while (fgets(line, sizeof(line), manifest) != NULL){
+        line_no++;
+        line[strcspn(line, "\r\n")] = 0;
+        if (line[0] == 0) continue;
+        batch_execute(main_func, argv[0], line, timeout_ms, result, line_no);
+    }
+    fclose(manifest);
+    fclose(result);
+    return 0;
+}
@@ -5,7 +5,6 @@
 ***************************************************/
 char LOG_DIR_NAME[5] = "logs";
 char INPUT_DIR_NAME[7] = "inputs";
-char SINGLE_LOG_NAME[10] = "total.log";
 char SEQUENCE_NAME[8] = "__num__";
 char * TD_WORKING_DIR = NULL;      // keeping working directory
 
@@ -13,6 +12,7 @@ char * TD_WORKING_DIR = NULL;      // keeping working directory
 * Manage execution ID
 ***************************************************/
 unsigned long long TD_SEQ_ID = 0;  // sequence_id
+unsigned long long TD_SEQ_BASE = 0; // the first sequence_id is TD_SEQ_BASE+1 (set by MOTIF_SEQ_BASE for the secondary fuzzer instances)
 unsigned long long TD_TIME_ID = 0;
 unsigned long long DIST_BASE_NUM = 5000; // (maximum file nums in a folder)
 const int TD_PATH_BUF_SIZE = 5000;
@@ -53,10 +53,14 @@ unsigned long long set_seq_id(){
     sprintf(filepath, "%s/%s", TD_WORKING_DIR, SEQUENCE_NAME);
 
 
+    // get the base of the sequence_id
+    char *base = getenv("MOTIF_SEQ_BASE");
+    if (base != NULL) TD_SEQ_BASE = strtoull(base, NULL, 10);
+
     // This try is not perfect, if you have better idea, please update it.
     if (access(filepath, F_OK) != 0) {
         FILE *fd = fopen(filepath, "w");
-        fprintf(fd, "0");
+        fprintf(fd, "%llu", TD_SEQ_BASE);
         fclose(fd);
     }
 
@@ -133,16 +137,229 @@ void logging(const char *msg){
 }
 
 /**************************************************
-* Simple logging functions
+* Simple logging functions (execution journal)
+*   The format is selected by FUZZING_EXECUTION_LOG (see pipeline/fuzzer/ExecutionLog.py for the readers)
+*   - csv: a text line "SeqID,TimeID,Initial,Origin,Mutant,Comp" appended to total.log for each execution
+*   - binary: a fixed-width record for each execution in total.bin at the position given by its sequence ID
+*   - counters: only the counters of the executions failed at each stage in total.cnt (statistics-only runs)
+*   The binary and counters files are mapped into the memory (MAP_SHARED), so the records are buffered
+*   by the kernel without any system call for each check point and still survive a crash of the driver.
 ***************************************************/
+unsigned long TD_SN_LOG_CNT=0;      // the number of check points logged for the current execution
+
+// print the check point if there is no working directory
+void print_check_point(const int i){
+    if (TD_SN_LOG_CNT == 0) printf("\n%llu,%llu,1", TD_SEQ_ID,TD_TIME_ID);
+    else                    printf(",%d", i);
+    fflush(stdout);
+}
+
+{% if execution_log == "binary" %}
+#include <stdint.h>
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+
+// total.bin: a header (TD_EXEC_LOG_HEADER_SIZE bytes) and a record at
+//            TD_EXEC_LOG_HEADER_SIZE + (SeqID - SeqBase - 1) * sizeof(td_exec_record) (a record is zero until its execution)
+char SINGLE_LOG_NAME[10] = "total.bin";
+#define TD_EXEC_LOG_MAGIC "MOTIFEXL"
+#define TD_EXEC_LOG_VERSION 1
+#define TD_EXEC_LOG_HEADER_SIZE 64
+#define TD_EXEC_LOG_WINDOW (64*1024)    // bytes mapped at once (the window is flushed when the next one is mapped)
+
+typedef struct {
+    char magic[8];
+    uint32_t version;
+    uint32_t record_size;
+    uint64_t seq_base;
+} td_exec_log_header;
+
+typedef struct {
+    uint64_t time_id;
+    uint8_t checks[4];      // Initial, Origin, Mutant, Comp (0 if the execution does not reach the check point)
+    uint8_t reserved[4];
+} td_exec_record;
+
+int TD_SN_LOG_FD = -1;
+char* TD_SN_LOG_MAP = NULL;
+off_t TD_SN_LOG_MAP_OFFSET = 0;
+td_exec_record* TD_SN_RECORD = NULL;
+
+int log_map_window(off_t offset){
+    if (TD_SN_LOG_MAP != NULL){
+        msync(TD_SN_LOG_MAP, TD_EXEC_LOG_WINDOW, MS_ASYNC);
+        munmap(TD_SN_LOG_MAP, TD_EXEC_LOG_WINDOW);
+        TD_SN_LOG_MAP = NULL;
+    }
+
+    // extend the file to the end of the window (the last byte belongs to the reserved bytes of a record)
+    struct stat st;
+    if (fstat(TD_SN_LOG_FD, &st) != 0) return -1;
+    if (st.st_size < offset + TD_EXEC_LOG_WINDOW){
+        char zero = 0;
+        if (pwrite(TD_SN_LOG_FD, &zero, 1, offset + TD_EXEC_LOG_WINDOW - 1) != 1) return -1;
+    }
+
+    void* map = mmap(NULL, TD_EXEC_LOG_WINDOW, PROT_READ | PROT_WRITE, MAP_SHARED, TD_SN_LOG_FD, offset);
+    if (map == MAP_FAILED) return -1;
+    TD_SN_LOG_MAP = (char*) map;
+    TD_SN_LOG_MAP_OFFSET = offset;
+    return 0;
+}
+
+void log_open_check(){
+    if (TD_SN_LOG_FD < 0){
+        char logpath[TD_PATH_BUF_SIZE];
+        sprintf(logpath, "%s/%s", TD_WORKING_DIR, SINGLE_LOG_NAME);
+        TD_SN_LOG_FD = open(logpath, O_RDWR | O_CREAT, 0644);
+        if (TD_SN_LOG_FD < 0) return;
+
+        struct stat st;
+        if (fstat(TD_SN_LOG_FD, &st) == 0 && st.st_size < TD_EXEC_LOG_HEADER_SIZE){
+            char header[TD_EXEC_LOG_HEADER_SIZE];
+            td_exec_log_header* info = (td_exec_log_header*) header;
+            memset(header, 0, sizeof(header));
+            memcpy(info->magic, TD_EXEC_LOG_MAGIC, 8);
+            info->version = TD_EXEC_LOG_VERSION;
+            info->record_size = sizeof(td_exec_record);
+            info->seq_base = TD_SEQ_BASE;
+            pwrite(TD_SN_LOG_FD, header, sizeof(header), 0);
+        }
+    }
+
+    // select the record of this execution
+    TD_SN_RECORD = NULL;
+    off_t offset = TD_EXEC_LOG_HEADER_SIZE + (off_t)(TD_SEQ_ID - TD_SEQ_BASE - 1) * sizeof(td_exec_record);
+    off_t window = (offset / TD_EXEC_LOG_WINDOW) * TD_EXEC_LOG_WINDOW;
+    if (TD_SN_LOG_MAP == NULL || window != TD_SN_LOG_MAP_OFFSET){
+        if (log_map_window(window) != 0) return;
+    }
+    TD_SN_RECORD = (td_exec_record*) (TD_SN_LOG_MAP + (offset - window));
+}
+
+void log_close_check() {
+    if (TD_SN_LOG_MAP != NULL){
+        munmap(TD_SN_LOG_MAP, TD_EXEC_LOG_WINDOW);
+        TD_SN_LOG_MAP = NULL;
+    }
+    if (TD_SN_LOG_FD >= 0){
+        close(TD_SN_LOG_FD);
+        TD_SN_LOG_FD = -1;
+    }
+    TD_SN_RECORD = NULL;
+}
+
+void logging_check_point(const int i){
+    if (TD_SN_RECORD == NULL) print_check_point(i);
+    else if (TD_SN_LOG_CNT == 0){
+        TD_SN_RECORD->checks[0] = 1;
+        TD_SN_RECORD->time_id = TD_TIME_ID;     // the record is valid when its time ID is set
+    }
+    else if (TD_SN_LOG_CNT < 4) TD_SN_RECORD->checks[TD_SN_LOG_CNT] = (uint8_t) i;
+    TD_SN_LOG_CNT++;
+}
+
+{% elif execution_log == "counters" %}
+#include <stdint.h>
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+
+// total.cnt: the counters of the executions (one driver process at a time for a working directory, as AFL executes it)
+//   The failed stage of an execution is counted by the next execution (or by the reader for the last execution),
+//   since the execution may not be able to count it by itself (e.g., crashed)
+char SINGLE_LOG_NAME[10] = "total.cnt";
+#define TD_EXEC_LOG_MAGIC "MOTIFCNT"
+#define TD_EXEC_LOG_VERSION 1
+
+typedef struct {
+    char magic[8];
+    uint32_t version;
+    uint32_t reserved;
+    uint64_t seq_base;
+    uint64_t all;                       // the number of executions
+    uint64_t last_seq;                  // the sequence ID of the last execution
+    uint64_t first_time_id;             // the time ID of the first execution
+    uint64_t failed[4];                 // the number of executions failed at each stage (Initial, Origin, Mutant, Comp)
+    uint64_t first_failed_time_id[4];   // the time ID of the first execution failed at each stage
+    uint64_t cur_seq;                   // the current (or last) execution
+    uint64_t cur_time_id;
+    uint8_t cur_checks[4];
+    uint8_t cur_reserved[4];
+} td_exec_counters;
+
+int TD_SN_LOG_FD = -1;
+td_exec_counters* TD_SN_COUNTERS = NULL;
+
+void log_open_check(){
+    if (TD_SN_COUNTERS != NULL) return;
+    char logpath[TD_PATH_BUF_SIZE];
+    sprintf(logpath, "%s/%s", TD_WORKING_DIR, SINGLE_LOG_NAME);
+    TD_SN_LOG_FD = open(logpath, O_RDWR | O_CREAT, 0644);
+    if (TD_SN_LOG_FD < 0) return;
+
+    struct stat st;
+    if (fstat(TD_SN_LOG_FD, &st) == 0 && st.st_size < (off_t) sizeof(td_exec_counters)){
+        td_exec_counters init;
+        memset(&init, 0, sizeof(init));
+        memcpy(init.magic, TD_EXEC_LOG_MAGIC, 8);
+        init.version = TD_EXEC_LOG_VERSION;
+        init.seq_base = TD_SEQ_BASE;
+        pwrite(TD_SN_LOG_FD, &init, sizeof(init), 0);
+    }
+
+    void* map = mmap(NULL, sizeof(td_exec_counters), PROT_READ | PROT_WRITE, MAP_SHARED, TD_SN_LOG_FD, 0);
+    if (map != MAP_FAILED) TD_SN_COUNTERS = (td_exec_counters*) map;
+}
+
+void log_close_check() {
+    if (TD_SN_COUNTERS != NULL){
+        munmap(TD_SN_COUNTERS, sizeof(td_exec_counters));
+        TD_SN_COUNTERS = NULL;
+    }
+    if (TD_SN_LOG_FD >= 0){
+        close(TD_SN_LOG_FD);
+        TD_SN_LOG_FD = -1;
+    }
+}
+
+void logging_check_point(const int i){
+    td_exec_counters* cnt = TD_SN_COUNTERS;
+    if (cnt == NULL) print_check_point(i);
+    else if (TD_SN_LOG_CNT == 0){
+        // count the previous execution at the first stage it did not pass
+        if (cnt->cur_seq != 0){
+            for (int k = 0; k < 4; k++){
+                if (cnt->cur_checks[k] == 1) continue;
+                cnt->failed[k]++;
+                if (cnt->first_failed_time_id[k] == 0) cnt->first_failed_time_id[k] = cnt->cur_time_id;
+                break;
+            }
+        }
+        memset(cnt->cur_checks, 0, sizeof(cnt->cur_checks));
+        cnt->cur_checks[0] = 1;
+        cnt->cur_seq = TD_SEQ_ID;
+        cnt->cur_time_id = TD_TIME_ID;
+        if (cnt->first_time_id == 0) cnt->first_time_id = TD_TIME_ID;
+        cnt->last_seq = TD_SEQ_ID;
+        cnt->all++;
+    }
+    else if (TD_SN_LOG_CNT < 4) cnt->cur_checks[TD_SN_LOG_CNT] = (uint8_t) i;
+    TD_SN_LOG_CNT++;
+}
+
+{% else %}
+char SINGLE_LOG_NAME[10] = "total.log";
 FILE* TD_SN_LOG_FP=NULL;
 
 void log_open_check(){
+    if (TD_SN_LOG_FP != NULL) return;      // kept open over the iterations in the persistent mode
     // set log path
     char logpath[TD_PATH_BUF_SIZE];
     sprintf(logpath, "%s/%s", TD_WORKING_DIR, SINGLE_LOG_NAME);
     TD_SN_LOG_FP = fopen(logpath, "a");
-    if (TD_SEQ_ID==1){
+    if (TD_SEQ_ID==TD_SEQ_BASE+1){
         fprintf(TD_SN_LOG_FP,"SeqID,TimeID,Initial,Origin,Mutant,Comp");
     }
 }
@@ -154,7 +371,6 @@ void log_close_check() {
     }
 }
 
-unsigned long TD_SN_LOG_CNT=0;
 void logging_check_point(const int i){
     char log_buf[100];
 
@@ -164,16 +380,16 @@ void logging_check_point(const int i){
     else{
         sprintf(log_buf, ",%d", i);
     }
-    TD_SN_LOG_CNT++;
 
     if (TD_SN_LOG_FP != NULL) {
         fprintf(TD_SN_LOG_FP, "%s", log_buf);
         fflush(TD_SN_LOG_FP);
     }else{
-        printf("%s", log_buf);
-        fflush(stdout);
+        print_check_point(i);
     }
+    TD_SN_LOG_CNT++;
 }
+{% endif %}
 
 
 /**************************************************
@@ -209,6 +425,43 @@ void load_file(const char* filename){
     TD_DATA_IDX = 0;
 }
 
+// load the input from a memory buffer (e.g., the shared memory of AFL++)
+void load_buffer(const unsigned char* buf, const unsigned int size){
+    logging("Read the buffer data\n");
+
+    // copy the data because the buffer can be extended by extend_data()
+    TD_DATA_SIZE = size;
+    TD_DATA = (char *) malloc(size > 0 ? size : 1);
+    if (size > 0) memcpy(TD_DATA, buf, size);
+    sprintf(TD_LOG_BUF, "Buffer read %u bytes\n", size);
+    logging(TD_LOG_BUF);
+
+    // initialize
+    TD_DATA_IDX = 0;
+}
+
+// load the input from a stream until EOF (e.g., stdin)
+void load_stream(FILE* fp){
+    logging("Read the stream data into buffer\n");
+    clearerr(fp);   // AFL rewinds the standard input for each input in persistent mode
+
+    unsigned int capacity = 4096;
+    TD_DATA = (char *) malloc(capacity);
+    TD_DATA_SIZE = 0;
+    size_t rdsize = 0;
+    while ((rdsize = fread(TD_DATA + TD_DATA_SIZE, 1, capacity - TD_DATA_SIZE, fp)) > 0){
+        TD_DATA_SIZE += rdsize;
+        if (TD_DATA_SIZE < capacity) continue;
+        capacity *= 2;
+        TD_DATA = (char *) realloc(TD_DATA, capacity);
+    }
+    sprintf(TD_LOG_BUF, "Stream read %u bytes\n", TD_DATA_SIZE);
+    logging(TD_LOG_BUF);
+
+    // initialize
+    TD_DATA_IDX = 0;
+}
+
 void seek_data_index(const int v){ TD_DATA_IDX = v;}
 
 void print_data(){
@@ -2,7 +2,8 @@ import os
 import sys
 import stat
 import importlib
-import glob
+import fnmatch
+import shutil
 from . import error
 
 ##################################################################
@@ -48,10 +49,7 @@ def get_all_directories(_path, _filefilter, _subName=False):
 ##################################################################
 def get_all_files(_path, _match, _subName=False, _only_files=True):
 
-    files = [f for f in glob.glob(os.path.join(_path, "**",_match), recursive=True)]
-
-    if _only_files is True:
-        files = [item for item in files if os.path.isfile(item) is True]
+    files = list(iter_files(_path, _match, _only_files))
 
     if _subName is True:
         sIdx = len(_path)
@@ -60,6 +58,33 @@ def get_all_files(_path, _match, _subName=False, _only_files=True):
     return files
 
 
+##################################################################
+# Iterating all files that match with a condition in the sub-directories (the same as glob "<_path>/**/<_match>")
+#   It reads each directory once with os.scandir, which gives the file types without calling stat for each file
+# :param _path: the root folder to search files
+# :param _match: condition for finding files (the hidden files are matched only by a pattern starting with ".")
+# :param _only_files: if it is True, the directories are not listed
+# :return: generator of the file paths
+##################################################################
+def iter_files(_path, _match, _only_files=True):
+    hidden = _match.startswith(".")
+    directories = [_path]
+    while len(directories) > 0:
+        try:
+            entries = os.scandir(directories.pop())
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                is_hidden = entry.name.startswith(".")
+                if is_hidden is True and hidden is False: continue
+                is_dir = entry.is_dir()
+                if is_dir is True and is_hidden is False: directories.append(entry.path)  # hidden ones are not searched
+                if fnmatch.fnmatch(entry.name, _match) is False: continue
+                if _only_files is True and (is_dir is True or entry.is_file() is False): continue
+                yield entry.path
+
+
 ##################################################################
 # Create directories through the path hierarchy if the directories are not exists
 # :param _path:
@@ -74,6 +99,58 @@ def prepare_directory(_path):
     return True
 
 
+##################################################################
+# Create a directory that mirrors _src_dir by linking the files
+#   - all directories are created as real directories
+#   - files are hard-linked (symbolic-linked if a hard link is not available)
+#   - _private_files and files in _private_dirs are copied, they can be modified without changing _src_dir
+#   - the directory is created in a temporary name and renamed, so the other processes do not see a half-made one
+# :param _src_dir: the source directory (pristine)
+# :param _dest_dir: the directory to be created
+# :param _private_files: list of relative paths from _src_dir to be copied
+# :param _private_dirs: list of relative paths from _src_dir whose files are copied
+# :return: the number of linked files
+##################################################################
+def make_link_farm(_src_dir, _dest_dir, _private_files=None, _private_dirs=None):
+    private_files = set([os.path.normpath(f) for f in (_private_files or [])])
+    private_dirs = [os.path.normpath(d) for d in (_private_dirs or [])]
+
+    def is_private(_rel_path):
+        if _rel_path in private_files: return True
+        for d in private_dirs:
+            if _rel_path == d or _rel_path.startswith(d + "/"): return True
+        return False
+
+    src_dir = os.path.abspath(_src_dir)
+    temp_dir = "%s.tmp%d" % (_dest_dir.rstrip("/"), os.getpid())
+    if os.path.exists(temp_dir): shutil.rmtree(temp_dir)
+
+    linked = 0
+    for root, dirs, files in os.walk(src_dir):
+        rel_root = os.path.relpath(root, src_dir)
+        os.makedirs(os.path.join(temp_dir, rel_root), exist_ok=True)
+        for name in dirs + files:
+            src = os.path.join(root, name)
+            rel_path = os.path.normpath(os.path.join(rel_root, name))
+            dest = os.path.join(temp_dir, rel_path)
+            if os.path.islink(src) is True:
+                os.symlink(os.readlink(src), dest)
+                continue
+            if os.path.isdir(src) is True: continue
+            if is_private(rel_path) is True:
+                shutil.copy2(src, dest)
+                continue
+            try:
+                os.link(src, dest)
+            except OSError:
+                os.symlink(src, dest)
+            linked += 1
+
+    prepare_directory(os.path.dirname(os.path.abspath(_dest_dir)))
+    os.rename(temp_dir, _dest_dir)
+    return linked
+
+
 ##################################################################
 # replacement of the os.path.join()
 # :param *args: list of paths, can be variable
@@ -176,45 +253,52 @@ def make_pure_relative_path(path):
 
 
 ##################################################################
-# read a file
+# read a file from the end
+#   The file is read by blocks from the end, and each line is decoded after it is complete,
+#   so a multi-byte character split over the blocks is decoded correctly.
+#   As the previous byte-wise reader, the lines are given without "\n" (an empty line first if the file ends with "\n")
+#   and the empty first line of the file is not given.
+# :param _file_name: the file to read
+# :param _max: the maximum number of lines to read (None: all the lines)
+# :param _block_size: the size of the block to read at once
+# :return: generator of the lines in the reverse order
 ##################################################################
-def readline_reverse(_file_name, _max=None):
+READ_BLOCK_SIZE = 65536
+
+def readline_reverse(_file_name, _max=None, _block_size=READ_BLOCK_SIZE):
     count = 0
 
     # Open file for reading in binary mode
     with open(_file_name, 'rb') as read_obj:
         # Move the cursor to the end of the file
-        read_obj.seek(0, os.SEEK_END)
-        # Get the current position of pointer i.e eof
-        pointer_location = read_obj.tell()
-        # Create a buffer to keep the last read line
-        buffer = bytearray()
-        # Loop till pointer reaches the top of the file
-        while pointer_location >= 0:
-            # Move the file pointer to the location pointed by pointer_location
+        pointer_location = read_obj.seek(0, os.SEEK_END)
+        # the parts of the last line of the remaining part of the file (from the end, in the reverse order)
+        #   they are joined only when the line is completed (a long line is not copied for each block)
+        remain = []
+        while pointer_location > 0:
+            # read the previous block
+            size = min(_block_size, pointer_location)
+            pointer_location -= size
             read_obj.seek(pointer_location)
-            # Shift pointer location by -1
-            pointer_location = pointer_location -1
-            # read that byte / character
-            new_byte = read_obj.read(1)
-            # If the read byte is new line character then it means one line is read
-            if new_byte == b'\n':
-                # Fetch the line from buffer and yield it
-                yield buffer.decode(errors='backslashreplace')[::-1]
+            block = read_obj.read(size)
+            if b'\n' not in block:
+                remain.append(block)
+                continue
+            lines = block.split(b'\n')
+            lines[-1] += b''.join(reversed(remain))
+
+            # the first line can continue to the previous block
+            remain = [lines[0]]
+            for line in reversed(lines[1:]):
+                yield line.decode(errors='backslashreplace')
                 if _max is not None:
                     count += 1
-                    if count >= _max: break
-                # Reinitialize the byte array to save next line
-                buffer = bytearray()
-            else:
-                # If last read character is not eol then add it in buffer
-                buffer.extend(new_byte)
-        # As file is read completely, if there is still data in buffer, then its the first line.
-        if len(buffer) > 0:
-            # Yield the first line too
-            yield buffer.decode()[::-1]
-            if _max is not None:
-                count += 1
+                    if count >= _max: return True
+
+        # As file is read completely, if there is still data, then its the first line.
+        remain = b''.join(reversed(remain))
+        if len(remain) > 0:
+            yield remain.decode(errors='backslashreplace')
     return True
 
 
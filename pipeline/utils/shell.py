@@ -1,6 +1,7 @@
 import os
 import sys
 import re
+import shlex
 import subprocess
 import psutil, signal
 import time
@@ -94,6 +95,88 @@ def execute_with_timeout(_cmd, _timeout, _working_dir=None, _env=None):
     return retcode
 
 
+def execute_together(_cmds, _timeout, _working_dir=None, _envs=None):
+    '''
+    execute the given commands at the same time and stop all of them when one of them is finished
+    (e.g., multiple fuzzer instances that work for the same target)
+    :param _cmds: list of commands (each command is executed without a shell)
+    :param _timeout: the commands are killed after the timeout (seconds)
+    :param _working_dir: working directory
+    :param _envs: list of additional environment variables for each command
+    :return: return code of the command that is finished first (-9 if the timeout expired)
+    '''
+    processes = []
+    retcode = None
+    try:
+        for idx, cmd in enumerate(_cmds):
+            env_local = load_user_environment(_envs[idx] if _envs is not None else None)
+            processes.append(subprocess.Popen(shlex.split(cmd), cwd=_working_dir, env=env_local))
+
+        deadline = time.time() + _timeout
+        while retcode is None:
+            for process in processes:
+                if process.poll() is None: continue
+                retcode = process.returncode
+                break
+            if retcode is not None: break
+            if time.time() > deadline:
+                retcode = -9  # return code for timeout (killed by force)
+                print('Timeout for %d commands (%ds) expired, we force to kill the processes ...' % (len(_cmds), _timeout), file=sys.stderr)
+                break
+            time.sleep(1)
+
+    except KeyboardInterrupt:
+        print("killing child process...")
+        for process in processes:
+            if process.poll() is None: process.kill()
+        error.error_exit("User canceled the execution")
+
+    finally:
+        # terminate the others gracefully (AFL stores its stats when it receives SIGTERM)
+        for process in processes:
+            if process.poll() is None: process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=60)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+    return retcode
+
+
+def execute_to_file(_cmd, _log_file, _working_dir=None, _env=None):
+    '''
+    execute the given command and stream its output (stdout and stderr) into the _log_file
+    :param _cmd: command that you want to execute in a shell
+    :param _log_file: file path that the execution output will be written
+    :param _working_dir: working directory
+    :param _env: additional environment variables
+    :return: return code of the command
+    '''
+    env_local = load_user_environment(_env)
+    with open(_log_file, "wb") as log:
+        log.write(("CMD: %s\n" % _cmd).encode())
+        log.flush()
+        process = subprocess.Popen(_cmd, shell=True, cwd=_working_dir, env=env_local,
+                                   stdout=log, stderr=subprocess.STDOUT)
+        retcode = process.wait()
+    return retcode
+
+
+def execute_for_output(_cmd, _working_dir=None, _env=None):
+    '''
+    execute the given command and return its standard output as bytes (stderr is discarded)
+    :param _cmd: command that you want to execute in a shell
+    :param _working_dir: working directory
+    :param _env: additional environment variables
+    :return: a tuple of the return code and the output (bytes)
+    '''
+    env_local = load_user_environment(_env)
+    process = subprocess.run(_cmd, shell=True, cwd=_working_dir, env=env_local,
+                             stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    return process.returncode, process.stdout
+
+
 def execute_and_check(_cmd, _check_type, _check_output, _working_dir=None, _env=None, _verbose=False, _line_no=None):
     if _check_type not in [ 'retcode',  'file', 'lines', 'text', 'startswith']:
         error.error_exit("You provided a wrong _check_type: %s" % _check_type)
@@ -144,6 +227,24 @@ def kill_child_processes(sig=signal.SIGTERM):
     return True
 
 
+##################################################################
+# Find the CPU cores bound to the running processes with the given name
+#   (e.g., afl-fuzz instances bound by -b, they are skipped as AFL++ does when it binds a core)
+# :param _process_name: name of the processes (e.g., "afl-fuzz")
+# :return: set of the CPU cores, each of them is the only core allowed for a process
+##################################################################
+def get_bound_cpus(_process_name):
+    cpus = set()
+    for proc in psutil.process_iter(["name"]):
+        if proc.info["name"] != _process_name: continue
+        try:
+            affinity = proc.cpu_affinity()
+        except (psutil.Error, AttributeError):
+            continue
+        if len(affinity) == 1: cpus.add(affinity[0])
+    return cpus
+
+
 def load_user_environment(_env):
     env_local = os.environ.copy()
 
@@ -3,55 +3,134 @@ import tarfile
 import re
 import time
 import shutil
+import fcntl
+import json
 from . import file, shell, error
 
 mem_tarfiles = {}
+TAR_INDEX_EXT = ".idx"
+TAR_INDEX_VERSION = 1
+
+
+##################################################################
+# Sidecar index of a tar file (<tar_file>.idx)
+#   - maps each member name to (offset of data, size, mode, mtime, type) so that
+#     the member lookup is a dict lookup and a file can be extracted by seeking to its offset
+#   - the index is invalidated by the size and the modification time of the tar file
+#   - compressed tar files are also indexed, but their members are extracted by tarfile
+##################################################################
+def load_tar_index(_tar_file):
+    '''
+    load the index of the _tar_file (build and store the index if it does not exist or is outdated)
+    :param _tar_file: path of the tar file
+    :return: a dict {"seekable": bool, "members": {name: [offset, size, mode, mtime, type]}, "basenames": {basename: [name, ...]}}
+    '''
+    stat = os.stat(_tar_file)
+    if _tar_file in mem_tarfiles:
+        index = mem_tarfiles[_tar_file]
+        if index["size"] == stat.st_size and index["mtime"] == stat.st_mtime_ns:
+            return index
+
+    index = None
+    index_file = _tar_file + TAR_INDEX_EXT
+    if os.path.exists(index_file) is True:
+        try:
+            with open(index_file, "r") as f:
+                index = json.load(f)
+            if index.get("version") != TAR_INDEX_VERSION or index["size"] != stat.st_size or index["mtime"] != stat.st_mtime_ns:
+                index = None
+        except (ValueError, KeyError, OSError):
+            index = None
+
+    if index is None:
+        index = build_tar_index(_tar_file)
+        store_tar_index(index, index_file)
+
+    # make the lookup table for basenames (the order of the members is kept)
+    basenames = {}
+    for name in index["members"]:
+        basenames.setdefault(os.path.basename(name), []).append(name)
+    index["basenames"] = basenames
+
+    mem_tarfiles[_tar_file] = index
+    return index
+
+
+def release_tar_index(_tar_file):
+    '''
+    remove the index of the _tar_file from the memory (the sidecar index file is kept)
+    The readers of the fuzzing results release the index when they are closed,
+      so the memory does not grow with the number of the tar files read in a process (e.g., RunCollector)
+    '''
+    mem_tarfiles.pop(_tar_file, None)
+    return True
+
+
+def build_tar_index(_tar_file):
+    stat = os.stat(_tar_file)
+    index = {"version": TAR_INDEX_VERSION, "size": stat.st_size, "mtime": stat.st_mtime_ns, "seekable": True, "members": {}}
+    try:
+        tar = tarfile.open(_tar_file, "r:")   # uncompressed tar file only
+    except tarfile.ReadError:
+        tar = tarfile.open(_tar_file)
+        index["seekable"] = False
+
+    with tar:
+        for member in tar:
+            index["members"][member.name] = [member.offset_data, member.size, member.mode, member.mtime,
+                                             member.type.decode() if isinstance(member.type, bytes) else member.type]
+    return index
+
+
+def store_tar_index(_index, _index_file):
+    '''
+    store the index next to the tar file (the index is used only in memory if the directory is not writable)
+    '''
+    temp_file = "%s.tmp%d" % (_index_file, os.getpid())
+    try:
+        with open(temp_file, "w") as f:
+            json.dump(_index, f)
+        os.replace(temp_file, _index_file)
+    except OSError:
+        if os.path.exists(temp_file): os.remove(temp_file)
+        return False
+    return True
 
 
 def exists_in_tar(_filename, _tarfile):
-    # load all files in tar file
-    if _tarfile not in mem_tarfiles:
-        tar = tarfile.open(_tarfile)
-        mem_tarfiles[_tarfile] = tar.getnames()
+    index = load_tar_index(_tarfile)
 
     # check the file exists in the tar file
     filepath = file.makepath('./', _filename)
-    if filepath not in mem_tarfiles[_tarfile]:
+    if filepath not in index["members"]:
         return False
     return True
 
 
 def find_fullpath_in_tar(_filename, _tarfile):
-    # load all files in tar file
-    if _tarfile not in mem_tarfiles:
-        tar = tarfile.open(_tarfile)
-        mem_tarfiles[_tarfile] = tar.getnames()
+    index = load_tar_index(_tarfile)
 
-    # check the file exists in the tar file
-    # target = _filename.copy()
+    # find the first file that has the same basename
     target = os.path.basename(_filename)
-    for filepath in mem_tarfiles[_tarfile]:
-        if os.path.basename(filepath) != target: continue
-        return filepath
-    return None
+    names = index["basenames"].get(target)
+    if names is None: return None
+    return names[0]
 
 
 def get_all_files_in_tar(_tar_file, _match="*", _only_basename=False):
     # get all file names in the tar file
-    tar = tarfile.open(_tar_file)
-    all_files = tar.getmembers()
+    index = load_tar_index(_tar_file)
     if _match is None: _match = "*"
 
     # change the match to regex
-    _match = _match.replace(".", "\.")
+    _match = _match.replace(".", "\\.")
     _match = _match.replace("*", ".*")
 
     # filter of the file
     ptn = re.compile(_match)
     target_files = []
-    for afile in all_files:
-        if afile.type == tarfile.DIRTYPE: continue
-        filepath = afile.name
+    for filepath, info in index["members"].items():
+        if info[4] == tarfile.DIRTYPE.decode(): continue
         fname = os.path.basename(filepath)
         if ptn.match(fname) is None: continue
         if _only_basename is False:
@@ -62,6 +141,12 @@ def get_all_files_in_tar(_tar_file, _match="*", _only_basename=False):
 
 
 def extract_file_from_tar(_filename, _tar_file, _output):
+    # extract the member directly using the offset in the index
+    index = load_tar_index(_tar_file)
+    info = index["members"].get(_filename)
+    if index["seekable"] is True and info is not None and info[4] in [tarfile.REGTYPE.decode(), tarfile.AREGTYPE.decode()]:
+        return extract_member_by_offset(_filename, info, _tar_file, _output)
+
     ret = True
     TRY_MAX = 3
     try_cnt = 0
@@ -87,6 +172,77 @@ def extract_file_from_tar(_filename, _tar_file, _output):
     return ret
 
 
+def extract_member_by_offset(_filename, _info, _tar_file, _output):
+    offset, size, mode, mtime, _ = _info
+    output_file = os.path.join(_output, _filename)
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    try:
+        with open(_tar_file, "rb") as fr, open(output_file, "wb") as fw:
+            if copy_range(fr, fw, offset, size) != size: return False
+        os.chmod(output_file, mode)
+        os.utime(output_file, (mtime, mtime))
+    except OSError as e:
+        print(e)
+        return False
+    return True
+
+
+def copy_range(_src, _dest, _offset, _size):
+    '''
+    copy _size bytes from the _offset of the _src file into the _dest file
+    the data is copied in the kernel (os.sendfile) without reading it into the memory if it is possible
+    :return: the number of the copied bytes
+    '''
+    copied = 0
+    try:
+        while copied < _size:
+            sent = os.sendfile(_dest.fileno(), _src.fileno(), _offset + copied, _size - copied)
+            if sent == 0: break
+            copied += sent
+    except (AttributeError, OSError):
+        # sendfile is not supported for the files (the rest is copied by blocks)
+        _src.seek(_offset + copied)
+        while copied < _size:
+            block = _src.read(min(1048576, _size - copied))
+            if len(block) == 0: break
+            _dest.write(block)
+            copied += len(block)
+    return copied
+
+
+def find_member_in_tar(_filename, _tar_file):
+    '''
+    :return: the member name of the _filename in the tar file (the name with or without "./"), None if it does not exist
+    '''
+    index = load_tar_index(_tar_file)
+    name = os.path.normpath(_filename)
+    for candidate in [_filename, "./" + name, name]:
+        if candidate in index["members"]: return candidate
+    return None
+
+
+def read_file_from_tar(_filename, _tar_file):
+    '''
+    read a member of the tar file without extracting it (the data is read at its offset in the index)
+    :return: content of the member (bytes), None if the member is not a regular file in the tar file
+    '''
+    index = load_tar_index(_tar_file)
+    info = index["members"].get(_filename)
+    if info is None or info[4] not in [tarfile.REGTYPE.decode(), tarfile.AREGTYPE.decode()]: return None
+
+    if index["seekable"] is False:
+        with tarfile.open(_tar_file) as tar:
+            return tar.extractfile(_filename).read()
+
+    offset, size = info[0], info[1]
+    fd = os.open(_tar_file, os.O_RDONLY)
+    try:
+        data = os.pread(fd, size, offset)
+    finally:
+        os.close(fd)
+    return data if len(data) == size else None
+
+
 def uncompress_tar_in_dir(_src_file, _dest_dir, _overwrite=False):
     '''
     :param _src_file: tar file to extract
@@ -113,6 +269,38 @@ def uncompress_tar_in_dir(_src_file, _dest_dir, _overwrite=False):
     return True
 
 
+def uncompress_tar_shared(_src_file, _base_dir):
+    '''
+    extract the _src_file once into a directory under the _base_dir, which is shared by all the processes.
+    The directory name depends on the name, size and modification time of the _src_file,
+      so an updated tar file will be extracted into a new directory.
+    The processes that call this function at the same time wait for the first one to finish the extraction.
+    :param _src_file: tar file to extract
+    :param _base_dir: the directory that the shared directory will be created
+    :return: the path of the extracted directory, None when the _src_file does not exist
+    '''
+    if os.path.exists(_src_file) is False:
+        return None
+
+    stat = os.stat(_src_file)
+    name = os.path.splitext(os.path.basename(_src_file))[0]
+    shared_dir = file.makepath(_base_dir, "%s-%d-%d" % (name, stat.st_size, stat.st_mtime_ns))
+    if os.path.exists(shared_dir) is True:
+        return shared_dir
+
+    file.prepare_directory(_base_dir)
+    with open(shared_dir + ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            if os.path.exists(shared_dir) is False:
+                temp_dir = "%s.tmp%d" % (shared_dir, os.getpid())
+                uncompress_tar_in_dir(_src_file, temp_dir, _overwrite=True)
+                os.rename(temp_dir, shared_dir)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+    return shared_dir
+
+
 def compress_directory(_src_dir, _dest_dir=None, _remove=False):
     '''
     :param _src_dir: target directory to be compressed (as tar)
@@ -10,20 +10,38 @@ if platform.python_version().startswith("3.") is False:
 
 import re
 import math
-from pipeline.FunctionExtractor import FunctionExtractor
+import time
+import fcntl
+import itertools
+import concurrent.futures
 from pipeline.TemplateGenerator import TemplateGenerator
 from pipeline.InputGenerator import InputGenerator
+try:
+    # libclang is not necessary for the phases that load the prototype artifacts (e.g., gen)
+    from pipeline.FunctionExtractor import FunctionExtractor
+except ImportError:
+    FunctionExtractor = None
 from pipeline.PathHelper import PathHelper
 from pipeline.fuzzer import AFLOutput
+from pipeline.fuzzer import InputStore
+from pipeline.PrototypeArtifact import PrototypeArtifact
 from pipeline import utils
 from pipeline import compile
 from pipeline import Config
+from pipeline import Mutant
+from pipeline.JobJournal import JobJournal
+from pipeline.BudgetLedger import BudgetLedger
+from pipeline.BatchReplay import BatchReplay
 
 
 class Runner(object):
     path:PathHelper = None
     config:Config = None
     AFLpp:bool = False
+    granted_time:int = None    # fuzzing time granted by the campaign budget
+    SCHEMATA_ID_ENV = "MOTIF_MUTANT_ID"    # environment variable that selects a mutant in the schemata build
+    SUT_ARCHIVE_NAME = "libsut.a"   # static archive of the SUT objects for compiling the test cases (removed after compiling)
+    GEN_CHUNKS_PER_WORKER = 4   # chunks of inputs for each worker to overlap the test case generation with the executions
 
     #######################################################
     # initialization all the member variables
@@ -42,16 +60,29 @@ class Runner(object):
 
         self.AFLpp = self.check_AFL_plusplus()
 
-        # proceed each phase
+        # proceed each phase (the result is recorded in the job journal when it is executed by run_list.py)
+        start_time = time.time()
+        status = JobJournal.FAILED
+        try:
+            if self.execute_phases() is True:
+                status = JobJournal.SUCCESS
+        finally:
+            if config.JOB_ID is not None:
+                extra = {"granted": self.granted_time} if self.granted_time is not None else None
+                JobJournal(config.JOB_MANIFEST, config.JOB_JOURNAL).record(config.JOB_ID, status, time.time() - start_time, extra)
+        pass
+
+    def execute_phases(self):
+        ret = True
         if config.PHASE in ["all", "preprocess"]:
-            self.preprocess()
+            ret = self.preprocess() is not False and ret
         if config.PHASE in ["all", "build"]:
-            self.build()
+            ret = self.build() is not False and ret
         if config.PHASE in ["all", "fuzzing"]:
-            self.fuzzing()
+            ret = self.fuzzing() is not False and ret
         if config.PHASE in ["all", "gen"]:
-            self.generate()
-        pass
+            ret = self.generate() is not False and ret
+        return ret
 
     def does_execute_this_step(self, _step):
         '''
@@ -80,7 +111,10 @@ class Runner(object):
 
         # step 1
         if self.does_execute_this_step(_step=1):
-            ret = self.generate_driver_for_function()
+            if config.BATCH_MUTANTS is not None:
+                ret = self.generate_drivers_for_batch(config.BATCH_MUTANTS)
+            else:
+                ret = self.generate_driver_for_function()
             if ret is False:
                 print("Failed to generate test driver for functions")
                 return False
@@ -106,6 +140,13 @@ class Runner(object):
         # clone repository (Can be changed to the temporary folder)
         config.REPO_PATH = self.prepare_repository()
 
+        # mutant schemata: build once for all the mutants of the function
+        if config.SCHEMATA_BUILD is True:
+            self.build_schemata()
+            print("Finished building executable SUT and input files (schemata)")
+            print("Please fun fuzzer!!", flush=True)
+            return True
+
         # step 1
         if self.does_execute_this_step(_step=1):
             self.extract_mutated_function()
@@ -141,6 +182,8 @@ class Runner(object):
         execute AFL fuzzing
         :return:
         '''
+        self.select_schemata_mutant()
+
         # determine output and working dir
         fuzzing_output = path.get_fuzzing_output_path()
         temp_output = path.get_HPC_temporary_path(fuzzing_output)  # if executed in HPC, output_dir is changed
@@ -158,9 +201,25 @@ class Runner(object):
         if os.path.exists(test_driver_file) is False:
             utils.error_exit("Cannot find the object file. Please do `build` phase first")
 
+        # get the fuzzing time from the campaign budget
+        ledger = None
+        if config.USE_BUDGET is True and config.JOB_ID is not None:
+            ledger = BudgetLedger(config.JOB_BUDGET)
+            if ledger.exists() is False:
+                utils.error_exit("Cannot find the budget ledger: %s" % config.JOB_BUDGET)
+            n_cores = self.get_num_fuzzer_instances()
+            self.granted_time = ledger.acquire(config.JOB_ID, config.FUZZING_TIMEOUT * n_cores, config.FUZZING_BUDGET_MAX_FACTOR)
+            print("Granted fuzzing time by the campaign budget: %d core-seconds (default: %d)" % (self.granted_time, config.FUZZING_TIMEOUT * n_cores))
+            config.FUZZING_TIMEOUT = max(self.granted_time // n_cores, 1)
+
         # execute fuzzer
-        if self.execute_fuzzer(func_input_dir, temp_output, test_driver_file) is False:
-            utils.error_exit("Failed to execute fuzzer: %s" % test_driver_file)
+        fuzzing_start = time.time()
+        try:
+            if self.execute_fuzzer(func_input_dir, temp_output, test_driver_file) is False:
+                utils.error_exit("Failed to execute fuzzer: %s" % test_driver_file)
+        finally:
+            if ledger is not None:
+                ledger.release(config.JOB_ID, (time.time() - fuzzing_start) * self.get_num_fuzzer_instances())
 
         # make stats of the fuzzer results
         KILLED = 0
@@ -174,6 +233,7 @@ class Runner(object):
         # compress the execution result
         if config.UNCOMPRESS_RESULT is False:
             print("Compressing the execution results ...")
+            AFLOutput(temp_output, _isAFLpp=self.AFLpp).remove_execution_columns()
             utils.compress_directory(temp_output, os.path.dirname(fuzzing_output), _remove=True)
 
         if KILLED > 0:
@@ -193,6 +253,7 @@ class Runner(object):
         '''
         # clone repository
         config.REPO_PATH = self.prepare_repository()
+        self.select_schemata_mutant()
 
         # determine output and working dir for 'run' phase
         fuzzing_output = path.get_fuzzing_output_path()
@@ -241,9 +302,7 @@ class Runner(object):
             result_generated = True
 
         # create TemplateGenerator
-        include_txt = compile.get_gcc_params_include(config.INCLUDES, config.REPO_PATH)
-        compilation_cflags = config.SUT_COMPILE_FLAGS+" " + include_txt
-        generator = TemplateGenerator(source_file, config, compilation_cflags)
+        generator = self.make_template_generator(source_file)
 
         # generate test cases
         testcase_dir = utils.makepath(testcase_output, "testcases")
@@ -284,6 +343,23 @@ class Runner(object):
         print("Finished test case generation phase")
         pass
 
+    def make_template_generator(self, _source_file):
+        '''
+        create a TemplateGenerator for the mutated function
+        The generator uses the prototype artifact stored in the preprocess phase if it is valid,
+          otherwise, it analyzes the source file (libclang is required)
+        '''
+        artifact_file = path.get_prototype_artifact_path()
+        generator = TemplateGenerator(_source_file, config, _parse=False)
+        if generator.load_artifact(config.MUTANT.func, artifact_file) is True:
+            print("Loaded the prototype artifact: %s" % artifact_file)
+            return generator
+
+        print("Not found a valid prototype artifact, analyzing the source file: %s" % _source_file)
+        include_txt = compile.get_gcc_params_include(config.INCLUDES, config.REPO_PATH)
+        compilation_cflags = config.SUT_COMPILE_FLAGS+" " + include_txt
+        return TemplateGenerator(_source_file, config, compilation_cflags)
+
     def uncompress_result(self, fuzzing_output, temp_output):
         if config.UNCOMPRESS_RESULT is False:
             result_file = fuzzing_output + ".tar"
@@ -301,37 +377,98 @@ class Runner(object):
 
         print("Preparing code repository...")
         if os.path.exists(temp_repo_dir) is False:
-            print("\tUncompressing to %s" % temp_repo_dir, flush=True)
-            # copy the repository
-            utils.uncompress_tar_in_dir(config.REPO_FILE, temp_repo_dir)
+            if self.is_available_link_farm() is True:
+                # extract the pristine repository once per node and link its files
+                pristine_dir = utils.uncompress_tar_shared(config.REPO_FILE, utils.makepath(config.HPC_WORK_PATH, "pristine"))
+                print("\tLinking %s to %s" % (pristine_dir, temp_repo_dir), flush=True)
+                utils.make_link_farm(pristine_dir, temp_repo_dir,
+                                     _private_files=[config.MUTANT.src_path],
+                                     _private_dirs=[config.COMPILE_OUTPUT])
+            else:
+                print("\tUncompressing to %s" % temp_repo_dir, flush=True)
+                # copy the repository
+                utils.uncompress_tar_in_dir(config.REPO_FILE, temp_repo_dir)
         else:
             print("\tRepository exists: %s" % temp_repo_dir)
         print("Done", flush=True)
         return temp_repo_dir
 
+    def is_available_link_farm(self):
+        '''
+        The linked repository only works when the SUT files are compiled by this pipeline,
+          since the files are shared with the pristine repository except for the mutated source file and COMPILE_OUTPUT.
+        Build tools (COMPILE_SUT_CMDS) can write any file in the repository, so the repository is fully extracted for them.
+        '''
+        if config.REPO_LINK_FARM is False: return False
+        if config.HPC_PARALLEL is False: return False       # the repository is not cloned for each mutant
+        if config.COMPILE_SUT_CMDS is not None and len(config.COMPILE_SUT_CMDS) > 0: return False
+        if config.COMPILE_OUTPUT is None or os.path.normpath(config.COMPILE_OUTPUT) == ".": return False
+        return True
+
     ################################################
     # Step 1 (preprocess): generate template
     ################################################
-    def generate_driver_for_function(self):
+    def generate_drivers_for_batch(self, _batch_file):
+        '''
+        generate test drivers for all the mutated functions listed in the _batch_file
+        The functions are grouped by their source file, and each source file is parsed only once
+        :param _batch_file: file that describes <mutant-filename>;[input-filters] in each line (same as the mutant list)
+        :return: False if it fails to generate a driver for any function
+        '''
+        with open(_batch_file, "r") as f:
+            lines = [line.strip() for line in f.readlines() if line.strip() != ""]
+
+        # group the mutants by the source file (keeping the order of the list and the parsed mutants)
+        groups = {}
+        for line in lines:
+            items = line.split(";")
+            input_filter = ";".join(items[1:]) if len(items) > 1 else "A"
+            config.configure_mutant_information(items[0], input_filter)
+            groups.setdefault(config.MUTANT.src_path, []).append((config.MUTANT, input_filter))
+
+        failed = []
+        for src_path, mutants in groups.items():
+            print("Generating test drivers for %d functions in %s ..." % (len(mutants), src_path), flush=True)
+            generator = None    # the AST of the previous source file is released
+            for mutant, input_filter in mutants:
+                config.configure_mutant_information(mutant.fullpath, input_filter, _mutant=mutant)
+                if generator is None:
+                    generator = self.make_function_generator()
+                if self.generate_driver_for_function(_generator=generator) is False:
+                    failed.append(config.MUTANT.func)
+
+        if len(failed) > 0:
+            print("Failed to generate test drivers for %d functions: %s" % (len(failed), failed))
+            return False
+        return True
+
+    def make_function_generator(self):
+        # prepare parameters for the TemplateGenerator
+        src_file = path.get_source_file_path()
+        include_txt = compile.get_gcc_params_include(config.INCLUDES, config.REPO_PATH)
+        compilation_cflags = config.SUT_COMPILE_FLAGS+" " + include_txt
+        # print(compilation_cflags)
+        return TemplateGenerator(src_file, config, compilation_cflags)
+
+    def generate_driver_for_function(self, _generator=None):
+        '''
+        generate test drivers and input files for the mutated function
+        :param _generator: TemplateGenerator of the source file (it is shared by the functions in the same source file)
+        '''
         func_driver_dir = path.get_func_driver_path()
         print("[Step 1] Generating test driver for the mutated function into %s ..."% func_driver_dir)
 
         # Path setting
-        src_file        = path.get_source_file_path()
         driver_src_file = path.get_driver_src_path()
         func_input_dir = path.get_func_input_path()
 
         # check if the driver source file already exists
         if (os.path.exists(driver_src_file) is True and config.OVERWRITE is False): return True
 
-        # prepare parameters for the TemplateGenerator
-        include_txt = compile.get_gcc_params_include(config.INCLUDES, config.REPO_PATH)
-        compilation_cflags = config.SUT_COMPILE_FLAGS+" " + include_txt
-        # print(compilation_cflags)
-
-        # generate fuzzing driver
-        generator = TemplateGenerator(src_file, config, compilation_cflags)
-        if generator.generate(config.MUTANT.func, driver_src_file, config.TEMPLATE_FUZZING_DRIVER) is False:
+        # generate fuzzing driver (the persistent-mode driver tests multiple inputs in a process)
+        generator = self.make_function_generator() if _generator is None else _generator
+        fuzzing_template = config.TEMPLATE_PERSISTENT_DRIVER if config.FUZZING_PERSISTENT_MODE is True else config.TEMPLATE_FUZZING_DRIVER
+        if generator.generate(config.MUTANT.func, driver_src_file, fuzzing_template) is False:
             return False
 
         # generate input files
@@ -354,6 +491,8 @@ class Runner(object):
             if generator.generate(config.MUTANT.func, driver_src_file, config.TEMPLATE_FALSE_POSITIVE_DRIVER) is False:
                 return False
 
+        # store the analysis result for the later phases
+        generator.store_artifact(config.MUTANT.func, path.get_prototype_artifact_path())
         return True
 
     ################################################
@@ -388,8 +527,11 @@ class Runner(object):
         include_txt = compile.get_gcc_params_include(config.INCLUDES, config.REPO_PATH)
         compilation_cflags = config.SUT_COMPILE_FLAGS+" " + include_txt
 
-        extractor = FunctionExtractor(compilation_cflags, _prefix=config.MUTANT_FUNC_PREFIX)
-        ret = extractor.extract(function_output_file, config.MUTANT.func, function_output_file)
+        #   (the cache is used only for the original source file, the mutant is parsed without the cache)
+        extractor = FunctionExtractor(compilation_cflags, _prefix=config.MUTANT_FUNC_PREFIX,
+                                      _cache_dir=config.AST_CACHE,
+                                      _repo_path=config.REPO_PATH)
+        ret = self.extract_function_code(extractor, function_output_file)
         if ret is False:
             print("failed to parse function under test: '%s' in '%s'" % (config.MUTANT.func, config.MUTANT.src_path))
             exit(1)
@@ -399,10 +541,26 @@ class Runner(object):
         print("\tPlease check the mutated function from: %s" % function_output_file)
         return extractor.get_mutated_func_name(config.MUTANT.func)
 
+    def extract_function_code(self, _extractor:FunctionExtractor, _mutant_file, _backup_suffix=".origin"):
+        '''
+        extract the mutated function from the mutant file (the file is overwritten by the function code)
+        If MUTANT_DIFF_EXTRACTION is True, the function extent in the original source file is mapped onto the mutant,
+          and the mutant is parsed only when the mutation may change the boundaries of the function
+        '''
+        if config.MUTANT_DIFF_EXTRACTION is True:
+            origin_file = path.get_source_file_path()
+            if os.path.exists(origin_file + _backup_suffix) is True:
+                origin_file = origin_file + _backup_suffix  # the mutant is injected into the source file
+            if _extractor.extract_by_diff(origin_file, _mutant_file, config.MUTANT.func, _mutant_file,
+                                          _src_path=config.MUTANT.src_path) is True:
+                return True
+            print("\tCannot map the function extent onto the mutant, parsing the mutant ...")
+        return _extractor.extract(_mutant_file, config.MUTANT.func, _mutant_file)
+
     ################################################
     # Step 2 (build): generate binary file of SUT with a mutated function
     ################################################
-    def generate_binary_SUT(self, _inject_mutant=False, _backup_suffix=".origin"):
+    def generate_binary_SUT(self, _inject_mutant=False, _backup_suffix=".origin", _mutated_func_file=None):
         compile.initialize_SUT(config.REPO_PATH, "*.c" + _backup_suffix)  # process for previous error results
 
         code_origin = path.get_source_file_path()
@@ -413,7 +571,7 @@ class Runner(object):
             shutil.copyfile(code_origin, code_backup)
 
             # set mutant_function file path (extracted function)
-            mutated_func_file = path.get_mutant_func_file()
+            mutated_func_file = path.get_mutant_func_file() if _mutated_func_file is None else _mutated_func_file
 
             # injecting mutated function
             compile.inject_mutated_function(code_origin, mutated_func_file,
@@ -441,7 +599,8 @@ class Runner(object):
                 "AS": os.path.abspath(config.COMPILER_FILEPATH),
                 "CXX": os.path.abspath(config.CPP_COMPILER_FILEPATH),
             }
-            compile.compile_SUT(config.REPO_PATH, config.COMPILE_SUT_CMDS, compile_envs)
+            make_jobs = compile.get_num_jobs(config.COMPILE_JOBS, config.CONCURRENT_JOBS) if config.COMPILE_MAKE_JOBS is True else 1
+            compile.compile_SUT(config.REPO_PATH, config.COMPILE_SUT_CMDS, compile_envs, _jobs=make_jobs)
             print("\tCompleted to compile the SUT (software under test) with the mutated function.")
             print("\tPlease find the result files in: %s" % config.REPO_PATH)
 
@@ -452,7 +611,8 @@ class Runner(object):
             SUT_files += [_code_origin]
 
             compile.compile_SUT_files(config.COMPILER_FILEPATH, SUT_files, config.COMPILE_OUTPUT,
-                                      config.INCLUDES, config.SUT_COMPILE_FLAGS, config.REPO_PATH)
+                                      config.INCLUDES, config.SUT_COMPILE_FLAGS, config.REPO_PATH,
+                                      _cache_dir=config.SUT_OBJECT_CACHE, _jobs=compile.get_num_jobs(config.COMPILE_JOBS, config.CONCURRENT_JOBS))
 
             compile_output =  config.COMPILE_OUTPUT if  config.COMPILE_OUTPUT is not None else "./"
             print("\tCompleted to compile the SUT (software under test) with the mutated function.")
@@ -462,12 +622,12 @@ class Runner(object):
     ################################################
     # Step 3 (build): generate binary for test entry
     ################################################
-    def compile_test_entry(self, _appendix=""):
+    def compile_test_entry(self, _appendix="", _executable_file=None):
         print("[Step 3] Compiling mutation testing entrypoint (%s) ..." % (_appendix if _appendix != "" else "fuzzing driver"), flush=True)
 
         # set path
         entry_code_file = path.get_driver_src_path(_appendix=_appendix)
-        executable_file = path.get_executable_driver_path(_appendix=_appendix)
+        executable_file = path.get_executable_driver_path(_appendix=_appendix) if _executable_file is None else _executable_file
 
         # preparing path
         utils.prepare_directory(os.path.dirname(executable_file))
@@ -489,6 +649,129 @@ class Runner(object):
         print("\tThe object file of test driver is located in %s" % executable_file)
         return True
 
+    ################################################
+    # [Build] mutant schemata
+    ################################################
+    def get_driver_appendixes(self):
+        appendixes = ["", path.PRESENTER_PREFIX, path.EXPECTED_PREFIX]
+        if 'TEMPLATE_FALSE_POSITIVE_DRIVER' in config:
+            appendixes.append(path.FALSE_POSITIVE_PREFIX)
+        return appendixes
+
+    def get_function_mutants(self):
+        '''
+        :return: sorted list of mutants in the MUTANTS_FILE that mutate the same function of the same source file
+        '''
+        match = "*.%s.*.%s%s" % (config.MUTANT_FUNC_PREFIX, config.MUTANT.func, config.MUTANT.ext)
+        mutants = []
+        for mutant_path in utils.get_all_files_in_tar(config.MUTANTS_FILE, _match=match):
+            if os.path.dirname(mutant_path) != config.MUTANT.dir_path: continue
+            if Mutant.parse(mutant_path).func != config.MUTANT.func: continue
+            mutants.append(mutant_path)
+        return sorted(mutants)
+
+    def build_schemata(self):
+        '''
+        build the SUT and the test drivers once for all the mutants of the function (mutant schemata),
+        the first execution builds them and the others wait for it, then link the drivers for this mutant
+        '''
+        schemata_dir = path.get_schemata_path()
+        map_file = path.get_schemata_map_file()
+        utils.prepare_directory(schemata_dir)
+        with open(map_file + ".lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                if os.path.exists(map_file) is False or config.OVERWRITE is True:
+                    self.generate_schemata_drivers(map_file)
+                else:
+                    print("[Schemata] Using the drivers in %s" % schemata_dir)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+        # link the drivers of the function to the executable paths of this mutant
+        for appendix in self.get_driver_appendixes():
+            schemata_driver = path.get_schemata_driver_path(appendix)
+            if os.path.exists(schemata_driver) is False: continue
+            executable_file = path.get_executable_driver_path(_appendix=appendix)
+            utils.prepare_directory(os.path.dirname(executable_file))
+            if os.path.exists(executable_file) is True: os.remove(executable_file)
+            try:
+                os.link(schemata_driver, executable_file)
+            except OSError:
+                shutil.copy2(schemata_driver, executable_file)
+        return True
+
+    def generate_schemata_drivers(self, _map_file):
+        mutants = self.get_function_mutants()
+        if config.MUTANT.fullpath not in mutants:
+            utils.error_exit("Cannot find the mutant in the schemata of the function: %s" % config.MUTANT.fullpath)
+        print("[Schemata] Building drivers for %d mutants of the function %s ..." % (len(mutants), config.MUTANT.func), flush=True)
+
+        # step 1: extract mutated functions with a unique name for each mutant (e.g., mut1_func, mut2_func, ...)
+        func_dir = path.get_schemata_func_path()
+        include_txt = compile.get_gcc_params_include(config.INCLUDES, config.REPO_PATH)
+        compilation_cflags = config.SUT_COMPILE_FLAGS + " " + include_txt
+        signature = None
+        func_files = []
+        func_names = []
+        for idx, mutant_path in enumerate(mutants):
+            func_file = utils.makepath(func_dir, mutant_path)
+            if utils.extract_file_from_tar(mutant_path, config.MUTANTS_FILE, _output=func_dir) is False:
+                utils.error_exit("Failed to extract mutant code from the archive: '%s'" % mutant_path)
+            utils.convert_CRLF_to_LF(func_file)
+
+            if signature is None:
+                extractor = FunctionExtractor(compilation_cflags, _prefix=config.MUTANT_FUNC_PREFIX,
+                                              _repo_path=config.REPO_PATH)
+                signature = extractor.get_function_signature(func_file, config.MUTANT.func)
+                if signature is None:
+                    utils.error_exit("The function %s cannot be built as schemata (variadic or unnamed parameters), "
+                                     "please set SCHEMATA_BUILD = False" % config.MUTANT.func)
+
+            extractor = FunctionExtractor(compilation_cflags, _prefix="%s%d" % (config.MUTANT_FUNC_PREFIX, idx+1),
+                                          _cache_dir=config.AST_CACHE,
+                                          _repo_path=config.REPO_PATH)
+            if self.extract_function_code(extractor, func_file) is False:
+                utils.error_exit("failed to parse function under test: '%s' in '%s'" % (config.MUTANT.func, mutant_path))
+            func_files.append(func_file)
+            func_names.append(extractor.get_mutated_func_name(config.MUTANT.func))
+
+        # make a source code with all the mutated functions and the dispatcher (mut_func)
+        signature["names"] = func_names
+        schemata_file = utils.makepath(func_dir, config.MUTANT.func + ".schemata" + config.MUTANT.ext)
+        compile.generate_schemata_code(func_files, signature, schemata_file, self.SCHEMATA_ID_ENV)
+        print("\tThe mutant schemata is stored in %s" % schemata_file)
+
+        # step 2: build SUT with the schemata
+        print("[Step 2] Injecting mutant schemata into SUT...")
+        self.generate_binary_SUT(_inject_mutant=True, _mutated_func_file=schemata_file)
+
+        # step 3: compile the drivers
+        for appendix in self.get_driver_appendixes():
+            self.compile_test_entry(appendix, _executable_file=path.get_schemata_driver_path(appendix))
+
+        # the map file is stored at last, it indicates the build is done
+        with open(_map_file, "w") as f:
+            json.dump({"function": config.MUTANT.func, "mutants": mutants}, f, indent=1)
+        return True
+
+    def select_schemata_mutant(self):
+        '''
+        select this mutant in the schemata drivers by setting the mutant ID in the environment
+        (all the drivers executed by this process inherit the environment)
+        '''
+        if config.SCHEMATA_BUILD is False: return True
+        map_file = path.get_schemata_map_file()
+        if os.path.exists(map_file) is False:
+            utils.error_exit("Cannot find the schemata map file. Please do `build` phase first: %s" % map_file)
+        with open(map_file, "r") as f:
+            mutants = json.load(f)["mutants"]
+        if config.MUTANT.fullpath not in mutants:
+            utils.error_exit("Cannot find the mutant in the schemata: %s" % config.MUTANT.fullpath)
+        os.environ[self.SCHEMATA_ID_ENV] = str(mutants.index(config.MUTANT.fullpath) + 1)
+        print("[Schemata] %s=%s" % (self.SCHEMATA_ID_ENV, os.environ[self.SCHEMATA_ID_ENV]))
+        return True
+
     ################################################
     # [Fuzzing] helper function for fuzzing phase
     ################################################
@@ -511,15 +794,12 @@ class Runner(object):
             input_size = self.get_size_input_file(_mutant_input_dir)
             fuzz_cmd += ' -g %d -G %d'% (input_size, input_size)
 
-        # create test driver command
-        obj_cmd = "%s @@ %s" % (_executable_test_driver, _working_dir)
-        if config.FUZZER_PRINT_INPUTS is False:
-            if config.FUZZER_PRINT_CRASHES is True: obj_cmd += " crash"
-        else:
-            obj_cmd += " all"
-        if config.FUZZER_PRINT_LOG_DETAILS is True: obj_cmd += " log"
+        # multiple instances work together for the mutant
+        if self.get_num_fuzzer_instances() > 1:
+            return self.execute_fuzzer_instances(fuzz_cmd, _working_dir, _executable_test_driver)
 
         # create final command and execute (ret code 124 is timeout) in working directory
+        obj_cmd = self.make_driver_command(_executable_test_driver, _working_dir)
         cmd = "%s %s %s"%(cmd, fuzz_cmd, obj_cmd)
         # if the fuzzer is not stopped after the timeout, we kill it by force in 60 seconds
         ret = utils.shell.execute_with_timeout(cmd, _timeout=config.FUZZING_TIMEOUT+60, _env=config.FUZZER_ENVS)
@@ -527,25 +807,96 @@ class Runner(object):
             utils.error_exit("executed command: %s"%cmd)
         return ret
 
+    def make_driver_command(self, _executable_test_driver, _working_dir):
+        # create test driver command
+        #   (the persistent-mode driver gets inputs through the shared memory of AFL++ with "-" instead of a file)
+        input_arg = "@@"
+        if self.AFLpp is True and config.FUZZING_PERSISTENT_MODE is True and config.FUZZING_SHMEM_TESTCASE is True:
+            input_arg = "-"
+        obj_cmd = "%s %s %s" % (_executable_test_driver, input_arg, _working_dir)
+        if config.FUZZER_PRINT_INPUTS is False:
+            if config.FUZZER_PRINT_CRASHES is True: obj_cmd += " crash"
+        else:
+            obj_cmd += " all"
+        if config.FUZZER_PRINT_LOG_DETAILS is True: obj_cmd += " log"
+        return obj_cmd
+
+    def get_num_fuzzer_instances(self):
+        if config.FUZZER_INSTANCES is None or config.FUZZER_INSTANCES <= 1: return 1
+        if self.AFLpp is False:
+            print("Multiple fuzzer instances work only with AFL++, we use a single instance.")
+            return 1
+        return config.FUZZER_INSTANCES
+
+    def get_fuzzer_cpus(self, _n_instances):
+        '''
+        :return: list of CPU cores to bind each fuzzer instance, None if the instances are not bound
+        '''
+        if config.FUZZER_CPU_BINDING is False: return None
+        # the available cores for this process (e.g., allocated by SLURM) except the cores used by
+        #   the running fuzzers (e.g., other run.py processes of run_list.py --local-jobs on the same node)
+        busy = utils.get_bound_cpus("afl-fuzz")
+        cpus = [cpu for cpu in sorted(os.sched_getaffinity(0)) if cpu not in busy]
+        if len(cpus) < _n_instances:
+            print("Not enough free CPU cores to bind %d fuzzer instances (free: %s), AFL++ chooses the cores" % (_n_instances, cpus))
+            return None
+        return cpus[:_n_instances]
+
+    def execute_fuzzer_instances(self, _fuzz_cmd, _working_dir, _executable_test_driver):
+        '''
+        execute a main instance (-M) and secondary instances (-S) of AFL++ that share the sync directory (_working_dir)
+        All the instances are stopped when one of them is finished (e.g., it kills the mutant).
+        See AFLOutput for the directory structure of the instances.
+        '''
+        n_instances = self.get_num_fuzzer_instances()
+        cpus = self.get_fuzzer_cpus(n_instances)
+        cmds = []
+        envs = []
+        for idx in range(n_instances):
+            name = AFLOutput.get_instance_name(idx)
+            cmd = "%s %s %s" % (_fuzz_cmd, "-M" if idx == 0 else "-S", name)
+            env = dict(config.FUZZER_ENVS) if config.FUZZER_ENVS is not None else {}
+            if cpus is not None:
+                cmd += " -b %d" % cpus[idx]
+                env.pop("AFL_NO_AFFINITY", None)    # AFL++ does not allow -b with AFL_NO_AFFINITY
+            driver_working_dir = _working_dir
+            if idx > 0:
+                driver_working_dir = utils.makepath(_working_dir, name)
+                env["MOTIF_SEQ_BASE"] = AFLOutput.INSTANCE_SEQ_BASE * idx
+            cmds.append("%s %s" % (cmd, self.make_driver_command(_executable_test_driver, driver_working_dir)))
+            envs.append(env)
+            print("[Fuzzer instance %s] %s" % (name, cmds[-1]))
+
+        # if the fuzzers are not stopped after the timeout, we kill them by force in 60 seconds
+        return utils.shell.execute_together(cmds, config.FUZZING_TIMEOUT+60, _envs=envs)
+
     def postprocess(self, _working_dir):
         print("Post processing ...")
 
         # set filter
         afl = AFLOutput(_working_dir, _isAFLpp=self.AFLpp)
-        afl.store_stats_total_log()
-        afl.copy_missing_inputs()
-        cnt = afl.remove_duplicate_inputs()
+        # the total logs are read once and the inputs are listed once for the stats, the missing inputs and the dedup
+        input_files, cnt = afl.postprocess()
         if cnt > 0:
             print("%d inputs are removed due to duplicate" % cnt)
 
-        self.remove_false_positive(afl, _working_dir)
+        self.remove_false_positive(afl, _working_dir, input_files)
+
+        # index the unique inputs and share them with the other runs and mutants
+        unique = afl.store_input_index()
+        if config.INPUT_STORE is not None:
+            store = InputStore(config.INPUT_STORE)
+            cnt = store.add(_working_dir, unique, utils.makepath(config.MUTANT.dir_path, config.MUTANT.name), config.RUN_ID)
+            print("%d new inputs are stored in %s" % (cnt, config.INPUT_STORE))
 
-        KILLED = len(afl.get_input_files(_subName=False))
+        # the killing inputs are the indexed ones remaining in the inputs directory
+        input_dir = os.path.abspath(afl.input_dir_path) + os.sep
+        KILLED = len([filepath for filepath in unique.values() if os.path.abspath(filepath).startswith(input_dir)])
         print("%d inputs killing the mutant are found."%KILLED)
 
         return KILLED
 
-    def remove_false_positive(self, _afl:AFLOutput, _working_dir):
+    def remove_false_positive(self, _afl:AFLOutput, _working_dir, _input_files=None):
         false_driver_file = path.get_executable_driver_path(path.FALSE_POSITIVE_PREFIX)
         if os.path.exists(false_driver_file) is False:
             print("Cannot find the test driver file for representing.")
@@ -553,10 +904,11 @@ class Runner(object):
             return False
 
         # All the crashed inputs due to the difference of return values will be stored
-        input_files = _afl.get_input_files(_subName=False)
+        #   (_input_files is the worklist given by the post processing, otherwise the inputs directory is listed)
+        input_files = _afl.get_input_files(_subName=False) if _input_files is None else _input_files
         false_positives = []
-        for input_file in input_files:
-            ret = self.execute_driver_timeout(false_driver_file, input_file, _timeout_ms=config.TEST_EXEC_TIMEOUT*2)
+        results = self.execute_driver_inputs(false_driver_file, input_files, _timeout_ms=config.TEST_EXEC_TIMEOUT*2)
+        for input_file, ret in zip(input_files, results):
             # timeout also filtered as a false-positive (there is possible to timeout in mutated function)
             if ret is None:
                 false_positives.append(input_file)
@@ -606,6 +958,20 @@ class Runner(object):
             return None
         return (ret, lines)
 
+    def execute_driver_inputs(self, _driver, _inputs, _timeout_ms=None):
+        '''
+        execute the driver for each input (in the batch mode of the driver if BATCH_REPLAY is set)
+        :param _driver: path of the executable driver
+        :param _inputs: list of inputs (each item is a string or a list of arguments for the driver)
+        :return: list of the results for each input, the same as execute_driver_timeout()
+        '''
+        if _timeout_ms is None:  _timeout_ms = config.TEST_EXEC_TIMEOUT
+        if config.BATCH_REPLAY is False:
+            return [self.execute_driver_timeout(_driver, item, _timeout_ms=_timeout_ms) for item in _inputs]
+
+        replay = BatchReplay(_driver, _timeout_ms, config.BATCH_REPLAY_SHARDS)
+        return [(ret, lines) if ret == 0 else None for ret, lines in replay.execute(_inputs)]
+
     ################################################
     # [GEN] printing out of results
     ################################################
@@ -631,9 +997,9 @@ class Runner(object):
 
         # print results with input values
         input_files = sorted(input_files)
-        for input_file in input_files:
+        outputs = self.execute_driver_inputs(test_driver_file, input_files, _timeout_ms=config.TEST_EXEC_TIMEOUT*2)
+        for input_file, results in zip(input_files, outputs):
             # presenter driver execute
-            results = self.execute_driver_timeout(test_driver_file, input_file, _verbose=False, _timeout_ms=config.TEST_EXEC_TIMEOUT*2)
             if results is not None:
                 self.output_log_execution(output_file, results[0], results[1], input_file)
         return True
@@ -681,25 +1047,40 @@ class Runner(object):
         expected_driver_file = path.get_executable_driver_path(path.EXPECTED_PREFIX)
         utils.prepare_directory(_testcase_dir)
 
-        # generate test cases
+        # each input of the same content is processed once (see InputStore)
+        unique, duplicates = InputStore.dedup(sorted(input_files), afl.load_input_index())
+        store = InputStore(config.INPUT_STORE) if config.INPUT_STORE is not None else None
+        func_key = None
+        if store is not None:
+            source_hash, config_hash = PrototypeArtifact.get_hashes(_generator.SOURCE_FILE, config.TEMPLATE_CONFIG)
+            func_key = InputStore.make_function_key(config.MUTANT.src_path, config.MUTANT.func, source_hash, config_hash)
+
+        # prepare paths of each input (the expected values found in the store are not captured again)
         utils.prepare_directory(afl.expected_dir_path)
-        input_files = sorted(input_files)
-        for input_file in input_files:
+        items = []
+        cached = []
+        for digest, input_file in unique.items():
+            sub_path = self.get_input_sub_path(afl, input_file)
+            expected_file = utils.makepath(afl.expected_dir_path, sub_path)
+            utils.prepare_directory(os.path.dirname(expected_file))
+            if store is not None and store.load_expected(func_key, digest, expected_file) is True:
+                cached.append((input_file, sub_path, expected_file, digest))
+            else:
+                items.append((input_file, sub_path, expected_file, digest))
+        if len(cached) > 0:
+            print("Loaded the expected values of %d inputs from %s" % (len(cached), config.INPUT_STORE))
+
+        # generate test cases while the expected values of the next inputs are captured
+        testcases = {}
+        for input_file, sub_path, expected_file, digest in itertools.chain(cached, self.capture_expected_values(expected_driver_file, items)):
             try:
-                # prepare path
-                sub_path = input_file[len(afl.input_dir_path):]
-                sub_path = sub_path[1:] if sub_path.startswith("/") else sub_path
-                expected_file = utils.makepath(afl.expected_dir_path, sub_path)
-                utils.prepare_directory(os.path.dirname(expected_file))
-
-                # presenter driver execute
                 print("Input %s:"% sub_path)
-                self.execute_driver_timeout(expected_driver_file, (input_file, expected_file), _timeout_ms=config.TEST_EXEC_TIMEOUT*2)
                 data = {
                     "input": self.load_binary_array(input_file),
                     "params": self.load_binary_array(expected_file+".params"),
                     "returns": self.load_binary_array(expected_file+".returns"),
                 }
+                if store is not None: store.store_expected(func_key, digest, expected_file)
 
                 # generate an output folder (test case)
                 testcase_file = sub_path.replace(".inb", ".test.c")
@@ -709,12 +1090,59 @@ class Runner(object):
                 # generate "TEST CASE"
                 ret = _generator.generate(config.MUTANT.func, testcase_path, config.TEMPLATE_TESTCASE_DRIVER, _appendix=data)
                 if ret is False: num_failed += 1
+                else: testcases[digest] = testcase_path
             except Exception as e:
                 traceback.print_exc()
                 num_failed += 1
 
+        # the duplicated inputs have the same test case
+        for input_file, digest in duplicates:
+            if digest not in testcases:
+                num_failed += 1
+                continue
+            testcase_file = self.get_input_sub_path(afl, input_file).replace(".inb", ".test.c")
+            testcase_path = utils.makepath(_testcase_dir, testcase_file)
+            utils.prepare_directory(os.path.dirname(testcase_path))
+            shutil.copyfile(testcases[digest], testcase_path)
+
         return num_cases, num_failed
 
+    def get_input_sub_path(self, _afl:AFLOutput, _input_file):
+        sub_path = _input_file[len(_afl.input_dir_path):]
+        return sub_path[1:] if sub_path.startswith("/") else sub_path
+
+    def capture_expected_values(self, _driver, _items):
+        '''
+        execute the expected driver for each input and yield the items whose expected values are captured (in order)
+        The inputs are split into chunks executed by a bounded pool (batch drivers with BATCH_REPLAY,
+          otherwise a driver process for each input), so the caller renders the test cases of a chunk
+          while the next chunks are executed
+        :param _driver: path of the expected driver
+        :param _items: list of (input file, sub path, expected file)
+        :return: generator of the items
+        '''
+        timeout_ms = config.TEST_EXEC_TIMEOUT*2
+        if config.BATCH_REPLAY is True and config.BATCH_REPLAY_SHARDS > 0:
+            n_workers = config.BATCH_REPLAY_SHARDS
+        else:
+            n_workers = compile.get_num_jobs(0, config.CONCURRENT_JOBS)
+        size = max(math.ceil(len(_items) / (n_workers * self.GEN_CHUNKS_PER_WORKER)), 1)
+        chunks = [_items[idx:idx + size] for idx in range(0, len(_items), size)]
+
+        if config.BATCH_REPLAY is True:
+            replay = BatchReplay(_driver, timeout_ms, 1)
+            execute_chunk = lambda chunk: replay.execute([(item[0], item[2]) for item in chunk])
+        else:
+            execute_chunk = lambda chunk: [self.execute_driver_timeout(_driver, (item[0], item[2]), _timeout_ms=timeout_ms)
+                                           for item in chunk]
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=n_workers) as pool:
+            futures = [pool.submit(execute_chunk, chunk) for chunk in chunks]
+            for chunk, future in zip(chunks, futures):
+                future.result()
+                for item in chunk:
+                    yield item
+
     def compile_testcases(self, _testcase_dir):
         '''
         compile test cases generated from the fuzzing inputs
@@ -731,24 +1159,37 @@ class Runner(object):
         if self.check_existance_of_binary_SUT() is False:
             self.generate_binary_SUT(_inject_mutant=False)
 
-        # generate test cases
+        # archive the SUT objects once for all the test cases
+        archive = None
+        archive_file = os.path.abspath(utils.makepath(_testcase_dir, self.SUT_ARCHIVE_NAME))
+        if config.SUT_ARCHIVE is True:
+            archive = compile.make_SUT_archive(config.COMPILED_OBJECTS, archive_file, config.REPO_PATH)
+
+        # compile test cases concurrently
         testcase_files = sorted(testcase_files)
-        for item in testcase_files:
-            # generate an output folder (test case)
-            testcase_file = utils.makepath(_testcase_dir, item)
-            excutable_file = testcase_file.replace(".test.c", ".obj")
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=compile.get_num_jobs(config.COMPILE_JOBS, config.CONCURRENT_JOBS)) as pool:
+                list(pool.map(lambda item: self.compile_testcase(_testcase_dir, item, archive), testcase_files))
+        finally:
+            if os.path.exists(archive_file): os.remove(archive_file)
+        return True
 
-            testcase_abspath = os.path.abspath(testcase_file)
-            excutable_abspath = os.path.abspath(excutable_file)
-
-            # compile test driver
-            compile_flags = config.SUT_COMPILE_FLAGS + " " + config.LINKER_FLAGS
-            compile.compile_test_driver(config.COMPILER_FILEPATH,
-                                        testcase_abspath,
-                                        excutable_abspath,
-                                        config.COMPILED_OBJECTS, config.INCLUDES,
-                                        compile_flags, config.REPO_PATH)
-            print("\tThe object file of test driver is located in %s" % excutable_file)
+    def compile_testcase(self, _testcase_dir, _item, _archive=None):
+        # generate an output folder (test case)
+        testcase_file = utils.makepath(_testcase_dir, _item)
+        excutable_file = testcase_file.replace(".test.c", ".obj")
+
+        testcase_abspath = os.path.abspath(testcase_file)
+        excutable_abspath = os.path.abspath(excutable_file)
+
+        # compile test driver
+        compile_flags = config.SUT_COMPILE_FLAGS + " " + config.LINKER_FLAGS
+        compile.compile_test_driver(config.COMPILER_FILEPATH,
+                                    testcase_abspath,
+                                    excutable_abspath,
+                                    config.COMPILED_OBJECTS, config.INCLUDES,
+                                    compile_flags, config.REPO_PATH, _archive=_archive)
+        print("\tThe object file of test driver is located in %s" % excutable_file)
         return True
 
     def execute_testcases(self, _testcase_dir, _output_dir):
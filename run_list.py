@@ -4,9 +4,13 @@ import platform
 if platform.python_version().startswith("3.") is False:
     raise Exception("Must be using Python 3")
 import math
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pipeline import Config
 from pipeline import utils
 from pipeline import Mutant
+from pipeline.JobJournal import JobJournal
+from pipeline.BudgetLedger import BudgetLedger
 
 
 ###
@@ -17,10 +21,12 @@ from pipeline import Mutant
 # - python3 run_list.py --hpc case_studies/ASN1/list/live_mutants all
 # - python3 run_list.py --hpc --parallel case_studies/ASN1/list/live_mutants all
 # - python3 run_list.py --hpc --parallel --runs 10 case_studies/ASN1/list/live_mutants all
+# - python3 run_list.py --local-jobs 16 case_studies/ASN1/list/live_mutants all
 # - run_list.pyt execute run.py with one target mutant
 # - all parameters specified for run_list.py also pass to the run.py execution
 ###
 class ListRunner(object):
+    succeeded = None    # False if any command failed in the local execution
 
     def __init__(self):
         # Load config file and set the values
@@ -36,27 +42,57 @@ class ListRunner(object):
 
         print('\nGenerating commands ...', end='')
         if confList.PHASE == "preprocess":
+            objs = dict(zip(mutants, mutant_objs))
             mutants, input_filters = self.reduce_redundent_mutant(mutant_objs, mutants, input_filters)
-            commands = self.generate_commands(mutants, input_filters, _sequential=not confList.HPC_PARALLEL)
-            print('Done (%d commands)' % len(commands))
+            if confList.PREPROCESS_BATCH is True:
+                groups = self.group_by_source_file([objs[mutant] for mutant in mutants], mutants, input_filters)
+                jobs = self.generate_batch_jobs(groups, _sequential=not confList.HPC_PARALLEL)
+            else:
+                jobs = self.generate_jobs(mutants, input_filters, _sequential=not confList.HPC_PARALLEL)
+            print('Done (%d commands)' % len(jobs))
             if len(mutant_objs) != len(mutants):
                 print("Preprocessing does not need to be done for all the mutants.")
                 print("Reduced the number of mutants (%d -> %d) since they share the same source code." % (len(mutant_objs), len(mutants)))
+            if len(jobs) != len(mutants):
+                print("Grouped the functions (%d) by their source files (%d commands)." % (len(mutants), len(jobs)))
         else:
-            commands = self.generate_commands(mutants, input_filters)
-            print('Done (%d commands)' % len(commands))
+            jobs = self.generate_jobs(mutants, input_filters)
+            print('Done (%d commands)' % len(jobs))
 
         print('\nExecuting commands ...', end='')
-        self.run(commands)
+        self.succeeded = self.run(jobs)
         pass
 
-    def run(self, _commands):
+    def run(self, _jobs):
+        # store all the jobs and select jobs that are not finished successfully in the previous executions
+        journal = JobJournal(confList.JOB_MANIFEST, confList.JOB_JOURNAL)
+        manifest_file = journal.store_manifest(_jobs)
+        print("\nJobs are stored in %s" % manifest_file)
+        if confList.RERUN_ALL is False:
+            pending = journal.get_pending_jobs(_jobs)
+            if len(pending) != len(_jobs):
+                print("Skipped %d jobs that are already finished (see %s)" % (len(_jobs) - len(pending), confList.JOB_JOURNAL))
+            _jobs = pending
+        if len(_jobs) == 0:
+            print("All the jobs are already finished. Use --rerun-all to execute them again.")
+            return True
+
+        # share the fuzzing budget among the jobs in this execution
+        if confList.FUZZING_BUDGET is not None and confList.PHASE in ["fuzzing", "all"] and confList.DRY_RUN is False:
+            BudgetLedger(confList.JOB_BUDGET).create(confList.FUZZING_BUDGET * 3600, len(_jobs))
+            print("Fuzzing budget (%.2f core-hours for %d jobs) is stored in %s" % (confList.FUZZING_BUDGET, len(_jobs), confList.JOB_BUDGET))
+
+        _commands = [job["cmd"] for job in _jobs]
         command_file = self.store_commands(_commands)
         print("\nCommands are stored in %s"% command_file)
 
+        ret = True
         if confList.HPC is False:
             # execute in local machine or HPC without sbatch
-            self.local_sequential(_commands, _resume=confList.RESUME)
+            if confList.LOCAL_JOBS > 1:
+                ret = self.local_parallel(_commands, _resume=confList.RESUME, _n_jobs=confList.LOCAL_JOBS)
+            else:
+                ret = self.local_sequential(_commands, _resume=confList.RESUME)
         else:
             print('\nCreating slurm job(s) ...')
             if confList.HPC_PARALLEL is False:
@@ -65,29 +101,64 @@ class ListRunner(object):
             else:
                 log_file = self.get_logfile_path()
                 self.sbatch_parallel(len(_commands), command_file, log_file, _resume=confList.RESUME)
-        pass
+        return ret is not False
 
     ##########################################
     # Execute runners as a single process
     ##########################################
-    def generate_commands(self, _mutants, _input_filters, _sequential=False):
-        cmds = []
+    def generate_jobs(self, _mutants, _input_filters, _sequential=False):
+        '''
+        generate jobs (run.py commands) for all mutants
+        :return: list of jobs (dict that has "id", "phase", "mutant", "runID" and "cmd")
+        '''
+        jobs = []
         # Execute multiple runs
         if confList.RUNS is not None and confList.PHASE in ["fuzzing", "gen", "all"]:
             # generate multiple runs of commands for all mutants
             for idx in range(0, len(_mutants)):
                 for runID in range(1, confList.RUNS+1):
-                    params = self.make_parameters(_mutants[idx], _input_filters[idx], runID, _sequential)
-                    cmd = "%s %s" % (confList.PYTHON_CMD, ' '.join(params))
-                    cmds.append(cmd)
+                    jobs.append(self.make_job(_mutants[idx], _input_filters[idx], runID, _sequential))
         else:
             # generate single run of commands for all mutants
             for idx in range(0, len(_mutants)):
-                params = self.make_parameters(_mutants[idx], _input_filters[idx], _sequential=_sequential)
-                cmd = "%s %s" % (confList.PYTHON_CMD, ' '.join(params))
-                cmds.append(cmd)
+                jobs.append(self.make_job(_mutants[idx], _input_filters[idx], _sequential=_sequential))
+
+        return jobs
 
-        return cmds
+    def generate_batch_jobs(self, _groups, _sequential=False):
+        '''
+        generate a job (run.py command) for each group of mutants
+        the mutants of a group are stored in a batch file given to run.py with the `--batch-mutants` option
+        :param _groups: list of groups, each group is a list of (mutant, input_filter)
+        :return: list of jobs (dict that has "id", "phase", "mutant", "runID" and "cmd")
+        '''
+        batch_dir = utils.makepath(confList.OUTPUT_PATH, "%s.batches" % confList.JOB_NAME)
+        utils.prepare_directory(batch_dir)
+
+        jobs = []
+        for idx, group in enumerate(_groups):
+            batch_file = utils.makepath(batch_dir, "%05d.list" % (idx+1))
+            with open(batch_file, "w") as f:
+                for mutant, input_filter in group:
+                    f.write("%s;%s\n" % (mutant, input_filter))
+
+            mutant, input_filter = group[0]
+            job_key = ",".join([item[0] for item in group])
+            jobs.append(self.make_job(mutant, input_filter, _sequential=_sequential, _batch_file=batch_file, _job_key=job_key))
+        return jobs
+
+    def make_job(self, _mutant, _input_filter=None, _runID=None, _sequential=False, _batch_file=None, _job_key=None):
+        job_id = JobJournal.make_job_id(confList.PHASE, _mutant if _job_key is None else _job_key, _runID)
+        params = self.make_parameters(_mutant, _input_filter, _runID, _sequential)
+        if _batch_file is not None:
+            params.insert(-1, "--batch-mutants")
+            params.insert(-1, _batch_file)
+        params.insert(-1, "--job-id")
+        params.insert(-1, job_id)
+        if confList.FUZZING_BUDGET is not None:
+            params.insert(-1, "--use-budget")
+        cmd = "%s %s" % (confList.PYTHON_CMD, ' '.join(params))
+        return {"id": job_id, "phase": confList.PHASE, "mutant": _mutant, "runID": _runID, "cmd": cmd}
 
     def store_commands(self, _cmds):
         # store the commands in one file
@@ -114,6 +185,69 @@ class ListRunner(object):
                 self.execute_command_in_singularity(_cmds[idx])
         return True
 
+    def local_parallel(self, _cmds, _resume=1, _n_jobs=2):
+        '''
+        execute the commands in the local machine, keeping _n_jobs commands in flight at the same time
+        the output of each command is stored in its own log file (<HPC_LOG_PATH>/<JOB_NAME>.<cmd_id>.log)
+        a failed command does not stop the other commands; the failed ones are reported at the end
+        :param _cmds: list of commands
+        :param _resume: the command ID to start from (starts from 1)
+        :param _n_jobs: the number of commands executed simultaneously
+        :return: False if any command failed (including the ones that could not be started)
+        '''
+        start_idx = _resume-1    # python index starts from 0
+        end_idx = len(_cmds)
+        if start_idx >= end_idx: return True
+
+        # prepare log path for each command
+        utils.prepare_directory(confList.HPC_LOG_PATH)
+
+        print("\nExecuting %d commands with %d local jobs ..." % (end_idx - start_idx, _n_jobs))
+        failed = []
+        finished = 0
+
+        def run_single(_idx):
+            cmd = _cmds[_idx]
+            if confList.SINGULARITY is True:
+                cmd = self.get_singularity_command(cmd)
+            log_file = utils.makepath(confList.HPC_LOG_PATH, "%s.%05d.log" % (confList.JOB_NAME, _idx+1))
+            if confList.DRY_RUN is True:
+                print("\n[cmd %d]: %s > %s" % (_idx+1, cmd, log_file))
+                return _idx, 0, 0
+            start = time.time()
+            try:
+                retcode = utils.shell.execute_to_file(cmd, log_file)
+            except Exception as e:
+                # e.g., the log file cannot be opened or the command cannot be started
+                return _idx, "%s: %s" % (type(e).__name__, e), time.time() - start
+            return _idx, retcode, time.time() - start
+
+        executor = ThreadPoolExecutor(max_workers=_n_jobs)
+        futures = []
+        try:
+            futures = [executor.submit(run_single, idx) for idx in range(start_idx, end_idx)]
+            for future in as_completed(futures):
+                idx, retcode, elapsed = future.result()
+                finished += 1
+                if retcode != 0: failed.append(idx+1)
+                if retcode == 0: status = "OK"
+                elif isinstance(retcode, str): status = "FAILED (%s)" % retcode
+                else: status = "FAILED (retcode: %s)" % retcode
+                print("[%d/%d] cmd %d %s in %.1fs" % (finished, len(futures), idx+1, status, elapsed))
+        except KeyboardInterrupt:
+            # stop all the running commands and the commands in waiting
+            for future in futures: future.cancel()
+            utils.shell.kill_child_processes()
+            executor.shutdown(wait=False)
+            utils.error_exit("Interrupted by user, the running commands are terminated.")
+        executor.shutdown(wait=True)
+
+        if len(failed) > 0:
+            failed.sort()
+            print("\n%d commands failed (see the logs in %s): %s" % (len(failed), confList.HPC_LOG_PATH, failed))
+            return False
+        return True
+
     def execute_command(self, _command):
         if confList.DRY_RUN is True:
             print('\n'+_command)
@@ -122,13 +256,16 @@ class ListRunner(object):
         return True
 
     def execute_command_in_singularity(self, _command):
-        cmd = "singularity exec --bind ./:/expr -H /expr %s %s" % (confList.SINGULARITY_FILE, _command)
+        cmd = self.get_singularity_command(_command)
         if confList.DRY_RUN is True:
             print('\n'+cmd)
             return True
         utils.shell.execute_and_check(cmd, 'retcode', 0, _verbose=True)
         return True
 
+    def get_singularity_command(self, _command):
+        return "singularity exec --bind ./:/expr -H /expr %s %s" % (confList.SINGULARITY_FILE, _command)
+
     ##########################################
     # Submit a job(s) to SLURM on HPC
     ##########################################
@@ -188,7 +325,13 @@ class ListRunner(object):
                 multiply = math.ceil(confList.N_TASKS_PER_JOB / confList.N_PARALLELS_PER_JOB)
                 additional = max(confList.FUZZING_TIMEOUT * 0.2, 1800)  # 20% additional time or 30 mins
                 single_request_time = confList.FUZZING_TIMEOUT + additional
-                cmd += " --time %s" % utils.convert_time_for_SLURM(single_request_time * multiply)
+                request_time = single_request_time * multiply
+                if confList.FUZZING_BUDGET is not None:
+                    # a task can take the time saved by the other tasks, up to FUZZING_BUDGET_MAX_FACTOR times
+                    request_time += confList.FUZZING_TIMEOUT * (confList.FUZZING_BUDGET_MAX_FACTOR - 1)
+                cmd += " --time %s" % utils.convert_time_for_SLURM(request_time)
+                if confList.FUZZER_INSTANCES > 1:
+                    cmd += " --cpus-per-task %d" % confList.FUZZER_INSTANCES    # a core for each fuzzer instance
 
             # append parallel command
             #        ./parallel.sh [-l <LOG_FILE>] [--lines MIN:MAX] <CMD_FILE> <SINGULARITY_FILE>
@@ -342,6 +485,13 @@ class ListRunner(object):
             params.insert(-1, str(_runID))  # all parameters should be a string
         if _sequential is True:
             params.insert(-1, "--noconfview")
+        if confList.HPC is False and confList.LOCAL_JOBS > 1 and "--parallel" not in params:
+            # concurrent runs should not share the same repository directory
+            params.insert(-1, "--parallel")
+        if confList.HPC is False and confList.LOCAL_JOBS > 1:
+            # concurrent runs share the CPU cores for the compilations (see COMPILE_JOBS)
+            params.insert(-1, "--concurrent-jobs")
+            params.insert(-1, str(confList.LOCAL_JOBS))
         if _input_filter is not None and _input_filter != "A":
             params.insert(-1, "--input-filter")
             params.insert(-1, _input_filter)
@@ -354,7 +504,10 @@ class ListRunner(object):
         print('Loading mutants list from MUTANTS_FILE %s ...'%confList.MUTANTS_FILE)
         match = '*.%s.*.c'%confList.MUTANT_FUNC_PREFIX
         all_mutants = utils.get_all_files_in_tar(confList.MUTANTS_FILE, _match=match)
-        base_mutants = [ os.path.basename(path) for path in all_mutants]
+        mutant_paths = set(all_mutants)
+        base_mutants = {}
+        for path in all_mutants:
+            base_mutants.setdefault(os.path.basename(path), path)   # keep the first one for the duplicated names
 
         # check the listed mutants are in the all mutants
         print('Verifying mutants and get mutants info ...')
@@ -363,18 +516,11 @@ class ListRunner(object):
             mutant = _mutants[idx]
             print('[Verifying %d/%d] %s ... '% (idx+1, len(_mutants), mutant), end='')
 
-            # verify the mutant exists in the tar file (to reduce the time, I didn't use the utils library)
-            mutant_path = None
+            # verify the mutant exists in the tar file (using the index of the tar file)
             if os.path.dirname(mutant) == "":
-                for idx in range(0, len(base_mutants)):
-                    if mutant != base_mutants[idx]: continue
-                    mutant_path = all_mutants[idx]
-                    break
+                mutant_path = base_mutants.get(mutant)
             else:
-                for item in all_mutants:
-                    if mutant != item: continue
-                    mutant_path = item
-                    break
+                mutant_path = mutant if mutant in mutant_paths else None
             if mutant_path is None:
                 utils.error_exit("Cannot find the mutant in the MUTANTS_FILE: %s"% mutant)
 
@@ -402,7 +548,17 @@ class ListRunner(object):
 
         return r_mutants, r_filters
 
+    def group_by_source_file(self, _objs, _mutants, _input_filters):
+        '''
+        group the mutants by their source file (keeping the order of the list)
+        :return: list of groups, each group is a list of (mutant, input_filter)
+        '''
+        groups = {}
+        for idx in range(0, len(_objs)):
+            groups.setdefault(_objs[idx].src_path, []).append((_mutants[idx], _input_filters[idx]))
+        return list(groups.values())
+
 
 if __name__ == "__main__":
     obj = ListRunner()
-    exit(0)
\ No newline at end of file
+    exit(0 if obj.succeeded is not False else 1)
\ No newline at end of file
@@ -0,0 +1,18 @@
+double deg2rad(double x)
+{
+#ifdef MLFS_FPU_DAZ
+    x *= __volatile_one;
+#endif /* MLFS_FPU_DAZ */
+
+    __int32_t ix;
+
+    /* High word of x. */
+    GET_HIGH_WORD(ix,x);
+
+    /* Check for infinities and NaN. */
+    ix &= 0x7fffffff;
+    if ((++ix)>=0x7ff00000) return x+x;
+
+    /* Return x * pi/180. */
+    return x * pio180;
+}
\ No newline at end of file
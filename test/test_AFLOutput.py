@@ -0,0 +1,193 @@
+#! /usr/bin/env python3
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+import shutil
+import tarfile
+import tempfile
+import unittest
+from unittest import TestCase
+from pipeline.fuzzer import AFLOutput
+from pipeline.fuzzer import ExecutionLog
+from pipeline.fuzzer import AFLOutputTar
+from pipeline import utils
+
+
+class TestAFLOutputInstances(TestCase):
+
+    def setUp(self):
+        self.work = tempfile.mkdtemp()
+        base = AFLOutput.INSTANCE_SEQ_BASE
+        # main instance: AFL results in ./default and the driver results in ./
+        self.make_instance("default", ".", 0, execs=3, crashes=["id:000000,sig:06,src:000000,time:10,execs:3,op:havoc"])
+        # secondary instance: AFL results and the driver results in ./secondary01
+        self.make_instance("secondary01", "secondary01", base, execs=2,
+                           crashes=["id:000000,sig:06,src:000001,time:12,execs:2,op:flip1"],
+                           synced=["id:000002,sync:default,src:000000"])
+
+    def tearDown(self):
+        shutil.rmtree(self.work)
+
+    def write(self, _path, _content, _mode="w"):
+        filepath = os.path.join(self.work, _path)
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        with open(filepath, _mode) as f:
+            f.write(_content)
+
+    def make_instance(self, _afl_dir, _driver_dir, _offset, execs, crashes, synced=()):
+        self.write(os.path.join(_afl_dir, "fuzzer_stats"), "execs_done        : %d\nexecs_per_sec     : 100.00\n" % execs)
+        self.write(os.path.join(_afl_dir, "plot_data"), "# unix_time, cycles_done, cur_path, paths_total, pending_total, "
+                   "pending_favs, map_size, unique_crashes, unique_hangs, max_depth, execs_per_sec\n"
+                   "%d, 0, 0, 3, 1, 1, 1.00%%, %d, 0, 1, 100.00\n" % (1000 + _offset // AFLOutput.INSTANCE_SEQ_BASE, len(crashes)))
+        for name in crashes:
+            self.write(os.path.join(_afl_dir, "crashes", name), "crash-%d" % _offset, "w")
+        for name in synced:
+            self.write(os.path.join(_afl_dir, "queue", name), "synced")
+
+        log = "SeqID,TimeID,Initial,Origin,Mutant,Comp"
+        for seq in range(1, execs + 1):
+            log += "\n%d,%d,1,1,1,%d" % (_offset + seq, 1000000 * seq, 0 if seq == execs else 1)
+        self.write(os.path.join(_driver_dir, "total.log"), log)
+
+    def test_merged_stats(self):
+        afl = AFLOutput(self.work, _isAFLpp=True)
+        assert [output.SEQ_OFFSET for output in afl.get_instances()] == [0, AFLOutput.INSTANCE_SEQ_BASE]
+        assert afl.load_fuzzer_stats("execs_done") == 5, "execs_done should be summed over the instances"
+
+        plot = afl.load_plot()
+        assert plot[-1]["unique_crashes"] == 2, "The crashes of the instances should be summed: %s" % plot[-1]
+        assert len(afl.load_plot(_reverse=True, _n_lines=1)) == 1
+
+        afl.store_stats_total_log()
+        with open(os.path.join(self.work, "stats.log")) as f:
+            counts = json.load(f)["counts"]
+        assert counts["all"] == 5 and counts["comp"] == 2 and counts["seq"] == 5, "Wrong merged counts: %s" % counts
+
+    def test_copy_missing_inputs(self):
+        afl = AFLOutput(self.work, _isAFLpp=True)
+        crashes = afl.get_crashed_input_files()
+        assert sorted(crashes.keys()) == [3, 2 + AFLOutput.INSTANCE_SEQ_BASE], "Wrong sequence IDs: %s" % crashes.keys()
+
+        afl.copy_missing_inputs()
+        inputs = sorted(afl.get_input_files_with_ID().keys())
+        assert inputs == [3, 2 + AFLOutput.INSTANCE_SEQ_BASE], "Inputs of all the instances should be collected: %s" % inputs
+
+    def test_postprocess(self):
+        # an input stored by the driver has the same content with the crash of the main instance
+        self.write("inputs/0/1.inb", "crash-0")
+        separate = os.path.join(self.work, "separate")
+        shutil.copytree(self.work, separate)
+
+        afl = AFLOutput(separate, _isAFLpp=True)
+        afl.store_stats_total_log()
+        afl.copy_missing_inputs()
+        expected_cnt = afl.remove_duplicate_inputs()
+        expected = sorted(os.path.relpath(path, separate) for path in afl.get_input_files())
+
+        afl = AFLOutput(self.work, _isAFLpp=True)
+        input_files, cnt = afl.postprocess()
+        assert cnt == expected_cnt == 1
+        assert sorted(os.path.relpath(path, self.work) for path in input_files) == expected
+        assert sorted(os.path.relpath(path, self.work) for path in afl.get_input_files()) == expected
+        for name in ["stats.log"]:
+            with open(os.path.join(self.work, name)) as f, open(os.path.join(separate, name)) as g:
+                assert json.load(f) == json.load(g)
+        assert sorted(afl.input_hashes.keys()) == sorted(os.path.normpath(path) for path in input_files)
+
+
+@unittest.skipIf(ExecutionLog.is_available() is False, "NumPy is not installed")
+class TestExecutionLog(TestCase):
+
+    def setUp(self):
+        self.work = tempfile.mkdtemp()
+        # executions failed at each stage (the columns after a crash are not written) and an empty line at the end
+        lines = ["SeqID,TimeID,Initial,Origin,Mutant,Comp"]
+        for seq in range(1, 301):
+            cols = [seq, 5000000 + 1500 * seq, 1, 1, 1, 1][:3 + seq % 4]
+            if seq % 7 == 0: cols[-1] = 0
+            lines.append(",".join([str(col) for col in cols]))
+        self.filepath = os.path.join(self.work, "total.log")
+        with open(self.filepath, "w") as f:
+            f.write("\n".join(lines) + "\n\n400,1,1,1,1,1")
+
+    def tearDown(self):
+        shutil.rmtree(self.work)
+
+    def test_same_as_records(self):
+        afl = AFLOutput(self.work)
+        records = list(afl.iter_simple_execution_log(self.filepath))
+        log = ExecutionLog(self.filepath)
+        log.CHUNK_SIZE = 64     # lines over the chunk boundaries
+        data = log.load()
+        assert len(data) == len(records) == 300, "The log should end at the empty line: %d" % len(data)
+        for name in ["seq", "timeID"] + ExecutionLog.STAGES:
+            assert data[name].tolist() == [record[name] for record in records], "Wrong column: %s" % name
+
+        assert log.get_stats() == afl.make_stats_by_records(self.filepath)[:4]
+        counts = log.count_stages()
+        failed = [next((name for name in ExecutionLog.STAGES if record[name] is False), None) for record in records]
+        assert counts == {"all": 300, **{name: failed.count(name) for name in ExecutionLog.STAGES}}, "Wrong counts: %s" % counts
+        assert log.get_missing_inputs({7: None}) == [record["seq"] for record in records if record["initial"] and
+                                                     record["origin"] and not (record["mutant"] and record["comp"]) and
+                                                     record["seq"] != 7]
+
+    def test_sidecar(self):
+        data = ExecutionLog(self.filepath).load()
+        assert os.path.exists(self.filepath + ExecutionLog.SIDECAR_EXT) is True
+        loaded = ExecutionLog(self.filepath).load()
+        assert loaded.filename is not None and loaded.tolist() == data.tolist(), "The sidecar should be memory-mapped"
+
+        # an updated log is parsed again
+        with open(self.filepath, "w") as f:
+            f.write("SeqID,TimeID,Initial,Origin,Mutant,Comp\n1,10,1,1")
+        assert ExecutionLog(self.filepath).load()["seq"].tolist() == [1]
+        ExecutionLog(self.filepath).remove_sidecar()
+        assert os.path.exists(self.filepath + ExecutionLog.SIDECAR_EXT) is False
+
+
+class TestAFLOutputTar(TestCase):
+
+    def setUp(self):
+        self.work = tempfile.mkdtemp()
+        result = os.path.join(self.work, "result")
+        files = {"default/fuzzer_stats": "execs_done        : 7\n", "__num__": "12\n",
+                 "stats.log": json.dumps({"counts": {"all": 7}, "elapsed": {"all": -1}}),
+                 "inputs/0/3.inb": "abc", "inputs/0/5.inb": "def", "logs/0/3.log": "log"}
+        for name, content in files.items():
+            os.makedirs(os.path.dirname(os.path.join(result, name)), exist_ok=True)
+            with open(os.path.join(result, name), "w") as f: f.write(content)
+        # the same layout as utils.compress_directory ("tar cf ../<name>.tar .")
+        self.tar_file = os.path.join(self.work, "result.tar")
+        with tarfile.open(self.tar_file, "w") as tar: tar.add(result, arcname=".")
+
+    def tearDown(self):
+        shutil.rmtree(self.work)
+
+    def test_indexed_reader(self):
+        tar = AFLOutputTar(self.tar_file, os.path.join(self.work, "temp"), _isAFLpp=True)
+        assert os.path.exists(self.tar_file + ".idx") is True, "The index should be kept next to the tar file"
+        assert sorted(tar.list_files("./inputs/", _onlyfiles=True)) == ["./inputs/0/3.inb", "./inputs/0/5.inb"]
+        assert tar.get_timeIDs_from_detailed_logs() == {3}
+
+        # read without extracting
+        assert tar.get_number_of_inputs() == 12
+        assert tar.load_stats_total_log()["counts"]["all"] == 7
+        assert os.path.exists(tar.INTERMEDIATE) is False, "The files should be read without extracting them"
+
+        # extract at the offset of the member
+        assert tar.load_fuzzer_stats("execs_done") == 7
+        filepath = tar.extract_file("inputs/0/5.inb")
+        with open(filepath) as f:
+            assert f.read() == "def"
+        assert tar.extract_file("./inputs/0/4.inb") is None
+        assert tar.TAR_FILENAME in utils.mem_tarfiles
+        tar.close()
+        assert os.path.exists(tar.INTERMEDIATE) is False
+        assert tar.TAR_FILENAME not in utils.mem_tarfiles, "The index should be released from the memory"
+        assert os.path.exists(self.tar_file + ".idx") is True
+
+
+if __name__ == '__main__':
+    unittest.main()
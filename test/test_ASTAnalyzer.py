@@ -2,12 +2,15 @@ import os
 import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+import shutil
+import tempfile
 import unittest
 from unittest import TestCase
 from pipeline import utils
 from pipeline import compile
 from pipeline import Config
 from pipeline.ASTAnalyzer import ASTAnalyzer
+from pipeline.FunctionExtractor import FunctionExtractor
 from pipeline.Prototype import Prototype
 from clang .cindex import Index, CursorKind, TypeKind, Cursor, Type
 
@@ -221,5 +224,161 @@ class TestASTAnalyzer(TestCase):
             print("\t\t                    : WritingSize - %s" % (param['size']))
 
 
+class TestASTCache(TestCase):
+
+    def setUp(self):
+        self.work = tempfile.mkdtemp()
+        self.cache = os.path.join(self.work, "cache")
+        self.header = self.write("lib.h", "typedef int value_t;\n")
+        self.source = self.write("lib.c", '#include "lib.h"\nvalue_t add(value_t a, value_t b) { return a + b; }\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.work)
+
+    def write(self, _name, _code):
+        filepath = os.path.join(self.work, _name)
+        with open(filepath, "w") as f:
+            f.write(_code)
+        return filepath
+
+    def parse(self):
+        ast = ASTAnalyzer(self.source, "-I" + self.work, _cache_dir=self.cache)
+        return [(decl.spelling, decl.result_type.spelling) for decl in ast.get_function_decls()]
+
+    def count_cached(self):
+        return len([f for d, _, files in os.walk(self.cache) for f in files if f.endswith(".ast")])
+
+    def test_load_cached_AST(self):
+        first = self.parse()
+        assert first == [("add", "value_t")], "Wrong function declarations: %s" % first
+        assert self.count_cached() == 1, "The AST should be stored in the cache"
+
+        second = self.parse()
+        assert second == first, "The cached AST should have the same declarations: %s" % second
+        assert self.count_cached() == 1
+
+        # changing the header makes the cached AST invalid
+        self.write("lib.h", "typedef long value_t;\n")
+        stat = os.stat(self.header)
+        os.utime(self.header, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        assert self.parse() == [("add", "value_t")]
+        assert ASTAnalyzer(self.source, "-I" + self.work, _cache_dir=self.cache).TYPES["value_t"].underlying_typedef_type.spelling == "long"
+
+    def test_shared_by_clones(self):
+        # the repository is cloned for each mutant (the files keep their modification times)
+        repos = []
+        for name in ["mut1", "mut2"]:
+            repo = os.path.join(self.work, "repos", name)
+            os.makedirs(repo)
+            for filepath in [self.source, self.header]:
+                shutil.copy2(filepath, repo)
+            repos.append(repo)
+
+        decls = []
+        asts = []
+        for repo in repos:
+            asts.append(ASTAnalyzer(os.path.join(repo, "lib.c"), "-I" + repo, _cache_dir=self.cache, _repo_path=repo))
+            decls.append([(decl.spelling, decl.result_type.spelling) for decl in asts[-1].get_function_decls()])
+        assert decls[0] == decls[1] == [("add", "value_t")], "Wrong function declarations: %s" % decls
+        assert self.count_cached() == 1, "The clones should share the cached AST"
+        assert asts[1].AST_FILE == asts[0].SOURCE_FILE, "The second clone should load the AST of the first clone"
+
+        # the header of the clone is different from the cached one
+        with open(os.path.join(repos[1], "lib.h"), "w") as f: f.write("typedef long value_t;\n")
+        ast = ASTAnalyzer(os.path.join(repos[1], "lib.c"), "-I" + repos[1], _cache_dir=self.cache, _repo_path=repos[1])
+        assert ast.TYPES["value_t"].underlying_typedef_type.spelling == "long"
+
+    def test_mutants_not_cached(self):
+        FunctionExtractor("", _prefix="mut", _cache_dir=self.cache).extract(self.source, "add", os.path.join(self.work, "out.c"))
+        assert self.count_cached() == 0, "The mutants are unique, they should not be cached"
+
+    def test_standard_includes_memoized(self):
+        first = ASTAnalyzer(self.source, "-I" + self.work).get_standard_includes()
+        assert ASTAnalyzer.STANDARD_INCLUDES == first, "The standard includes should be memoized"
+        first.append("modified")
+        assert "modified" not in ASTAnalyzer.STANDARD_INCLUDES, "The memoized value should not be exposed"
+
+
+class TestFastParse(TestCase):
+
+    def setUp(self):
+        self.work = tempfile.mkdtemp()
+        self.source = os.path.join(self.work, "lib.c")
+        with open(self.source, "w") as f:
+            f.write('#include <stdio.h>\n#include <string.h>\n'
+                    'typedef struct { int a; char name[10]; } item_t;\n'
+                    'int count(item_t *items, int n);\n'
+                    'static int add(int a, item_t *b) {\n'
+                    '    if (a > 0) { printf("{ %d", a); }\n'
+                    '    return a + b->a; /* } */\n'
+                    '}\n'
+                    'int count(item_t *items, int n) { int c = 0; while (n--) { c += strlen(items[n].name); } return c; }\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.work)
+
+    def summary(self, _ast):
+        return [(decl.spelling, _ast.get_function_extent(decl), _ast.get_body_start(decl)) for decl in _ast.get_function_decls()]
+
+    def test_same_functions_as_full_parse(self):
+        full = ASTAnalyzer(self.source, "")
+        pch_dir = os.path.join(self.work, "pch")
+        for _ in range(2):     # make and reuse the precompiled header
+            fast = ASTAnalyzer(self.source, "", _fast=True, _pch_dir=pch_dir)
+            assert self.summary(fast) == self.summary(full), "Wrong functions: %s" % self.summary(fast)
+            assert "item_t" in fast.TYPES and "FILE" in fast.TYPES, "Type definitions should be parsed"
+            includes = sorted(str(inc.include) for inc in fast.get_includes())
+            assert includes == sorted(str(inc.include) for inc in full.get_includes()), "The precompiled includes are missing"
+        assert len([f for f in os.listdir(pch_dir) if f.endswith(".pch")]) == 1, "The precompiled header should be shared"
+
+    def test_directives_in_body(self):
+        # the conditional compilation unbalances the braces of the body
+        with open(self.source, "w") as f:
+            f.write('int check(int a, int b) {\n'
+                    '#ifdef USE_A\n'
+                    '    if (a) {\n'
+                    '#else\n'
+                    '    if (b) {\n'
+                    '#endif\n'
+                    '        return 1;\n'
+                    '    }\n'
+                    '    return 0;\n'
+                    '}\n'
+                    'int next(int a) { return a + 1; }\n')
+        full = ASTAnalyzer(self.source, "")
+        fast = ASTAnalyzer(self.source, "", _fast=True)
+        assert self.summary(fast) == self.summary(full), "Wrong functions: %s" % self.summary(fast)
+        assert fast.FULL_AST is not None, "The extent should be found by the full parse"
+
+    def list_PCH(self, _pch_dir):
+        return sorted(f for f in os.listdir(_pch_dir) if f.endswith(".pch"))
+
+    def test_PCH_shared_by_clones(self):
+        pch_dir = os.path.join(self.work, "pch")
+        for name in ["mut1", "mut2"]:
+            repo = os.path.join(self.work, "repos", name)
+            os.makedirs(repo)
+            shutil.copy2(self.source, repo)
+            fast = ASTAnalyzer(os.path.join(repo, "lib.c"), "-I" + repo, _fast=True, _pch_dir=pch_dir, _repo_path=repo)
+            assert "item_t" in fast.TYPES and "FILE" in fast.TYPES
+        assert len(self.list_PCH(pch_dir)) == 1, "The clones should share the header of the system includes"
+
+    def test_PCH_modified_header(self):
+        # a header in the repository included as a system include
+        with open(os.path.join(self.work, "defs.h"), "w") as f: f.write("typedef int value_t;\n")
+        with open(self.source, "w") as f: f.write("#include <defs.h>\nvalue_t get(void) { return 1; }\n")
+        pch_dir = os.path.join(self.work, "pch")
+        ASTAnalyzer(self.source, "-I" + self.work, _fast=True, _pch_dir=pch_dir, _repo_path=self.work)
+        first = self.list_PCH(pch_dir)
+
+        with open(os.path.join(self.work, "defs.h"), "w") as f: f.write("typedef long value_t;\n")
+        fast = ASTAnalyzer(self.source, "-I" + self.work, _fast=True, _pch_dir=pch_dir, _repo_path=self.work)
+        assert fast.TYPES["value_t"].underlying_typedef_type.spelling == "long"
+        pch_files = self.list_PCH(pch_dir)
+        assert len(pch_files) == 2 and set(first) < set(pch_files), \
+            "A new header should be made without removing the previous one: %s" % pch_files
+        assert os.path.join(self.work, "defs.h") in [str(inc.include) for inc in fast.get_includes()]
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,147 @@
+#! /usr/bin/env python3
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import shutil
+import struct
+import subprocess
+import time
+import tempfile
+import threading
+import unittest
+from unittest import TestCase
+from unittest import mock
+import run
+from pipeline import utils
+from pipeline.Config import Config
+from pipeline.TemplateGenerator import TemplateGenerator
+from pipeline.BatchReplay import BatchReplay
+
+
+class TestBatchReplay(TestCase):
+
+    def setUp(self):
+        self.work = tempfile.mkdtemp()
+        self.write("lib.c", "int add(int a, int *b) { *b = a + 1; return a * 2; }\n")
+        # the mutant is killed by 7 and does not terminate with 9
+        self.write("mut.c", "int mut_add(int a, int *b) { while (a == 9); *b = a + 1; return a == 7 ? 0 : a * 2; }\n")
+
+        conf = utils.load_module(os.path.join(os.path.dirname(__file__), "..", "pipeline", "_config.py"))
+        self.config = Config(vars(conf))
+        self.config.REPO_PATH = self.work
+        self.config.AST_CACHE = os.path.join(self.work, "ast-cache")
+        self.config.PCH_CACHE = os.path.join(self.work, "pch-cache")
+
+    def tearDown(self):
+        shutil.rmtree(self.work)
+
+    def write(self, _name, _code):
+        filepath = os.path.join(self.work, _name)
+        with open(filepath, "w") as f:
+            f.write(_code)
+        return filepath
+
+    def write_input(self, _name, _value):
+        filepath = os.path.join(self.work, _name)
+        with open(filepath, "wb") as f:
+            f.write(struct.pack("ii", _value, 1))
+        return filepath
+
+    def build_driver(self):
+        driver = os.path.join(self.work, "driver.c")
+        gen = TemplateGenerator(os.path.join(self.work, "lib.c"), self.config, "")
+        assert gen.generate("add", driver, self.config.TEMPLATE_FUZZING_DRIVER) is True, "Failed to generate the driver"
+        binary = os.path.join(self.work, "driver")
+        subprocess.check_call(["gcc", "-w", "-o", binary, driver] +
+                              [os.path.join(self.work, name) for name in ["lib.c", "mut.c"]])
+        return binary
+
+    def test_batch_mode(self):
+        binary = self.build_driver()
+        values = [5, 7, 9, 6]
+        inputs = [self.write_input("input%d.bin" % idx, value) for idx, value in enumerate(values)]
+        results = BatchReplay(binary, 500, _shards=2).execute([[filepath, self.work, "crash"] for filepath in inputs])
+
+        retcodes = [ret for ret, lines in results]
+        assert retcodes[0] == 0 and retcodes[3] == 0, "Surviving inputs should pass: %s" % retcodes
+        assert retcodes[1] == 134, "The killing input should abort the driver: %s" % retcodes
+        assert retcodes[2] == BatchReplay.TIMEOUT_RETCODE, "The non-terminating input should timeout: %s" % retcodes
+
+        with open(os.path.join(self.work, "total.log")) as f:
+            lines = f.read().strip().split("\n")
+        seq_ids = sorted([int(line.split(",")[0]) for line in lines[1:]])
+        assert seq_ids == [1, 2, 3, 4], "Each input should be logged with its own sequence ID: %s" % lines
+
+    def test_expected_values_and_testcases(self):
+        # the expected driver captures the values in the batch mode, and a generator renders all the test cases
+        driver = os.path.join(self.work, "expected.c")
+        gen = TemplateGenerator(os.path.join(self.work, "lib.c"), self.config, "")
+        assert gen.generate("add", driver, "template_expected.c.jinja2") is True
+        binary = os.path.join(self.work, "expected")
+        subprocess.check_call(["gcc", "-w", "-o", binary, driver, os.path.join(self.work, "lib.c")])
+
+        inputs = [self.write_input("input%d.bin" % value, value) for value in [3, 4]]
+        results = BatchReplay(binary, 1000, _shards=1).execute([[filepath, filepath + ".exp"] for filepath in inputs])
+        assert [ret for ret, lines in results] == [0, 0], "The expected driver should succeed: %s" % results
+
+        env = gen.get_environment()
+        codes = []
+        for filepath in inputs:
+            with open(filepath, "rb") as f: data = {"input": list(f.read())}
+            with open(filepath + ".exp.params", "rb") as f: data["params"] = list(f.read())
+            with open(filepath + ".exp.returns", "rb") as f: data["returns"] = list(f.read())
+            assert data["returns"][0] == data["input"][0] * 2, "Wrong expected return: %s" % data
+            testcase = filepath.replace(".bin", ".test.c")
+            assert gen.generate("add", testcase, self.config.TEMPLATE_TESTCASE_DRIVER, _appendix=data) is True
+            with open(testcase) as f: codes.append(f.read())
+        assert gen.get_environment() is env and len(gen.contexts) == 2, "Templates should be loaded once: %s" % gen.contexts.keys()
+        assert codes[0] != codes[1], "Each test case should have its own values"
+
+    def test_capture_without_batch_mode(self):
+        # the expected values are captured by a bounded pool of driver processes without BATCH_REPLAY
+        driver = os.path.join(self.work, "expected.c")
+        gen = TemplateGenerator(os.path.join(self.work, "lib.c"), self.config, "")
+        assert gen.generate("add", driver, "template_expected.c.jinja2") is True
+        binary = os.path.join(self.work, "expected")
+        subprocess.check_call(["gcc", "-w", "-o", binary, driver, os.path.join(self.work, "lib.c")])
+
+        self.config.BATCH_REPLAY = False
+        self.config.CONCURRENT_JOBS = 1
+        self.config.TEST_EXEC_TIMEOUT = 1000
+        run.config = self.config
+        runner = run.Runner.__new__(run.Runner)
+        items = [(self.write_input("input%d.bin" % value, value), "sub", os.path.join(self.work, "input%d.exp" % value))
+                 for value in range(8)]
+        assert list(runner.capture_expected_values(binary, items)) == items, "The items should be given in order"
+        for value, item in enumerate(items):
+            with open(item[2] + ".returns", "rb") as f:
+                assert f.read()[0] == value * 2, "Wrong expected value: %s" % item[2]
+
+        # the executions overlap
+        running = [0, 0]
+        lock = threading.Lock()
+        def execute(_driver, _input=None, _verbose=False, _timeout_ms=None):
+            with lock:
+                running[0] += 1
+                running[1] = max(running)
+            time.sleep(0.05)
+            with lock: running[0] -= 1
+            return (0, [])
+        with mock.patch.object(runner, "execute_driver_timeout", side_effect=execute) as executed, \
+                mock.patch.object(run.compile, "get_num_jobs", return_value=4):
+            assert list(runner.capture_expected_values(binary, items)) == items
+        assert executed.call_count == len(items)
+        assert 1 < running[1] <= 4, "The inputs should be executed by the bounded pool: %d" % running[1]
+
+    def test_fallback_to_single_execution(self):
+        # a driver without the batch mode
+        script = self.write("old_driver.sh", "#!/bin/sh\necho \"input: $1\"\nexit $2\n")
+        os.chmod(script, 0o755)
+        results = BatchReplay(script, 1000).execute([["a", "0"], ["b", "3"]])
+        assert [ret for ret, lines in results] == [0, 3], "Each input should be executed one by one: %s" % results
+        assert results[1][1][0] == "input: b"
+
+
+if __name__ == '__main__':
+    unittest.main()
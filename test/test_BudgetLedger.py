@@ -0,0 +1,43 @@
+#! /usr/bin/env python3
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import shutil
+import tempfile
+import unittest
+from unittest import TestCase
+from pipeline.BudgetLedger import BudgetLedger
+
+
+class TestBudgetLedger(TestCase):
+
+    def setUp(self):
+        self.work = tempfile.mkdtemp()
+        self.ledger = BudgetLedger(os.path.join(self.work, "job.budget.json"))
+
+    def tearDown(self):
+        shutil.rmtree(self.work)
+
+    def test_recycle_saved_time(self):
+        self.ledger.create(400, 4)
+        assert self.ledger.acquire("a", 100, 4) == 100, "The first job should get a fair share"
+        assert self.ledger.acquire("b", 100, 4) == 100, "The running jobs should reserve their grants"
+
+        # the job `a` killed the mutant early
+        self.ledger.release("a", 10)
+        assert self.ledger.acquire("c", 100, 4) == 145, "The saved time should be shared by the remaining jobs"
+
+        self.ledger.release("b", 100)
+        self.ledger.release("c", 145)
+        assert self.ledger.acquire("d", 100, 4) == 145, "The last job should take the remaining budget"
+
+    def test_max_factor(self):
+        self.ledger.create(1000, 2)
+        self.ledger.acquire("a", 100, 4)
+        self.ledger.release("a", 1)
+        assert self.ledger.acquire("b", 100, 4) == 400, "A grant should not exceed the max factor"
+
+
+if __name__ == '__main__':
+    unittest.main()
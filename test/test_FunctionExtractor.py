@@ -2,7 +2,11 @@ import os
 import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+import shutil
+import tempfile
 import unittest
+from unittest import mock
+from pipeline.ASTAnalyzer import ASTAnalyzer
 from pipeline.FunctionExtractor import FunctionExtractor
 
 
@@ -22,5 +26,87 @@ class MyTestCase(unittest.TestCase):
 
 
 
+class TestDiffExtraction(unittest.TestCase):
+    ORIGIN = ("#include <stdio.h>\n"
+              "int add(int a, int b)\n"
+              "{\n"
+              "    if (a > b) { return a; }\n"
+              "    return a + b;\n"
+              "}\n"
+              "int twice(int a) { return add(a, a); }\n")
+
+    def setUp(self):
+        self.work = tempfile.mkdtemp()
+        self.origin = self.write("origin.c", self.ORIGIN)
+        FunctionExtractor.EXTENTS = {}
+
+    def tearDown(self):
+        shutil.rmtree(self.work)
+
+    def write(self, _name, _code):
+        filepath = os.path.join(self.work, _name)
+        with open(filepath, "w") as f:
+            f.write(_code)
+        return filepath
+
+    def read(self, _filepath):
+        with open(_filepath) as f:
+            return f.read()
+
+    def test_same_as_parsing(self):
+        mutant = self.write("add.mut.c", self.ORIGIN.replace("a > b", "a >= b").replace("a + b", "a + b + 100"))
+        obj = FunctionExtractor("", _prefix="mut", _cache_dir=os.path.join(self.work, "cache"))
+        assert obj.extract_by_diff(self.origin, mutant, "add", os.path.join(self.work, "diff.c")) is True
+        obj.extract(mutant, "add", os.path.join(self.work, "parsed.c"))
+        code = self.read(os.path.join(self.work, "diff.c"))
+        assert code == self.read(os.path.join(self.work, "parsed.c")), "Wrong extraction: %s" % code
+        assert "mut_add" in code and "a + b + 100" in code and "twice" not in code
+
+        # the extents are loaded from the cache without parsing the original source file again
+        FunctionExtractor.EXTENTS = {}
+        mutant = self.write("twice.mut.c", self.ORIGIN.replace("add(a, a)", "add(a, -a)"))
+        assert obj.get_function_offsets_by_diff(self.origin, mutant, "twice") == obj.get_function_offsets(mutant, "twice")
+
+    def test_shared_by_clones(self):
+        cache_dir = os.path.join(self.work, "cache")
+        roots = [os.path.join(self.work, "repos", name) for name in ["mut1", "mut2"]]
+        for root in roots:
+            os.makedirs(os.path.join(root, "src"))
+            shutil.copy2(self.origin, os.path.join(root, "src", "add.c"))
+        code = self.ORIGIN.replace("a + b", "a - b")
+        obj = FunctionExtractor("-I" + roots[0], _prefix="mut", _cache_dir=cache_dir, _repo_path=roots[0])
+        mutant = self.write("first.mut.c", code)
+        assert obj.extract_by_diff(os.path.join(roots[0], "src", "add.c"), mutant, "add", mutant, _src_path="src/add.c") is True
+
+        # the other clone uses the extents of the first clone (the original file is backed up as *.origin)
+        FunctionExtractor.EXTENTS = {}
+        os.rename(os.path.join(roots[1], "src", "add.c"), os.path.join(roots[1], "src", "add.c.origin"))
+        obj = FunctionExtractor("-I" + roots[1], _prefix="mut", _cache_dir=cache_dir, _repo_path=roots[1])
+        mutant = self.write("second.mut.c", code)
+        with mock.patch.object(ASTAnalyzer, "__init__", side_effect=AssertionError("The source file is parsed")):
+            assert obj.extract_by_diff(os.path.join(roots[1], "src", "add.c.origin"), mutant, "add", mutant,
+                                       _src_path="src/add.c") is True
+        assert self.read(mutant) == self.read(os.path.join(self.work, "first.mut.c"))
+
+    def test_CRLF_origin(self):
+        # the mutant is converted into LF, but the original source file is not
+        with open(self.origin, "w", newline="") as f: f.write(self.ORIGIN.replace("\n", "\r\n"))
+        mutant = self.write("add.mut.c", self.ORIGIN.replace("a + b", "a - b"))
+        obj = FunctionExtractor("", _prefix="mut")
+        assert obj.extract_by_diff(self.origin, mutant, "add", os.path.join(self.work, "diff.c")) is False, \
+            "The offsets in the CRLF file cannot be mapped onto the mutant"
+        obj.extract(self.origin, "twice", os.path.join(self.work, "twice.c"))
+        assert self.read(os.path.join(self.work, "twice.c")) == "int mut_twice(int a) { return add(a, a); }"
+
+    def test_boundary_changes(self):
+        obj = FunctionExtractor("", _prefix="mut")
+        # the edit removes a brace or is outside of the function
+        for code in [self.ORIGIN.replace("{ return a; }", "return a;"),
+                     self.ORIGIN.replace("int twice", "static int twice"),
+                     self.ORIGIN.replace("return a + b;", "return a + b; // }")]:
+            mutant = self.write("add.mut.c", code)
+            assert obj.extract_by_diff(self.origin, mutant, "add", os.path.join(self.work, "diff.c")) is False, code
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,74 @@
+#! /usr/bin/env python3
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import shutil
+import tempfile
+import unittest
+from unittest import TestCase
+from pipeline.fuzzer import AFLOutput
+from pipeline.fuzzer import InputStore
+
+
+class TestInputStore(TestCase):
+
+    def setUp(self):
+        self.work = tempfile.mkdtemp()
+        self.result = os.path.join(self.work, "result")
+        # inputs 1 and 3 are the same, input 4 is a false positive of another content
+        for seq, content in [(1, b"\x01\x00"), (2, b"\x02\x00"), (3, b"\x01\x00"), (5, b"\x02\x01")]:
+            self.write("inputs/0/%d.inb" % seq, content)
+        self.write("falses/0/4.inb", b"\x04\x00")
+
+    def tearDown(self):
+        shutil.rmtree(self.work)
+
+    def write(self, _path, _content):
+        filepath = os.path.join(self.result, _path)
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        with open(filepath, "wb") as f:
+            f.write(_content)
+        return filepath
+
+    def test_remove_duplicates_and_index(self):
+        afl = AFLOutput(self.result)
+        assert afl.remove_duplicate_inputs() == 1
+        names = sorted(os.path.basename(path) for path in afl.get_input_files())
+        assert names == ["1.inb", "2.inb", "5.inb"], "The first input of the same content should be kept: %s" % names
+
+        unique = afl.store_input_index()
+        assert len(unique) == 4, "The index should list the inputs and the false positives: %s" % unique
+        index = afl.load_input_index()
+        for digest, filepath in unique.items():
+            assert index[os.path.normpath(filepath)] == digest == InputStore.hash_file(filepath)
+
+    def test_shared_store(self):
+        afl = AFLOutput(self.result)
+        afl.remove_duplicate_inputs()
+        store = InputStore(os.path.join(self.work, "store"))
+        unique = afl.store_input_index()
+        assert store.add(self.result, unique, "lib/a/a.mut.1", 1) == 4
+        # another mutant finds one of the same inputs
+        other = {InputStore.hash_file(self.write("other/1.inb", b"\x02\x00")): os.path.join(self.result, "other/1.inb")}
+        assert store.add(self.result, other, "lib/a/a.mut.2", 1) == 0, "The same input should be stored once"
+        refs = store.load_refs()
+        assert len(refs) == 4 and [ref["mutant"] for ref in refs[list(other)[0]]] == ["lib/a/a.mut.1", "lib/a/a.mut.2"]
+
+        # expected values of a function are shared by the mutants
+        digest, filepath = list(unique.items())[0]
+        key = InputStore.make_function_key("lib/a.c", "func")
+        expected = os.path.join(self.work, "expected")
+        assert store.load_expected(key, digest, expected) is False
+        for ext in InputStore.EXPECTED_EXTS:
+            with open(expected + ext, "wb") as f: f.write(ext.encode())
+        assert store.store_expected(key, digest, expected) is True
+        loaded = os.path.join(self.work, "loaded")
+        assert store.load_expected(key, digest, loaded) is True
+        with open(loaded + ".returns", "rb") as f:
+            assert f.read() == b".returns"
+        assert store.load_expected(InputStore.make_function_key("lib/a.c", "other"), digest, loaded) is False
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+#! /usr/bin/env python3
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import shutil
+import tempfile
+import unittest
+from unittest import TestCase
+from pipeline.JobJournal import JobJournal
+
+
+class TestJobJournal(TestCase):
+
+    def setUp(self):
+        self.work = tempfile.mkdtemp()
+        self.journal = JobJournal(os.path.join(self.work, "job.jobs.jsonl"), os.path.join(self.work, "job.journal.jsonl"))
+
+    def tearDown(self):
+        shutil.rmtree(self.work)
+
+    def test_job_id(self):
+        job_id = JobJournal.make_job_id("fuzzing", "./a.mut.1.c", 1)
+        assert job_id == JobJournal.make_job_id("fuzzing", "./a.mut.1.c", 1), "The job ID should be stable"
+        assert job_id != JobJournal.make_job_id("fuzzing", "./a.mut.1.c", 2), "Different runs should have different IDs"
+        assert job_id != JobJournal.make_job_id("gen", "./a.mut.1.c", 1), "Different phases should have different IDs"
+
+    def test_pending_jobs(self):
+        jobs = [{"id": JobJournal.make_job_id("fuzzing", "m", runID), "runID": runID} for runID in range(1, 5)]
+        self.journal.store_manifest(jobs)
+        assert len(self.journal.get_pending_jobs(jobs)) == 4, "All jobs should be pending without the journal"
+
+        self.journal.record(jobs[0]["id"], JobJournal.SUCCESS, 1.0)
+        self.journal.record(jobs[1]["id"], JobJournal.FAILED, 1.0)
+        self.journal.record(jobs[2]["id"], JobJournal.FAILED, 1.0)
+        self.journal.record(jobs[2]["id"], JobJournal.SUCCESS, 1.0)   # succeeded by re-execution
+        pending = [job["runID"] for job in self.journal.get_pending_jobs(jobs)]
+        assert pending == [2, 4], "Only the failed and missing jobs should be pending: %s" % pending
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,198 @@
+#! /usr/bin/env python3
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import shutil
+import struct
+import subprocess
+import tempfile
+import unittest
+from unittest import TestCase
+from pipeline import utils
+from pipeline.Config import Config
+from pipeline.TemplateGenerator import TemplateGenerator
+from pipeline.fuzzer import AFLOutput
+
+
+class TestPersistentTemplate(TestCase):
+
+    def setUp(self):
+        self.work = tempfile.mkdtemp()
+        self.write("lib.c", "int add(int a, int *b) { *b = a + 1; return a * 2; }\n")
+        self.write("mut.c", "int mut_add(int a, int *b) { *b = a + 1; return a == 7 ? 0 : a * 2; }\n")
+        # simulates __AFL_LOOP: AFL writes a new input into the same file (or the shared memory) for each iteration
+        self.write("loop.c", '#include <stdio.h>\n'
+                             '#include <string.h>\n'
+                             'unsigned char test_buf[8]; unsigned int test_len = 8;\n'
+                             'int test_loop(int n) {\n'
+                             '    static int i = 0; int values[3] = {5, 6, 7};\n'
+                             '    if (i >= 3) return 0;\n'
+                             '    FILE *f = fopen("input.bin", "wb"); int v[2] = {values[i++], 1};\n'
+                             '    fwrite(v, sizeof(int), 2, f); fclose(f);\n'
+                             '    memcpy(test_buf, v, sizeof(v));\n'
+                             '    return 1;\n'
+                             '}\n')
+
+        conf = utils.load_module(os.path.join(os.path.dirname(__file__), "..", "pipeline", "_config.py"))
+        self.config = Config(vars(conf))
+        self.config.REPO_PATH = self.work
+        self.config.AST_CACHE = os.path.join(self.work, "ast-cache")
+        self.config.PCH_CACHE = os.path.join(self.work, "pch-cache")
+        self.config.FUZZING_PERSISTENT_LOOP = 1000
+
+    def tearDown(self):
+        shutil.rmtree(self.work)
+
+    def write(self, _name, _code):
+        filepath = os.path.join(self.work, _name)
+        with open(filepath, "w") as f:
+            f.write(_code)
+        return filepath
+
+    def build_driver(self, _flags):
+        driver = os.path.join(self.work, "driver.c")
+        gen = TemplateGenerator(os.path.join(self.work, "lib.c"), self.config, "")
+        assert gen.generate("add", driver, self.config.TEMPLATE_PERSISTENT_DRIVER) is True, "Failed to generate the driver"
+        binary = os.path.join(self.work, "driver")
+        subprocess.check_call(["gcc", "-w", "-o", binary, driver] + _flags +
+                              [os.path.join(self.work, name) for name in ["lib.c", "mut.c"]])
+        return binary
+
+    def run_driver(self, _binary, _working_dir, _input="input.bin", _stdin=None):
+        proc = subprocess.run([_binary, _input, _working_dir, "crash"], cwd=self.work, input=_stdin,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        with open(os.path.join(self.work, _working_dir, "total.log")) as f:
+            lines = f.read().strip().split("\n")[1:]
+        return proc.returncode, [line.split(",")[-1] for line in lines]
+
+    def test_without_afl_loop(self):
+        binary = self.build_driver([])
+        with open(os.path.join(self.work, "input.bin"), "wb") as f:
+            f.write(struct.pack("ii", 5, 1))
+        ret, results = self.run_driver(binary, "single")
+        assert ret == 0 and results == ["1"], "The driver should test one input: %s" % results
+
+    def test_persistent_loop(self):
+        binary = self.build_driver(["-D__AFL_LOOP(_N)=test_loop(_N)", os.path.join(self.work, "loop.c")])
+        ret, results = self.run_driver(binary, "loop")
+        assert ret != 0, "The driver should abort when the mutant is killed"
+        assert results == ["1", "1", "0"], "Each iteration should be logged with its own result: %s" % results
+
+    def test_shared_memory_input(self):
+        flags = ["-D__AFL_LOOP(_N)=test_loop(_N)", "-D__AFL_FUZZ_TESTCASE_BUF=test_buf", "-D__AFL_FUZZ_TESTCASE_LEN=test_len",
+                 "-D__AFL_FUZZ_INIT()=extern unsigned char test_buf[]; extern unsigned int test_len",
+                 os.path.join(self.work, "loop.c")]
+        binary = self.build_driver(flags)
+        ret, results = self.run_driver(binary, "shared", _input="-")
+        assert ret != 0 and results == ["1", "1", "0"], "Inputs should be read from the shared memory: %s" % results
+
+    def test_standard_input(self):
+        binary = self.build_driver([])
+        ret, results = self.run_driver(binary, "stdin", _input="-", _stdin=struct.pack("ii", 7, 1))
+        assert ret != 0 and results == ["0"], "The input should be read from the standard input: %s" % results
+
+    def test_execution_log_formats(self):
+        # the binary records and the counters give the same statistics with the csv log
+        results = {}
+        for log_format in ["csv", "binary", "counters"]:
+            self.config.FUZZING_EXECUTION_LOG = log_format
+            binary = self.build_driver(["-D__AFL_LOOP(_N)=test_loop(_N)", os.path.join(self.work, "loop.c")])
+            subprocess.run([binary, "input.bin", log_format, "crash"], cwd=self.work,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            afl = AFLOutput(os.path.join(self.work, log_format))
+            counts, elapsed = afl.make_stats_total_log()
+            records = [(record["seq"], record["comp"]) for record in afl.load_total_execution_log()]
+            results[log_format] = (counts, sorted(key for key, value in elapsed.items() if value != -1), records)
+
+        assert os.path.basename(AFLOutput(os.path.join(self.work, "binary")).get_total_log_path()) == "total.bin"
+        assert results["csv"][0] == {"all": 3, "initial": 0, "origin": 0, "mutant": 0, "comp": 1, "seq": 3}, results["csv"]
+        assert results["binary"] == results["csv"], "Wrong binary log: %s" % str(results["binary"])
+        assert results["counters"][:2] == results["csv"][:2] and results["counters"][2] == [], \
+            "Wrong counters: %s" % str(results["counters"])
+
+
+class TestPrototypeArtifact(TestCase):
+
+    def setUp(self):
+        self.work = tempfile.mkdtemp()
+        self.source = os.path.join(self.work, "lib.c")
+        with open(self.source, "w") as f:
+            f.write("#include <stdio.h>\n#include \"lib.h\"\nint add(int a, int *b) { *b = a + 1; return a * 2; }\n")
+        with open(os.path.join(self.work, "lib.h"), "w") as f:
+            f.write("int add(int a, int *b);\n")
+
+        conf = utils.load_module(os.path.join(os.path.dirname(__file__), "..", "pipeline", "_config.py"))
+        self.config = Config(vars(conf))
+        self.config.REPO_PATH = self.work
+        self.config.AST_CACHE = os.path.join(self.work, "ast-cache")
+        self.config.PCH_CACHE = os.path.join(self.work, "pch-cache")
+        self.artifact = os.path.join(self.work, "add.prototype.json")
+        self.appendix = {"input": [3, 0, 0, 0, 1, 0, 0, 0], "params": [3, 0, 0, 0, 4, 0, 0, 0], "returns": [6, 0, 0, 0]}
+
+    def tearDown(self):
+        shutil.rmtree(self.work)
+
+    def render(self, _gen, _name):
+        testcase = os.path.join(self.work, _name)
+        assert _gen.generate("add", testcase, self.config.TEMPLATE_TESTCASE_DRIVER, _appendix=self.appendix) is True
+        with open(testcase) as f:
+            return f.read()
+
+    def test_generate_from_artifact(self):
+        gen = TemplateGenerator(self.source, self.config, "-I" + self.work)
+        expected = self.render(gen, "parsed.c")
+        assert gen.store_artifact("add", self.artifact) is True
+
+        loaded = TemplateGenerator(self.source, self.config, _parse=False)
+        assert loaded.AST is None and loaded.load_artifact("add", self.artifact) is True
+        assert self.render(loaded, "loaded.c") == expected, "The artifact should generate the same test case"
+
+    def test_generate_without_libclang(self):
+        gen = TemplateGenerator(self.source, self.config, "-I" + self.work)
+        expected = self.render(gen, "parsed.c")
+        gen.store_artifact("add", self.artifact)
+
+        # run.py is imported and the test case is rendered with libclang blocked
+        script = '''
+import os, sys, importlib.abc
+class BlockClang(importlib.abc.MetaPathFinder):
+    def find_spec(self, _name, _path, _target=None):
+        if _name == "clang" or _name.startswith("clang."): raise ImportError("blocked: " + _name)
+sys.meta_path.insert(0, BlockClang())
+sys.path.insert(0, sys.argv[1])
+import run
+from pipeline import utils
+from pipeline.Config import Config
+work, source, artifact = sys.argv[2:5]
+config = Config(vars(utils.load_module(os.path.join(sys.argv[1], "pipeline", "_config.py"))))
+config.REPO_PATH = work
+gen = run.TemplateGenerator(source, config, _parse=False)
+assert gen.load_artifact("add", artifact) is True
+appendix = {"input": [3, 0, 0, 0, 1, 0, 0, 0], "params": [3, 0, 0, 0, 4, 0, 0, 0], "returns": [6, 0, 0, 0]}
+assert gen.generate("add", os.path.join(work, "loaded.c"), config.TEMPLATE_TESTCASE_DRIVER, _appendix=appendix) is True
+run.InputGenerator(config.TEMPLATE_CONFIG).generate(gen.prototypes["add"], os.path.join(work, "inputs"))
+assert "clang" not in sys.modules and run.FunctionExtractor is None
+'''
+        root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+        proc = subprocess.run([sys.executable, "-c", script, root, self.work, self.source, self.artifact],
+                              cwd=self.work, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        assert proc.returncode == 0, "Failed without libclang:\n%s" % proc.stdout.decode(errors="replace")
+        with open(os.path.join(self.work, "loaded.c")) as f:
+            assert f.read() == expected, "The artifact should generate the same test case"
+        assert len(os.listdir(os.path.join(self.work, "inputs"))) > 0, "The input files are not generated"
+
+    def test_stale_artifact(self):
+        gen = TemplateGenerator(self.source, self.config, "-I" + self.work)
+        assert gen.generate("add", os.path.join(self.work, "driver.c"), self.config.TEMPLATE_FUZZING_DRIVER) is True
+        gen.store_artifact("add", self.artifact)
+
+        loaded = TemplateGenerator(self.source, self.config, _parse=False)
+        assert loaded.load_artifact("sub", self.artifact) is False, "The artifact is for another function"
+        with open(self.source, "a") as f:
+            f.write("int sub(int a, int b) { return a - b; }\n")
+        assert loaded.load_artifact("add", self.artifact) is False, "The source file is changed after the artifact"
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,181 @@
+#! /usr/bin/env python3
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import shutil
+import subprocess
+import tempfile
+import unittest
+from unittest import TestCase
+from pipeline import compile
+from pipeline.FunctionExtractor import FunctionExtractor
+
+
+class TestObjectCache(TestCase):
+
+    def setUp(self):
+        self.work = tempfile.mkdtemp()
+        self.cache = os.path.join(self.work, "cache")
+        self.repos = []
+        for name in ["repoA", "repoB"]:
+            repo = os.path.join(self.work, name)
+            os.makedirs(repo)
+            with open(os.path.join(repo, "lib.h"), "w") as f:
+                f.write("int add(int a, int b);\n")
+            with open(os.path.join(repo, "lib.c"), "w") as f:
+                f.write('#include "lib.h"\nint add(int a, int b) { return a + b; }\n')
+            self.repos.append(repo)
+
+    def tearDown(self):
+        shutil.rmtree(self.work)
+
+    def test_key_independent_of_repo_location(self):
+        keyA = compile.get_object_cache_key("gcc", "lib.c", "-O1", " -I.", self.repos[0])
+        keyB = compile.get_object_cache_key("gcc", "lib.c", "-O1", " -I.", self.repos[1])
+        assert keyA is not None, "Failed to make a key for the object cache"
+        assert keyA == keyB, "The same translation unit should have the same key"
+
+        keyC = compile.get_object_cache_key("gcc", "lib.c", "-O2", " -I.", self.repos[0])
+        assert keyA != keyC, "Different compile flags should have a different key"
+
+        with open(os.path.join(self.repos[1], "lib.c"), "a") as f:
+            f.write("int sub(int a, int b) { return a - b; }\n")
+        keyB = compile.get_object_cache_key("gcc", "lib.c", "-O1", " -I.", self.repos[1])
+        assert keyA != keyB, "Different source code should have a different key"
+
+    def test_compile_with_cache(self):
+        for repo in self.repos:
+            compile.compile_SUT_files("gcc", ["lib.c"], "./_build", ["."], "-O1", repo, _cache_dir=self.cache)
+            assert os.path.exists(os.path.join(repo, "_build", "lib.o")), "Failed to compile the object"
+
+        cached = [f for d, _, files in os.walk(self.cache) for f in files]
+        assert len(cached) == 1, "The object should be stored once in the cache: %s" % cached
+        assert cached[0].endswith(".o"), "A temporary file remains in the cache: %s" % cached
+
+
+class TestParallelCompile(TestCase):
+
+    def setUp(self):
+        self.work = tempfile.mkdtemp()
+        self.write("lib.h", "int add(int a, int b);\n")
+        for idx in range(4):
+            self.write("lib%d.c" % idx, '#include "lib.h"\nint f%d(int a) { return add(a, %d); }\n' % (idx, idx))
+
+    def tearDown(self):
+        shutil.rmtree(self.work)
+
+    def write(self, _name, _code):
+        with open(os.path.join(self.work, _name), "w") as f:
+            f.write(_code)
+
+    def compile(self, _flags="-O1"):
+        compile.compile_SUT_files("gcc", ["*.c"], "./_build", ["."], _flags, self.work, _jobs=4)
+        return {name: os.stat(os.path.join(self.work, "_build", name)).st_mtime_ns
+                for name in os.listdir(os.path.join(self.work, "_build")) if name.endswith(".o")}
+
+    def test_skip_up_to_date_objects(self):
+        first = self.compile()
+        assert len(first) == 4, "All the files should be compiled: %s" % first
+
+        second = self.compile()
+        assert first == second, "The objects newer than their dependencies should not be compiled again"
+
+        # touching a header compiles all the files including it, and different flags compile all the files
+        os.utime(os.path.join(self.work, "lib.h"), ns=(max(first.values()) + 10**9,) * 2)
+        third = self.compile()
+        assert all(third[name] != second[name] for name in third), "The files including the header should be compiled"
+        fourth = self.compile(_flags="-O2")
+        assert all(fourth[name] != third[name] for name in fourth), "Different flags should compile the files"
+
+    def test_make_jobs(self):
+        assert compile.add_make_jobs("cd src && make all", 8) == "cd src && make -j 8 all"
+        assert compile.add_make_jobs("make -j2", 8) == "make -j2"
+        assert compile.add_make_jobs("cmake .. && make", 1) == "cmake .. && make"
+
+    def test_num_jobs(self):
+        cores = len(os.sched_getaffinity(0))
+        assert compile.get_num_jobs(3, _shared=4) == 3, "The given number of jobs should be used as it is"
+        assert compile.get_num_jobs(0) == cores
+        assert compile.get_num_jobs(0, _shared=cores * 2) == 1, "The cores should be shared by the concurrent runs"
+
+
+class TestSUTArchive(TestCase):
+
+    def setUp(self):
+        self.work = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.work, "_build"))
+        # init.o is not referenced by the driver, but its constructor should be linked as with the object files
+        sources = {"lib.c": "int add(int a, int b) { return a + b; }\n",
+                   "init.c": "int ready = 0;\n__attribute__((constructor)) static void init(void) { ready = 1; }\n"}
+        for name, code in sources.items():
+            with open(os.path.join(self.work, name), "w") as f:
+                f.write(code)
+            subprocess.check_call(["gcc", "-c", "-o", os.path.join("_build", name[:-2] + ".o"), name], cwd=self.work)
+        with open(os.path.join(self.work, "driver.c"), "w") as f:
+            f.write("int add(int, int); extern int ready;\nint main() { return add(ready, 1) == 2 ? 0 : 1; }\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.work)
+
+    def test_link_archive(self):
+        objects = ["./_build/*.o"]
+        archive = compile.make_SUT_archive(objects, os.path.join(self.work, "tc", "libsut.a"), self.work)
+        assert archive["archive"] is not None and archive["others"] == [], "Wrong archive: %s" % archive
+
+        binary = os.path.join(self.work, "driver.obj")
+        compile.compile_test_driver("gcc", os.path.join(self.work, "driver.c"), binary,
+                                    objects, [], "", self.work, _archive=archive)
+        assert subprocess.call([binary]) == 0, "All the objects in the archive should be linked"
+
+    def test_no_object_files(self):
+        subprocess.check_call(["ar", "rcs", "libold.a", "_build/lib.o"], cwd=self.work)
+        archive = compile.make_SUT_archive(["libold.a"], os.path.join(self.work, "libsut.a"), self.work)
+        assert archive == {"archive": None, "others": ["libold.a"]}, "Archives should be linked as they are: %s" % archive
+
+
+class TestSchemata(TestCase):
+
+    def setUp(self):
+        self.work = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.work)
+
+    def write(self, _name, _code):
+        filepath = os.path.join(self.work, _name)
+        with open(filepath, "w") as f:
+            f.write(_code)
+        return filepath
+
+    def test_schemata_dispatcher(self):
+        origin = self.write("lib.c", "static int add(int a, int b) { return a + b; }\nint twice(int a) { return add(a, a); }\n")
+        mutants = [self.write("lib.mut.1.c", "static int add(int a, int b) { return a - b; }\n"),
+                   self.write("lib.mut.2.c", "static int add(int a, int b) { return a * b; }\n")]
+
+        signature = FunctionExtractor("", _prefix="mut").get_function_signature(mutants[0], "add")
+        assert signature is not None, "Failed to get the function signature"
+        assert signature["args"] == ["a", "b"] and signature["void"] is False, "Wrong signature: %s" % signature
+
+        names = []
+        for idx, mutant in enumerate(mutants):
+            extractor = FunctionExtractor("", _prefix="mut%d" % (idx+1))
+            extractor.extract(mutant, "add", mutant)
+            names.append(extractor.get_mutated_func_name("add"))
+        signature["names"] = names
+        schemata = os.path.join(self.work, "add.schemata.c")
+        compile.generate_schemata_code(mutants, signature, schemata, "MOTIF_MUTANT_ID")
+        compile.inject_mutated_function(origin, schemata, "add", "mut")
+
+        main = self.write("main.c", '#include <stdio.h>\nint add(int, int); int mut_add(int, int);\n'
+                                    'int main() { printf("%d %d", add(6, 3), mut_add(6, 3)); return 0; }\n')
+        binary = os.path.join(self.work, "main")
+        subprocess.check_call(["gcc", "-o", binary, main, origin])
+        for mutant_id, expected in [("1", "9 3"), ("2", "9 18")]:
+            env = dict(os.environ, MOTIF_MUTANT_ID=mutant_id)
+            output = subprocess.check_output([binary], env=env).decode()
+            assert output == expected, "Mutant %s returns wrong results: %s" % (mutant_id, output)
+
+
+if __name__ == '__main__':
+    unittest.main()
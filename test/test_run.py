@@ -0,0 +1,149 @@
+#! /usr/bin/env python3
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import io
+import shutil
+import tempfile
+import unittest
+from unittest import TestCase
+from unittest import mock
+import run
+import run_list
+from pipeline import utils
+from pipeline import Mutant
+from pipeline.Config import Config
+from pipeline.PathHelper import PathHelper
+
+
+class TestBatchPreprocess(TestCase):
+    MUTANTS = ["src/lib/lib.mut.1.1_1_1.ROR.add.c", "src/util/util.mut.1.1_1_1.AOR.mul.c",
+               "src/lib/lib.mut.2.2_1_1.ROR.sub.c"]
+
+    def setUp(self):
+        self.work = tempfile.mkdtemp()
+        self.repo = os.path.join(self.work, "repo")
+        os.makedirs(os.path.join(self.repo, "src"))
+        with open(os.path.join(self.repo, "src", "lib.c"), "w") as f:
+            f.write("int add(int a, int *b) { *b = a + 1; return a * 2; }\nint sub(int a, int b) { return a - b; }\n")
+        with open(os.path.join(self.repo, "src", "util.c"), "w") as f:
+            f.write("long mul(long a, long b) { return a * b; }\n")
+
+        conf = utils.load_module(os.path.join(os.path.dirname(__file__), "..", "pipeline", "_config.py"))
+        self.config = Config(vars(conf))
+        self.config.sysargs = ["run_list.py", "--preprocess-batch", "mutants.list"]
+        self.config.PHASE = "preprocess"
+        self.config.JOB_NAME = "test"
+        self.config.OUTPUT_PATH = self.work
+        self.config.REPO_PATH = self.repo
+        self.config.AST_CACHE = os.path.join(self.work, "ast-cache")
+        self.config.PCH_CACHE = os.path.join(self.work, "pch-cache")
+        self.config.HPC = False
+        self.config.LOCAL_JOBS = 1
+        self.config.FUZZING_BUDGET = None
+        self.config.PYTHON_CMD = "python3"
+        self.config.OVERWRITE = False
+
+    def tearDown(self):
+        shutil.rmtree(self.work)
+
+    def use_output(self, _name):
+        self.config.FUNC_DRIVER_PATH = os.path.join(self.work, _name, "1-func-drivers")
+        self.config.FUNC_INPUT_PATH = os.path.join(self.work, _name, "2-func-inputs")
+        return os.path.join(self.work, _name)
+
+    def make_runner(self):
+        run.config = self.config
+        run.path = PathHelper(self.config)
+        return run.Runner.__new__(run.Runner)
+
+    def read_tree(self, _path):
+        files = {}
+        for root, _, filenames in os.walk(_path):
+            for name in filenames:
+                with open(os.path.join(root, name), "rb") as f:
+                    files[os.path.relpath(os.path.join(root, name), _path)] = f.read()
+        return files
+
+    def make_batch_jobs(self):
+        run_list.confList = self.config
+        runner = run_list.ListRunner.__new__(run_list.ListRunner)
+        filters = ["A", "N;Z", "A"]
+        groups = runner.group_by_source_file([Mutant.parse(mutant) for mutant in self.MUTANTS], self.MUTANTS, filters)
+        assert groups == [[(self.MUTANTS[0], "A"), (self.MUTANTS[2], "A")], [(self.MUTANTS[1], "N;Z")]], \
+            "The mutants should be grouped by the source file: %s" % groups
+        return runner.generate_batch_jobs(groups)
+
+    def get_batch_file(self, _job):
+        params = _job["cmd"].split()
+        return params[params.index("--batch-mutants") + 1]
+
+    def test_batch_jobs(self):
+        jobs = self.make_batch_jobs()
+        assert len(jobs) == 2 and [job["mutant"] for job in jobs] == self.MUTANTS[:2]
+        for job, expected in zip(jobs, [["%s;A" % self.MUTANTS[0], "%s;A" % self.MUTANTS[2]], ["%s;N;Z" % self.MUTANTS[1]]]):
+            with open(self.get_batch_file(job)) as f:
+                assert f.read().split("\n")[:-1] == expected, "Wrong batch list: %s" % self.get_batch_file(job)
+            assert job["cmd"].split()[-1] == job["mutant"]
+
+    def test_concurrent_jobs(self):
+        run_list.confList = self.config
+        runner = run_list.ListRunner.__new__(run_list.ListRunner)
+        assert "--concurrent-jobs" not in runner.make_parameters(self.MUTANTS[0])
+        self.config.LOCAL_JOBS = 4
+        params = runner.make_parameters(self.MUTANTS[0])
+        assert params[params.index("--concurrent-jobs") + 1] == "4", "The compilations should share the cores: %s" % params
+
+    def test_local_parallel(self):
+        # a failing command (and a command that cannot be started) does not stop the others
+        self.config.HPC_LOG_PATH = os.path.join(self.work, "logs")
+        self.config.SINGULARITY = False
+        self.config.DRY_RUN = False
+        run_list.confList = self.config
+        runner = run_list.ListRunner.__new__(run_list.ListRunner)
+        marker = os.path.join(self.work, "passed")
+        cmds = ["sh -c 'exit 3'", "touch %s" % marker]
+        with mock.patch("sys.stdout", new_callable=io.StringIO) as stdout:
+            assert runner.local_parallel(cmds, _n_jobs=2) is False, "The failure should be reported"
+        assert os.path.exists(marker), "The passing command should be executed"
+        assert "1 commands failed" in stdout.getvalue() and "[1]" in stdout.getvalue(), stdout.getvalue()
+
+        os.remove(marker)
+        execute = utils.shell.execute_to_file
+        def execute_to_file(_cmd, _log_file):
+            if _cmd.startswith("touch") is False: raise OSError("cannot open the log file")
+            return execute(_cmd, _log_file)
+        with mock.patch.object(utils.shell, "execute_to_file", side_effect=execute_to_file), \
+                mock.patch("sys.stdout", new_callable=io.StringIO) as stdout:
+            assert runner.local_parallel(["true"] + cmds[1:], _n_jobs=2) is False
+        assert os.path.exists(marker), "The passing command should be executed"
+        assert "FAILED (OSError: cannot open the log file)" in stdout.getvalue(), stdout.getvalue()
+
+        with mock.patch("sys.stdout", new_callable=io.StringIO):
+            assert runner.local_parallel(cmds[1:], _n_jobs=2) is True
+
+    def test_same_as_each_mutant(self):
+        batch_file = self.get_batch_file(self.make_batch_jobs()[0])
+        # drivers of the functions in the batch list (the source file is parsed once)
+        batch_output = self.use_output("batch")
+        with mock.patch.object(run, "TemplateGenerator", side_effect=run.TemplateGenerator) as generator:
+            assert self.make_runner().generate_drivers_for_batch(batch_file) is True
+        assert generator.call_count == 1, "The TemplateGenerator should be made once for a source file"
+
+        # drivers made for each mutant
+        single_output = self.use_output("single")
+        runner = self.make_runner()
+        for mutant in [self.MUTANTS[0], self.MUTANTS[2]]:
+            self.config.configure_mutant_information(mutant, "A")
+            assert runner.generate_driver_for_function() is True
+
+        batch, single = self.read_tree(batch_output), self.read_tree(single_output)
+        assert len([name for name in single if name.startswith("2-func-inputs/src/lib/sub/")]) > 0
+        assert sorted(batch.keys()) == sorted(single.keys()), "Different files: %s" % sorted(set(batch) ^ set(single))
+        for name in single:
+            assert batch[name] == single[name], "Different file: %s" % name
+
+
+if __name__ == '__main__':
+    unittest.main()
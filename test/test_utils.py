@@ -3,6 +3,11 @@ import os
 import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+import time
+import shutil
+import tarfile
+import subprocess
+import tempfile
 import unittest
 from unittest import TestCase
 from pipeline import utils
@@ -58,6 +63,91 @@ class TestListRunner(TestCase):
         assert os.path.exists(target) is True, "prepare_directory function cannot make a directory"
         os.removedirs(target)
 
+    def test_link_farm_from_shared_repository(self):
+        work = tempfile.mkdtemp()
+        try:
+            src = os.path.join(work, "src")
+            os.makedirs(os.path.join(src, "lib"))
+            for name in ["main.c", "lib/util.c", "lib/util.h"]:
+                with open(os.path.join(src, name), "w") as f: f.write(name)
+            tar_file = os.path.join(work, "src.tar")
+            with tarfile.open(tar_file, "w") as tar: tar.add(src, arcname=".")
+
+            pristine = utils.uncompress_tar_shared(tar_file, os.path.join(work, "pristine"))
+            assert utils.uncompress_tar_shared(tar_file, os.path.join(work, "pristine")) == pristine, \
+                "The shared repository should be extracted once"
+
+            repo = os.path.join(work, "repos", "mutant")
+            utils.make_link_farm(pristine, repo, _private_files=["./lib/util.c"], _private_dirs=["./_build"])
+            assert os.path.samefile(os.path.join(repo, "main.c"), os.path.join(pristine, "main.c")), \
+                "Not private files should be linked"
+            assert not os.path.samefile(os.path.join(repo, "lib/util.c"), os.path.join(pristine, "lib/util.c")), \
+                "Private files should be copied"
+
+            with open(os.path.join(repo, "lib/util.c"), "w") as f: f.write("mutated")
+            with open(os.path.join(pristine, "lib/util.c")) as f:
+                assert f.read() == "lib/util.c", "Modifying a private file changed the pristine repository"
+        finally:
+            shutil.rmtree(work)
+
+    def test_tar_index(self):
+        work = tempfile.mkdtemp()
+        try:
+            src = os.path.join(work, "src")
+            os.makedirs(os.path.join(src, "lib"))
+            for name in ["main.c", "lib/util.mut.1.c"]:
+                with open(os.path.join(src, name), "w") as f: f.write(name * 100)
+            tar_file = os.path.join(work, "mutants.tar")
+            with tarfile.open(tar_file, "w") as tar: tar.add(src, arcname=".")
+
+            assert utils.exists_in_tar("lib/util.mut.1.c", tar_file) is True, "Failed to find a member"
+            assert os.path.exists(tar_file + utils.TAR_INDEX_EXT) is True, "The index file is not stored"
+            assert utils.find_fullpath_in_tar("util.mut.1.c", tar_file) == "./lib/util.mut.1.c", "Failed to find a basename"
+            assert utils.get_all_files_in_tar(tar_file, "*.mut.*.c") == ["./lib/util.mut.1.c"], "Failed to filter members"
+
+            output = os.path.join(work, "output")
+            assert utils.extract_file_from_tar("./lib/util.mut.1.c", tar_file, output) is True, "Failed to extract"
+            with open(os.path.join(output, "lib/util.mut.1.c")) as f:
+                assert f.read() == "lib/util.mut.1.c" * 100, "The extracted file is different"
+
+            # updated tar file should invalidate the index
+            with tarfile.open(tar_file, "a") as tar: tar.add(os.path.join(src, "main.c"), arcname="./new.c")
+            os.utime(tar_file, ns=(0, 0))
+            assert utils.exists_in_tar("new.c", tar_file) is True, "The index is not updated"
+        finally:
+            shutil.rmtree(work)
+
+    def test_bound_cpus(self):
+        cpu = sorted(os.sched_getaffinity(0))[-1]
+        proc = subprocess.Popen(["sleep", "10"], preexec_fn=lambda: os.sched_setaffinity(0, {cpu}))
+        try:
+            time.sleep(0.1)
+            assert cpu in utils.get_bound_cpus("sleep"), "The core bound to the process should be found"
+            assert utils.get_bound_cpus("not-running-process") == set()
+        finally:
+            proc.kill()
+            proc.wait()
+
+    def test_readline_reverse(self):
+        work = tempfile.mkdtemp()
+        try:
+            filepath = os.path.join(work, "log.txt")
+            # the AFL status lines are separated by "\r" (a long line without "\n")
+            afl_status = "".join("\r[%05d] execs: %d 시험" % (idx, idx * 7) for idx in range(2000))
+            contents = ["", "\n", "first", "\nsecond\n", "a,1\nb,2\n\nc,3", "시험 로그\n종료\n" * 50,
+                        "start\n" + afl_status + "\nend", afl_status]
+            for content in contents:
+                with open(filepath, "w", encoding="utf-8") as f: f.write(content)
+                lines = content.split("\n")[::-1]
+                if lines[-1] == "": lines = lines[:-1]     # the empty first line is not given
+                # the small blocks split the multi-byte characters
+                for block_size in [1, 2, 5, utils.READ_BLOCK_SIZE]:
+                    result = list(utils.readline_reverse(filepath, _block_size=block_size))
+                    assert result == lines, "Wrong lines with the block size %d: %s" % (block_size, result)
+                assert list(utils.readline_reverse(filepath, 2, _block_size=3)) == lines[:2]
+        finally:
+            shutil.rmtree(work)
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,88 @@
+#! /usr/bin/env python3
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import statistics
+from pipeline.fuzzer.AFLOutput import AFLOutput
+
+
+#############################################################################################
+# This code compares the execution speed (executions per second) of AFL between two experiments
+#   e.g., the experiments with the normal fuzzing driver and the persistent-mode fuzzing driver
+# Each experiment directory is searched recursively for the AFL results (the directories having `fuzzer_stats`)
+#   and the results of the same mutant (the same relative path from the experiment directory) are compared.
+# Usage:
+#   ./tools/ExecSpeed.py <base_fuzzing_dir> <target_fuzzing_dir>
+#   e.g., ./tools/ExecSpeed.py ./case_studies/MLFS/exp-fork/5-fuzzing ./case_studies/MLFS/exp-persistent/5-fuzzing
+#############################################################################################
+def find_fuzzing_results(_root):
+    '''
+    :param _root: root directory of the fuzzing results
+    :return: dict {relative path of the AFL working directory: execution speed (execs/sec)}
+    '''
+    results = {}
+    for path, dirs, files in os.walk(_root):
+        if "fuzzer_stats" not in files: continue
+        stats = AFLOutput(path, _isAFLpp=False).load_fuzzer_stats()
+        speed = get_exec_speed(stats)
+        if speed is None: continue
+
+        # AFL++ puts the results into the "default" sub-directory
+        working_dir = os.path.dirname(path) if os.path.basename(path) == "default" else path
+        results[os.path.relpath(working_dir, _root)] = speed
+    return results
+
+
+def get_exec_speed(_stats):
+    # execs_per_sec of AFL++ is the average over the whole fuzzing time
+    if _stats is None: return None
+    run_time = _stats.get("run_time", None)
+    if run_time is None:
+        run_time = _stats.get("last_update", 0) - _stats.get("start_time", 0)
+    if "execs_done" in _stats and run_time > 0:
+        return _stats["execs_done"] / run_time
+    return _stats.get("execs_per_sec", None)
+
+
+def summary(_name, _values):
+    if len(_values) == 0:
+        print("%-8s: no results" % _name)
+        return
+    print("%-8s: %5d runs, mean %10.1f, median %10.1f, min %10.1f, max %10.1f execs/sec" % (
+        _name, len(_values), statistics.mean(_values), statistics.median(_values), min(_values), max(_values)))
+
+
+def compare(_base_dir, _target_dir):
+    base = find_fuzzing_results(_base_dir)
+    target = find_fuzzing_results(_target_dir)
+    summary("base", list(base.values()))
+    summary("target", list(target.values()))
+
+    common = sorted(set(base.keys()) & set(target.keys()))
+    if len(common) == 0:
+        print("No common fuzzing results to compare")
+        return None
+
+    ratios = [target[key] / base[key] for key in common if base[key] > 0]
+    print("Speed-up of %d common runs (target/base): mean %.2fx, median %.2fx, min %.2fx, max %.2fx" % (
+        len(ratios), statistics.mean(ratios), statistics.median(ratios), min(ratios), max(ratios)))
+    return statistics.median(ratios)
+
+
+def parse_arg():
+    parser = argparse.ArgumentParser(description='Compare the execution speed of AFL between two experiments')
+    parser.add_argument('base', metavar='<base_fuzzing_dir>', help='fuzzing results of the base experiment')
+    parser.add_argument('target', metavar='<target_fuzzing_dir>', help='fuzzing results of the experiment to compare')
+    args = parser.parse_args()
+
+    for path in [args.base, args.target]:
+        if os.path.exists(path) is False:
+            parser.error("Not found the directory: %s" % path)
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_arg()
+    compare(args.base, args.target)
@@ -4,6 +4,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 import json
 from pipeline import utils
+from pipeline.fuzzer.ExecutionLog import ExecutionLog
 import tools.utils
 
 
@@ -16,6 +17,8 @@ class ExpResult():
     PLOT_FILENAME = "./plot_data"     # plot data
     FUZZER_STATS = "./fuzzer_stats"   #
     TOTAL_LOG = "./total.log"         # simple log list
+    TOTAL_LOG_BINARY = "./total.bin"  # simple log list in the binary format (FUZZING_EXECUTION_LOG)
+    TOTAL_LOG_COUNTERS = "./total.cnt"  # counters of the executions instead of the log list (FUZZING_EXECUTION_LOG)
     NUM_INPUT_FILENAME = "./__num__"  # number of inputs in AFL  ( not used )
     DETAILED_LOG_PATH = "./logs"      # the folder that detailed logs are stored
     DETAILED_INPUT_PATH = "./inputs"  # the folder that all inputs are stored
@@ -174,15 +177,34 @@ class ExpResult():
         '''
 
         # get full path of the total log file
-        filepath = utils.makepath(self.BASE_PATH, self.TOTAL_LOG)
-        if os.path.exists(filepath) is False: return None, None
+        filepath = self.get_total_log_path()
+        if filepath is None: return None, None
 
-        # make statistics
+        # make statistics (with the columns of the log if NumPy is available)
+        log = ExecutionLog(filepath)
+        if log.is_analyzable() is True:
+            counts, elapsed, stage, flag_elapsed = log.get_stats()
+        else:
+            counts, elapsed, stage, flag_elapsed = self.get_stats_by_records(filepath)
+
+        # Rollback if the last execution is the non-completed execution
+        #   - When a timeout of an execution happens, the execution is crashed, which will be considered in the analysis below.
+        #   - When AFL finished during precondition checking, it has no _execs_done value, then we consider all the inputs.
+        exec_done = self.load_fuzzer_stats(_key='execs_done')
+        if exec_done is not None and exec_done < counts['seq']:
+            counts['all'] -=1
+            if stage is not None:
+                counts[stage] -= 1
+                if flag_elapsed is True: elapsed[stage] = -1
+
+        return counts, elapsed
+
+    def get_stats_by_records(self, _filepath):
         counts = {"all":0, "initial":0, "origin":0, "mutant":0, "comp":0}
         elapsed = {"all":-1, "initial":-1, "origin":-1, "mutant":-1, "comp":-1}
         stage = None
         flag_elapsed = False
-        for record in self.iter_simple_execution_log(filepath):
+        for record in self.iter_simple_execution_log(_filepath):
             # some executions are missing. (I think this is timeout..but..we don't even have log...)
             # so I keep the last sequence ID
             counts['seq'] = record['seq']
@@ -200,22 +222,18 @@ class ExpResult():
                 if elapsed[stage] == -1:
                     flag_elapsed = True
                     elapsed[stage] = record['elapsed']
+        return counts, elapsed, stage, flag_elapsed
 
-        # Rollback if the last execution is the non-completed execution
-        #   - When a timeout of an execution happens, the execution is crashed, which will be considered in the analysis below.
-        #   - When AFL finished during precondition checking, it has no _execs_done value, then we consider all the inputs.
-        exec_done = self.load_fuzzer_stats(_key='execs_done')
-        if exec_done is not None and exec_done < counts['seq']:
-            counts['all'] -=1
-            if stage is not None:
-                counts[stage] -= 1
-                if flag_elapsed is True: elapsed[stage] = -1
-
-        return counts, elapsed
+    def get_total_log_path(self):
+        # the execution log of the driver in any format (see FUZZING_EXECUTION_LOG)
+        for name in [self.TOTAL_LOG, self.TOTAL_LOG_BINARY, self.TOTAL_LOG_COUNTERS]:
+            filepath = utils.makepath(self.BASE_PATH, name)
+            if os.path.exists(filepath) is True: return filepath
+        return None
 
     def load_total_execution_log(self):
-        filepath = utils.makepath(self.BASE_PATH, self.TOTAL_LOG)
-        if os.path.exists(filepath) is False: return None
+        filepath = self.get_total_log_path()
+        if filepath is None: return None
 
         data = []
         # add additional data
@@ -225,8 +243,8 @@ class ExpResult():
 
     def convert_total_execution_log(self):
         # get full path of the total log file
-        filepath = utils.makepath(self.BASE_PATH, self.TOTAL_LOG)
-        if os.path.exists(filepath) is False: return None
+        filepath = self.get_total_log_path()
+        if filepath is None: return None
 
         output = utils.makepath(self.BASE_PATH, self.TOTAL_LOG_CONVERTED)
         out = open(output, "w")
@@ -257,26 +275,9 @@ class ExpResult():
         }
         :return:
         '''
-        # load specified file
-        file = open(_filepath, "r")
-        line = file.readline()       # throw away the first line (title line)
-
-        # a record for one execution
+        # a record for one execution (the rows are read from the log in any format)
         startTime = 0
-        while True:
-            line = file.readline()
-            line = line.strip()
-            if line == '': break
-
-            # convert column values
-            cols = line.split(',')
-            seqID    = int(cols[0].strip())
-            timeID   = int(cols[1].strip())
-            initial  = int(cols[2].strip())
-            original = int(cols[3].strip()) if len(cols)>3 else 0
-            mutated  = int(cols[4].strip()) if len(cols)>4 else 0
-            comp     = int(cols[5].strip()) if len(cols)>5 else 0
-
+        for seqID, timeID, initial, original, mutated, comp in ExecutionLog.iter_rows(_filepath):
             item = {'seq':seqID, 'timeID':timeID, 'unixtime':0,
                     'initial': False,'origin': False,'mutant': False,'comp': False}
 
@@ -293,8 +294,6 @@ class ExpResult():
                 item['elapsed'] = (timeID - startTime) / 1000000  # convert the time to seconds
 
             yield item.copy()
-
-        file.close()
         return True
 
     ###############################################################
@@ -392,31 +391,27 @@ class ExpResult():
             # print("\t\t\t>> %s %s/inputs/%11d/input_%d.txt"%(executor, self.BASE_PATH, distName, ID))
 
     def stat_execution_logs(self):
-        data = self.load_total_execution_log()
+        filepath = self.get_total_log_path()
+        if filepath is None: return None
+        log = ExecutionLog(filepath)
+        if log.is_analyzable() is True:
+            return log.count_stages()
 
         counts = {"all":0, "initial":0, "origin":0, "mutant":0, "comp":0}
-        for record in data:
-            if record['check'][0] is False: counts['initial'] += 1
-            elif record['check'][1] is False: counts['origin'] += 1
-            elif record['check'][2] is False: counts['mutant'] += 1
-            elif record['check'][3] is False: counts['comp'] += 1
+        for record in self.iter_simple_execution_log(filepath):
+            if record['initial'] is False: counts['initial'] += 1
+            elif record['origin'] is False: counts['origin'] += 1
+            elif record['mutant'] is False: counts['mutant'] += 1
+            elif record['comp'] is False: counts['comp'] += 1
             counts['all'] += 1
         return counts
 
     def get_timeIDs_from_total_log(self):
-        filepath = utils.makepath(self.BASE_PATH, self.TOTAL_LOG)
-        if os.path.exists(filepath) is False: return None
-
-        lines = open(filepath, 'r').readlines()
-
-        timeIDs = set([])
-        for line in lines:
-            if line.strip() == '': break
-            cols = line.split(":")
-            timeID = int(cols[0])
-            timeIDs.add(timeID)
-
-        return timeIDs
+        filepath = self.get_total_log_path()
+        if filepath is None: return None
+        if ExecutionLog.is_available() is True:
+            return ExecutionLog(filepath).get_seqs()
+        return set([record['seq'] for record in self.iter_simple_execution_log(filepath)])
 
     def get_timeIDs_from_detailed_logs(self):
         workpath = utils.makepath(self.BASE_PATH, self.DETAILED_LOG_PATH)
@@ -0,0 +1,175 @@
+#! /usr/bin/env python3
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import time
+import shutil
+import argparse
+import tempfile
+from pipeline import utils
+
+
+#############################################################################################
+# This code measures the time of reading log files from the end (utils.readline_reverse)
+#   as the collectors do for each result (e.g., HPCLogCollector reads the last 10~2000 lines of each HPC log)
+# The block-based reader is compared with the previous byte-wise reader (a seek and a read for each byte).
+# Without log files, a synthetic HPC log of the given size is generated in a temporary directory.
+# With --long-line, the generated log has the AFL status lines separated by "\r" (a long line without "\n"),
+#   and the previous block reader (concatenating the blocks of a line for each block) is also measured.
+# Usage:
+#   ./tools/ReadReverseBench.py [--lines N] [--full] [--block-size B] [<log_file> ...]
+#   ./tools/ReadReverseBench.py --size 4096          # generate a 4GB log and measure it
+#   ./tools/ReadReverseBench.py --long-line --size 64 --no-bytewise
+#############################################################################################
+def readline_reverse_bytewise(_file_name, _max=None):
+    # the previous reader (kept for the comparison)
+    count = 0
+    with open(_file_name, 'rb') as read_obj:
+        read_obj.seek(0, os.SEEK_END)
+        pointer_location = read_obj.tell()
+        buffer = bytearray()
+        while pointer_location >= 0:
+            read_obj.seek(pointer_location)
+            pointer_location = pointer_location -1
+            new_byte = read_obj.read(1)
+            if new_byte == b'\n':
+                yield buffer.decode(errors='backslashreplace')[::-1]
+                if _max is not None:
+                    count += 1
+                    if count >= _max: break
+                buffer = bytearray()
+            else:
+                buffer.extend(new_byte)
+        if len(buffer) > 0:
+            yield buffer.decode()[::-1]
+    return True
+
+
+def readline_reverse_concat(_file_name, _max=None, _block_size=utils.READ_BLOCK_SIZE):
+    # the previous block reader (kept for the comparison): a line over the blocks is copied for each block
+    count = 0
+    with open(_file_name, 'rb') as read_obj:
+        pointer_location = read_obj.seek(0, os.SEEK_END)
+        remain = b''
+        while pointer_location > 0:
+            size = min(_block_size, pointer_location)
+            pointer_location -= size
+            read_obj.seek(pointer_location)
+            lines = (read_obj.read(size) + remain).split(b'\n')
+            remain = lines[0]
+            for line in reversed(lines[1:]):
+                yield line.decode(errors='backslashreplace')
+                if _max is not None:
+                    count += 1
+                    if count >= _max: return True
+        if len(remain) > 0:
+            yield remain.decode(errors='backslashreplace')
+    return True
+
+
+def generate_status_log(_filepath, _size_mb):
+    # AFL status screen written into the log: the lines are separated by "\r" (no "\n" until the end)
+    block = "".join(["\r[%05d] execs: %d, paths: %d, crashes: 0" % (idx, idx * 7, idx // 10)
+                     for idx in range(1000)]).encode()
+    size = _size_mb * 1024 * 1024
+    with open(_filepath, "wb") as f:
+        f.write(b"Fuzzing the mutant ...\n")
+        written = 0
+        while written < size:
+            f.write(block)
+            written += len(block)
+        f.write(b"\nFinished fuzzing: the mutant is killed\n")
+    return _filepath
+
+
+def generate_log(_filepath, _size_mb):
+    # lines similar to the logs of the fuzzing jobs on HPC
+    block = "".join(["[%05d] Fuzzing test case #%d (%d total, 0 uniq crashes found)...\n" % (idx, idx, idx * 7)
+                     for idx in range(1000)]).encode()
+    size = _size_mb * 1024 * 1024
+    with open(_filepath, "wb") as f:
+        written = 0
+        while written < size:
+            f.write(block)
+            written += len(block)
+        f.write(b"Finished fuzzing: the mutant is killed\n")
+    return _filepath
+
+
+def measure(_name, _reader, _filepath, _lines):
+    start = time.perf_counter()
+    lines = list(_reader(_filepath, _lines))
+    elapsed = time.perf_counter() - start
+    print("\t%-10s: %8d lines in %10.4f sec" % (_name, len(lines), elapsed))
+    return lines, elapsed
+
+
+def bench(_filepath, _lines, _full, _block_size, _concat=False, _bytewise=True):
+    print("%s (%.1f MB)" % (_filepath, os.path.getsize(_filepath) / 1024 / 1024))
+
+    def block_reader(_file_name, _max):
+        return utils.readline_reverse(_file_name, _max, _block_size=_block_size)
+
+    def concat_reader(_file_name, _max):
+        return readline_reverse_concat(_file_name, _max, _block_size=_block_size)
+
+    # the last lines (as the collectors)
+    lines, elapsed = measure("block", block_reader, _filepath, _lines)
+    if _concat is True:
+        ref_lines, ref_elapsed = measure("concat", concat_reader, _filepath, _lines)
+        if lines != ref_lines:
+            print("\tThe lines are different from the previous block reader")
+        if elapsed > 0:
+            print("\tSpeed-up: %.1fx" % (ref_elapsed / elapsed))
+    if _bytewise is True:
+        ref_lines, ref_elapsed = measure("byte-wise", readline_reverse_bytewise, _filepath, _lines)
+        # the byte-wise reader gives the line at the _max again after stopping
+        if lines != ref_lines[:len(lines)]:
+            print("\tThe lines are different (the byte-wise reader breaks the multi-byte characters)")
+        if elapsed > 0:
+            print("\tSpeed-up: %.1fx" % (ref_elapsed / elapsed))
+
+    # the whole file (only with the block reader, the byte-wise reader takes too long for GB files)
+    if _full is True:
+        lines, elapsed = measure("block-full", block_reader, _filepath, None)
+        print("\tThroughput: %.1f MB/sec" % (os.path.getsize(_filepath) / 1024 / 1024 / elapsed if elapsed > 0 else 0))
+    pass
+
+
+def parse_arg():
+    parser = argparse.ArgumentParser(description='Measure the time of reading log files from the end')
+    parser.add_argument('files', metavar='<log_file>', nargs='*', help='log files to read (default: a generated log)')
+    parser.add_argument('--lines', dest='lines', type=int, default=2000, help='number of the last lines to read')
+    parser.add_argument('--full', dest='full', action='store_true', default=False, help='read also the whole files')
+    parser.add_argument('--size', dest='size', type=int, default=1024, help='size of the generated log (MB)')
+    parser.add_argument('--block-size', dest='block_size', type=int, default=utils.READ_BLOCK_SIZE,
+                        help='block size of the reader (bytes)')
+    parser.add_argument('--long-line', dest='long_line', action='store_true', default=False,
+                        help='generate a log with a long line (AFL status lines separated by "\\r")')
+    parser.add_argument('--no-bytewise', dest='bytewise', action='store_false', default=True,
+                        help='do not measure the byte-wise reader (it takes too long for long lines)')
+    args = parser.parse_args()
+
+    for path in args.files:
+        if os.path.exists(path) is False:
+            parser.error("Not found the file: %s" % path)
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_arg()
+    work = None
+    files = args.files
+    if len(files) == 0:
+        work = tempfile.mkdtemp()
+        print("Generating a log of %d MB ..." % args.size)
+        if args.long_line is True:
+            files = [generate_status_log(os.path.join(work, "afl.log"), args.size)]
+        else:
+            files = [generate_log(os.path.join(work, "hpc.log"), args.size)]
+    try:
+        for filepath in files:
+            bench(filepath, args.lines, args.full, args.block_size, _concat=args.long_line, _bytewise=args.bytewise)
+    finally:
+        if work is not None: shutil.rmtree(work)
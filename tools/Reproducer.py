@@ -4,6 +4,8 @@ import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from pipeline import utils
 from pipeline import Config
+from pipeline.BatchReplay import BatchReplay
+from pipeline.fuzzer import InputStore
 
 
 #####
@@ -122,6 +124,10 @@ class Reproducer():
             print("REPORT - total: 0, success: 0, abort: 0")
             return None
         print("Uncompressed inputs")
+
+        # uncompress the index of the inputs (the results before the index do not have it)
+        tar_cmd = "tar xf {} {}".format(abs_tar_file, InputStore.INDEX_FILE)
+        utils.shell.execute_and_check(tar_cmd, "retcode", 0, _working_dir=extract_path)
         return extract_path
 
     def execute_test_driver(self, _obj_file, _result_path, _working_dir):
@@ -129,7 +135,16 @@ class Reproducer():
         input_path = utils.makepath(_result_path, "inputs")
         input_files = utils.get_all_files(input_path, "*.inb")
 
-        print("Executing test driver: {} files found".format(len(input_files)))
+        # each input of the same content is executed once
+        unique, duplicates = InputStore.dedup(sorted(input_files), InputStore.load_index(_result_path))
+        input_files = list(unique.values())
+        print("Executing test driver: {} files found ({} duplicates are skipped)".format(len(input_files), len(duplicates)))
+        if config.BATCH_REPLAY is True:
+            # driver.obj --batch (each input is executed by a forked process of the driver)
+            replay = BatchReplay(_obj_file, config.TEST_EXEC_TIMEOUT*2, config.BATCH_REPLAY_SHARDS)
+            replay.execute([[filename, _working_dir, "crash", "log"] for filename in input_files])
+            print("Done.")
+            return
         # print("Progress ", end="")
         count = 0
         update = int(len(input_files)/70)
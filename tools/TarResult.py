@@ -13,9 +13,9 @@ from tools.ExpResult import ExpResult
 #####
 # This class analyzes a tar file that contains fuzzing results and used to produce summary informations
 # It is inherited ExpResult class to analyze the results and provides the files that ExpResults requires
+# The members are found with the index of the tar file (<tar file>.idx, see utils.load_tar_index)
 #####
 class TarResult(ExpResult):
-    TAR = None
     TAR_FILENAME = None
     DELETE_TEMP_DIR = True
 
@@ -31,7 +31,7 @@ class TarResult(ExpResult):
             self.INTERMEDIATE = _temp_dir
 
         self.TAR_FILENAME = os.path.abspath(_filename)
-        self.TAR = tarfile.open(_filename)
+        utils.load_tar_index(self.TAR_FILENAME)     # tarfile.ReadError if the tar file is broken
 
         if self.DELETE_TEMP_DIR is True and os.path.exists(self.INTERMEDIATE):
             shutil.rmtree(self.INTERMEDIATE)
@@ -41,20 +41,19 @@ class TarResult(ExpResult):
 
     def extract_file(self, _target):
         # extract required files from tar file into a temp directory (self.INTERMEDIATE)
-        try:
-            cmd = "tar -xf %s %s"%(self.TAR_FILENAME, _target)
-            if os.path.exists(self.INTERMEDIATE) is False:
-                os.makedirs(self.INTERMEDIATE)
-            ret, lines = utils.shell.execute(cmd, _working_dir=self.INTERMEDIATE)
-            if ret != 0:
-                raise KeyError()
-            # self.TAR.extract(_target, path=self.INTERMEDIATE)
-        except KeyError as e:
-            # print(str(e))
+        name = utils.find_member_in_tar(_target, self.TAR_FILENAME)
+        if name is None or utils.extract_file_from_tar(name, self.TAR_FILENAME, self.INTERMEDIATE) is False:
             print("\t- "+ _target + ' file is not in the archive')
             return None
         return utils.makepath(self.INTERMEDIATE, _target)
 
+    def extract_total_log(self):
+        # extract the execution log in any format (see FUZZING_EXECUTION_LOG)
+        for name in [self.TOTAL_LOG, self.TOTAL_LOG_BINARY, self.TOTAL_LOG_COUNTERS]:
+            logfile = self.extract_file(name)
+            if logfile is not None: return logfile
+        return None
+
     def extract_tar(self, _folder=None):
         if _folder is None:
             _folder = self.INTERMEDIATE
@@ -75,7 +74,8 @@ class TarResult(ExpResult):
     def close(self):
         if self.DELETE_TEMP_DIR is True and os.path.exists(self.INTERMEDIATE):
             shutil.rmtree(self.INTERMEDIATE)
-        self.TAR.close()
+        utils.release_tar_index(self.TAR_FILENAME)
+        pass
 
     ###############################################################
     # get total number of inputs that tested in the AFL (__num__ file)
@@ -105,17 +105,17 @@ class TarResult(ExpResult):
         return super().load_stats_total_log(_remake)
 
     def get_stats_total_log(self):
-        logfile = self.extract_file(self.TOTAL_LOG)
+        logfile = self.extract_total_log()
         if logfile is None: return None, None
         return super().get_stats_total_log()
 
     def load_total_execution_log(self):
-        logfile = self.extract_file(self.TOTAL_LOG)
+        logfile = self.extract_total_log()
         if logfile is None: return None
         return super().load_total_execution_log()
 
     def convert_total_execution_log(self):
-        logfile = self.extract_file(self.TOTAL_LOG)
+        logfile = self.extract_total_log()
         if logfile is None: return None
         return super().convert_total_execution_log()
 
@@ -160,7 +160,7 @@ class TarResult(ExpResult):
     # Find issue executions in Tar file
     ########################################################
     def find_issue_executions(self):
-        if self.extract_file( self.TOTAL_LOG ) is None: return None
+        if self.extract_total_log() is None: return None
         if self.extract_file( utils.makepath(self.AFL_RESULT_PATH, self.FUZZER_STATS) ) is None: return None
 
         super().find_issue_executions()
@@ -170,14 +170,14 @@ class TarResult(ExpResult):
         extracts all timeIDs from log list from the detailed logs folder
         :return:
         '''
-        all_files = self.TAR.getmembers()
+        members = utils.load_tar_index(self.TAR_FILENAME)["members"]
 
         timeIDs = set([])
-        for afile in all_files:
-            if afile.name.startswith(self.DETAILED_LOG_PATH) is False: continue
-            if afile.name == self.DETAILED_LOG_PATH: continue  # ignore the folder itself
+        for name, info in members.items():
+            if name.startswith(self.DETAILED_LOG_PATH) is False: continue
+            if info[4] == tarfile.DIRTYPE.decode(): continue  # ignore the folders
 
-            filename = os.path.basename(afile.name)
+            filename = os.path.basename(name)
             timeID = int(filename[:-4])  # remove extension (from <timeID>.log to <timeID>)
             timeIDs.add(timeID)
 
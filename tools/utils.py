@@ -1,6 +1,7 @@
 import os
 import re
 import sys
+from pipeline.utils.file import readline_reverse     # reading the logs from the end (shared with the pipeline)
 
 
 def expandDirs(_dirList, _findKey='', _ptn=None, _sort=False,_exceptionPtn=None):
@@ -75,46 +76,6 @@ def getFiles(_dirList, _findKey='', _ptn=None, _sort=False):
     return data
 
 
-def readline_reverse(_file_name, _max=None):
-    count = 0
-
-    # Open file for reading in binary mode
-    with open(_file_name, 'rb') as read_obj:
-        # Move the cursor to the end of the file
-        read_obj.seek(0, os.SEEK_END)
-        # Get the current position of pointer i.e eof
-        pointer_location = read_obj.tell()
-        # Create a buffer to keep the last read line
-        buffer = bytearray()
-        # Loop till pointer reaches the top of the file
-        while pointer_location >= 0:
-            # Move the file pointer to the location pointed by pointer_location
-            read_obj.seek(pointer_location)
-            # Shift pointer location by -1
-            pointer_location = pointer_location -1
-            # read that byte / character
-            new_byte = read_obj.read(1)
-            # If the read byte is new line character then it means one line is read
-            if new_byte == b'\n':
-                # Fetch the line from buffer and yield it
-                yield buffer.decode(errors='backslashreplace')[::-1]
-                if _max is not None:
-                    count += 1
-                    if count >= _max: break
-                # Reinitialize the byte array to save next line
-                buffer = bytearray()
-            else:
-                # If last read character is not eol then add it in buffer
-                buffer.extend(new_byte)
-        # As file is read completely, if there is still data in buffer, then its the first line.
-        if len(buffer) > 0:
-            # Yield the first line too
-            yield buffer.decode()[::-1]
-            if _max is not None:
-                count += 1
-    return True
-
-
 def parse_args_with_remove(_args_info):
     # set default values
     args = dict(zip([item['name'] for item in _args_info], [item['default'] for item in _args_info]))